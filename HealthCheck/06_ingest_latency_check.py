@@ -0,0 +1,108 @@
+"""
+Ingest Latency Check — VoxCortex
+Purpose:
+- Drive POST /v1/ingest with N concurrent clients
+- Report throughput and p50 / p95 / p99 / max latency
+- Optionally fail when p99 exceeds a budget
+
+Against a running SignalMesh:
+    python HealthCheck/06_ingest_latency_check.py --url http://localhost:8080
+In-process (ASGI transport, no server; needs DATABASE_URL):
+    python HealthCheck/06_ingest_latency_check.py
+"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+import argparse
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def _run(client, total, concurrency):
+    latencies = []
+    errors = 0
+    remaining = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in remaining:
+            body = {
+                "source": "loadtest",
+                "event_type": "alert",
+                "occurred_at": datetime.now(timezone.utc).isoformat(),
+                "severity": "low",
+                "payload": {"title": f"latency probe {i}", "service": "loadtest"},
+            }
+            started = time.perf_counter()
+            try:
+                r = await client.post("/v1/ingest", json=body)
+                if r.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def main_async(args):
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=30.0)
+    else:
+        from services.signalmesh.app import app
+
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://signalmesh", timeout=30.0)
+
+    async with client:
+        if args.warmup:
+            await _run(client, args.warmup, min(args.concurrency, args.warmup))
+        return await _run(client, args.requests, args.concurrency)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SignalMesh ingest latency check")
+    parser.add_argument("--url", help="base URL of a running SignalMesh (default: in-process)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--p99-budget-ms", type=float, help="exit 1 if p99 is above this")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    print("=== SIGNALMESH INGEST LATENCY CHECK ===")
+    latencies, errors, elapsed = asyncio.run(main_async(args))
+    ms = sorted(x * 1000.0 for x in latencies)
+
+    print(f"requests: {len(ms)}  concurrency: {args.concurrency}  errors: {errors}")
+    print(f"throughput: {len(ms) / elapsed:.1f} req/s")
+    for pct in (50, 95, 99):
+        print(f"p{pct}: {_percentile(ms, pct):.1f} ms")
+    print(f"max: {ms[-1]:.1f} ms" if ms else "max: -")
+
+    p99 = _percentile(ms, 99)
+    if errors or (args.p99_budget_ms is not None and p99 > args.p99_budget_ms):
+        print("❌ INGEST LATENCY CHECK FAILED")
+        raise SystemExit(1)
+    print("✅ INGEST LATENCY CHECK COMPLETE")
+
+
+if __name__ == "__main__":
+    main()
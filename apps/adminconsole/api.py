@@ -1,20 +1,459 @@
-from fastapi import FastAPI
-from services.shared.db import exec_sql
+import base64
+import bisect
+import json
+import os
+import re
+from datetime import datetime
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
+from services.cortexreasoner.hypothesis_promoter import _decision_from_confidence
+from services.evidencevault.cache import evidence_cache
+from services.shared.db import exec_read, read_engine, read_your_writes, stream_read
+from services.shared.partitions import archived_rows, read_archived
 
 app = FastAPI(title="VoxCortex AdminConsole", version="0.1.0")
 
+# Read-only endpoints run on the read replica (DATABASE_READ_URL).
+# X-Read-After-LSN (the write_lsn returned by signalmesh) makes the read
+# fall back to the primary until the replica has replayed that write.
+_LSN_RE = re.compile(r"^[0-9A-Fa-f]{1,8}/[0-9A-Fa-f]{1,8}$")
+
+def _session(read_after_lsn):
+    if read_after_lsn and not _LSN_RE.match(read_after_lsn):
+        raise HTTPException(status_code=400, detail="invalid X-Read-After-LSN")
+    return read_your_writes(read_after_lsn)
+
+# Audit rows are served in (created_at, id) order, archived (detached)
+# partitions first: they are always older than live ones. A page ends with
+# an opaque next_cursor (key of its last row, and whether that row was
+# live, so later pages skip the archive). Archived rows of a trace are
+# read once and cached (they never change); a page bisects to its cursor.
+# format=ndjson (or Accept: application/x-ndjson) streams every row after
+# the cursor through a server-side cursor instead; memory stays flat
+# however long the trace is.
+AUDIT_PAGE_SIZE = int(os.getenv("AUDIT_PAGE_SIZE", "500"))
+AUDIT_PAGE_MAX = int(os.getenv("AUDIT_PAGE_MAX", "5000"))
+AUDIT_STREAM_CHUNK = int(os.getenv("AUDIT_STREAM_CHUNK", "1000"))
+_AUDIT_FIELDS = ("created_at", "actor", "action", "details")
+_NDJSON = "application/x-ndjson"
+
+def _timestamp(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(value)
+
+# opaque page cursors: urlsafe base64 of a small JSON object
+def _pack_cursor(values):
+    raw = json.dumps(values, default=_json_default)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def _unpack_cursor(cursor, parse):
+    if not cursor:
+        return None
+    try:
+        return parse(json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))))
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+def _encode_cursor(created_at, row_id, live):
+    return _pack_cursor({"t": _timestamp(created_at), "id": row_id, "live": live})
+
+def _decode_cursor(cursor):
+    return _unpack_cursor(cursor, lambda raw: (_timestamp(raw["t"]), int(raw["id"]), bool(raw["live"])))
+
+def _audit_key(row):
+    return _timestamp(row["created_at"]), row["id"]
+
+def _archived_audit(trace_id, after, actor, action, stream=False):
+    if after is not None and after[2]:
+        return
+    if stream:
+        rows = read_archived("audit_log", trace_id=trace_id)
+    else:
+        archived = archived_rows("audit_log", trace_id=trace_id)
+        start = 0 if after is None else bisect.bisect_right(archived, after[:2], key=_audit_key)
+        rows = (archived[i] for i in range(start, len(archived)))
+    for row in rows:
+        key = _audit_key(row)
+        if after is not None and key <= after[:2]:
+            continue
+        if (actor and row["actor"] != actor) or (action and row["action"] != action):
+            continue
+        yield key, row
+
+def _live_audit_query(trace_id, after, actor, action, limit=None):
+    where = ["trace_id = :trace_id"]
+    params = {"trace_id": trace_id}
+    if after is not None:
+        where.append("(created_at, id) > (:after_created_at, :after_id)")
+        params.update(after_created_at=after[0], after_id=after[1])
+    if actor:
+        where.append("actor = :actor")
+        params["actor"] = actor
+    if action:
+        where.append("action = :action")
+        params["action"] = action
+    sql = (
+        "SELECT id, created_at, actor, action, details FROM audit_log WHERE "
+        + " AND ".join(where)
+        + " ORDER BY created_at, id"
+    )
+    if limit is not None:
+        sql += " LIMIT :limit"
+        params["limit"] = limit
+    return sql, params
+
+def _event(row):
+    return {k: row[k] for k in _AUDIT_FIELDS}
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+def _stream_audit(engine, trace_id, after, actor, action):
+    for _, row in _archived_audit(trace_id, after, actor, action, stream=True):
+        yield json.dumps(_event(row), default=_json_default) + "\n"
+    sql, params = _live_audit_query(trace_id, after, actor, action)
+    for row in stream_read(sql, engine=engine, chunk_size=AUDIT_STREAM_CHUNK, **params):
+        yield json.dumps(_event(row), default=_json_default) + "\n"
+
 @app.get("/v1/audit/{trace_id}")
-def get_audit(trace_id: str):
-    rows = exec_sql(
-        "SELECT created_at, actor, action, details FROM audit_log WHERE trace_id=:trace_id ORDER BY created_at ASC",
-        trace_id=trace_id
-    ).mappings().all()
-    return {"trace_id": trace_id, "events": list(rows)}
+def get_audit(
+    trace_id: str,
+    limit: int = Query(default=AUDIT_PAGE_SIZE, ge=1, le=AUDIT_PAGE_MAX),
+    cursor: str | None = None,
+    actor: str | None = None,
+    action: str | None = None,
+    format: str = Query(default="json", pattern="^(json|ndjson)$"),
+    accept: str | None = Header(default=None),
+    x_read_after_lsn: str | None = Header(default=None),
+):
+    after = _decode_cursor(cursor)
+
+    if format == "ndjson" or (accept and _NDJSON in accept):
+        # the engine is resolved under the session; rows stream after return
+        with _session(x_read_after_lsn):
+            engine = read_engine()
+        return StreamingResponse(_stream_audit(engine, trace_id, after, actor, action), media_type=_NDJSON)
+
+    # one row past the limit tells whether there is a next page
+    page = []
+    for key, row in _archived_audit(trace_id, after, actor, action):
+        page.append((key, False, row))
+        if len(page) > limit:
+            break
+    if len(page) <= limit:
+        sql, params = _live_audit_query(trace_id, after, actor, action, limit=limit + 1 - len(page))
+        with _session(x_read_after_lsn):
+            rows = exec_read(sql, **params).mappings().all()
+        page += [((row["created_at"], row["id"]), True, row) for row in rows]
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        (created_at, row_id), live, _ = page[-1]
+        next_cursor = _encode_cursor(created_at, row_id, live)
+    return {"trace_id": trace_id, "events": [_event(row) for _, _, row in page], "next_cursor": next_cursor}
+
+# Evidence snapshots are immutable and content-addressed: the response is
+# served from a byte-bounded in-process cache after the first read, with a
+# strong ETag (the sha256) so clients revalidate with If-None-Match -> 304.
+# "private": evidence must not land in shared caches.
+EVIDENCE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+# Ids of duplicate payloads collapsed by 015_evidence_aliases.sql resolve
+# to the snapshot that was kept.
+_EVIDENCE_SQL = (
+    "SELECT evidence_id, trace_id, sha256, created_at, payload FROM evidence_snapshots "
+    "WHERE evidence_id = COALESCE("
+    "(SELECT evidence_id FROM evidence_aliases WHERE alias_id = :evidence_id), :evidence_id)"
+)
+
+def _etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or any(t.removeprefix("W/") == etag for t in tags)
 
 @app.get("/v1/evidence/{evidence_id}")
-def get_evidence(evidence_id: str):
-    row = exec_sql(
-        "SELECT evidence_id, trace_id, sha256, created_at, payload FROM evidence_snapshots WHERE evidence_id=:evidence_id",
-        evidence_id=evidence_id
-    ).mappings().first()
-    return {"evidence": dict(row) if row else None}
+def get_evidence(
+    evidence_id: str,
+    if_none_match: str | None = Header(default=None),
+    x_read_after_lsn: str | None = Header(default=None),
+):
+    session = _session(x_read_after_lsn)
+    cached = evidence_cache.get(evidence_id)
+    if cached is None:
+        with session:
+            row = exec_read(_EVIDENCE_SQL, evidence_id=evidence_id).mappings().first()
+        if row is None:
+            return {"evidence": None}
+        body = json.dumps({"evidence": dict(row)}, default=_json_default, ensure_ascii=False, separators=(",", ":"))
+        cached = (f'"{row["sha256"]}"', body.encode("utf-8"))
+        evidence_cache.put(evidence_id, *cached)
+
+    etag, body = cached
+    headers = {"ETag": etag, "Cache-Control": EVIDENCE_CACHE_CONTROL}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+# One query rebuilds everything recorded for a trace: each kind is a CTE
+# over its trace index, merged with UNION ALL in (at, pipeline order) order.
+# Belief deltas and promotions have no trace index; they are reached
+# through the trace's beliefs. `kinds` and `fields` (bare `field` or
+# `kind.field`) narrow the SQL itself, so unused columns are never read.
+# kind -> (source table and filter, timestamp, row ref, {field: column})
+_TIMELINE = {
+    "event": (
+        "events WHERE trace_id = :trace_id", "occurred_at", "event_id",
+        {f: f for f in ("source", "event_type", "severity", "occurred_at", "raw_payload", "canonical_payload")},
+    ),
+    "evidence": (
+        "evidence_snapshots WHERE trace_id = :trace_id", "created_at", "evidence_id",
+        {f: f for f in ("sha256", "payload")},
+    ),
+    "belief": (
+        "beliefs WHERE trace_id = :trace_id", "created_at", "belief_id",
+        {f: f for f in ("subject", "hypothesis", "confidence", "updated_at", "evidence_ids")},
+    ),
+    "belief_delta": (
+        "belief_deltas WHERE belief_id IN (SELECT belief_id FROM trace_beliefs) AND trace_id = :trace_id",
+        "created_at", "id::text",
+        {f: f for f in ("belief_id", "from_conf", "to_conf", "reason")},
+    ),
+    "hypothesis": (
+        "hypotheses WHERE trace_id = :trace_id", "created_at", "id::text",
+        {f: f for f in ("belief_id", "hypothesis", "confidence", "evidence_ids", "ai_call_audit_id", "raw_json")},
+    ),
+    "promotion": (
+        "belief_promotions WHERE belief_id IN (SELECT belief_id FROM trace_beliefs) AND trace_id = :trace_id",
+        "created_at", "id::text",
+        {f: f for f in ("belief_id", "hypothesis_id", "decision", "decision_reason", "promoted_confidence", "evidence_ids")},
+    ),
+    # prompt / output text lives in ai_blobs (003); inline columns only on
+    # legacy rows. Unprojected blob joins are removed by the planner.
+    "ai_call": (
+        "ai_call_audit a LEFT JOIN ai_blobs p ON p.sha256 = a.prompt_sha256 "
+        "LEFT JOIN ai_blobs o ON o.sha256 = a.output_sha256 WHERE a.trace_id = :trace_id",
+        "a.created_at", "a.id::text",
+        {
+            **{f: f"a.{f}" for f in (
+                "phase", "model_name", "policy_status", "policy_error", "prompt_hash", "prompt_sha256",
+                "output_sha256", "parsed_json",
+            )},
+            "prompt": "COALESCE(p.content, a.prompt_preview)",
+            "raw_output": "COALESCE(o.content, a.raw_output)",
+        },
+    ),
+    "explanation": (
+        "explanations WHERE trace_id = :trace_id", "created_at", "id::text",
+        {f: f for f in ("belief_id", "explanation_json", "audio_bytes_len")},
+    ),
+}
+# Rows of detached (archived) partitions are merged in from the archive:
+# kind -> (table, timestamp, row ref). Archived ai_call rows are
+# rehydrated from ai_blobs, which is never archived:
+# field -> (blob sha256 column, legacy inline column).
+_TIMELINE_ARCHIVED = {
+    "event": ("events", "occurred_at", "event_id"),
+    "belief_delta": ("belief_deltas", "created_at", "id"),
+    "ai_call": ("ai_call_audit", "created_at", "id"),
+}
+_AI_BLOB_FIELDS = {"prompt": ("prompt_sha256", "prompt_preview"), "raw_output": ("output_sha256", "raw_output")}
+TIMELINE_LIMIT = int(os.getenv("TIMELINE_LIMIT", "2000"))
+TIMELINE_LIMIT_MAX = int(os.getenv("TIMELINE_LIMIT_MAX", "20000"))
+
+def _split(value):
+    return [v.strip() for v in value.split(",") if v.strip()] if value else []
+
+def _timeline_projection(kinds, fields):
+    kinds = _split(kinds) or list(_TIMELINE)
+    unknown = [k for k in kinds if k not in _TIMELINE]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown kinds: {','.join(unknown)}")
+    fields = _split(fields)
+    if not fields:
+        return {k: list(_TIMELINE[k][3]) for k in kinds}
+
+    projection = {k: [] for k in kinds}
+    for field in fields:
+        kind, _, name = field.rpartition(".")
+        targets = [kind] if kind else kinds
+        matched = [k for k in targets if k in projection and name in _TIMELINE[k][3]]
+        if not matched:
+            raise HTTPException(status_code=400, detail=f"unknown field: {field}")
+        for k in matched:
+            if name not in projection[k]:
+                projection[k].append(name)
+    return projection
+
+def _timeline_sql(projection):
+    ctes = ["trace_beliefs AS (SELECT belief_id FROM beliefs WHERE trace_id = :trace_id)"]
+    branches = []
+    for rank, (kind, (source, at, ref, columns)) in enumerate(_TIMELINE.items()):
+        if kind not in projection:
+            continue
+        data = ", ".join(f"'{f}', {columns[f]}" for f in projection[kind])
+        ctes.append(
+            f"t_{kind} AS (SELECT {rank} AS rank, '{kind}' AS kind, {at} AS at, {ref} AS ref, "
+            f"jsonb_build_object({data}) AS data FROM {source})"
+        )
+        branches.append(f"SELECT * FROM t_{kind}")
+    return (
+        "WITH " + ", ".join(ctes)
+        + " SELECT kind, at, ref, data FROM (" + " UNION ALL ".join(branches) + ") timeline"
+        + " ORDER BY at, rank, ref LIMIT :limit"
+    )
+
+# same order as the SQL: at, pipeline order (rank), ref
+_TIMELINE_RANK = {kind: rank for rank, kind in enumerate(_TIMELINE)}
+
+def _timeline_key(entry):
+    kind, at, ref, _ = entry
+    return _timestamp(at), _TIMELINE_RANK[kind], ref
+
+def _archived_timeline(trace_id, projection):
+    entries = []
+    blobs = {}
+    for kind, (table, at, ref) in _TIMELINE_ARCHIVED.items():
+        if kind not in projection:
+            continue
+        fields = projection[kind]
+        rows = archived_rows(table, trace_id=trace_id)
+        if kind == "ai_call":
+            shas = {row.get(_AI_BLOB_FIELDS[f][0]) for f in fields if f in _AI_BLOB_FIELDS for row in rows}
+            shas.discard(None)
+            if shas:
+                blobs.update(exec_read(
+                    "SELECT sha256, content FROM ai_blobs WHERE sha256 = ANY(CAST(:shas AS text[]))",
+                    shas=sorted(shas),
+                ).all())
+        for row in rows:
+            data = {}
+            for f in fields:
+                if kind == "ai_call" and f in _AI_BLOB_FIELDS:
+                    sha_column, inline_column = _AI_BLOB_FIELDS[f]
+                    data[f] = blobs.get(row.get(sha_column), row.get(inline_column))
+                else:
+                    data[f] = row.get(f)
+            entries.append((kind, _timestamp(row[at]), str(row[ref]), data))
+    return entries
+
+@app.get("/v1/trace/{trace_id}/timeline")
+def get_trace_timeline(
+    trace_id: str,
+    kinds: str | None = None,
+    fields: str | None = None,
+    limit: int = Query(default=TIMELINE_LIMIT, ge=1, le=TIMELINE_LIMIT_MAX),
+    x_read_after_lsn: str | None = Header(default=None),
+):
+    projection = _timeline_projection(kinds, fields)
+    with _session(x_read_after_lsn):
+        rows = exec_read(_timeline_sql(projection), trace_id=trace_id, limit=limit + 1).all()
+        archived = _archived_timeline(trace_id, projection)
+    if archived:
+        rows = sorted([tuple(row) for row in rows] + archived, key=_timeline_key)[:limit + 1]
+    return {
+        "trace_id": trace_id,
+        "kinds": list(projection),
+        "entries": [{"kind": kind, "at": at, "ref": ref, "data": data} for kind, at, ref, data in rows[:limit]],
+        "truncated": len(rows) > limit,
+    }
+
+# Current beliefs come from the current_beliefs projection (one row per
+# subject/hypothesis, maintained by phase0_worker), never from the beliefs
+# history. Pages are keyset on (sort column, subject, hypothesis), newest
+# or most confident first.
+BELIEFS_PAGE_SIZE = int(os.getenv("BELIEFS_PAGE_SIZE", "100"))
+BELIEFS_PAGE_MAX = int(os.getenv("BELIEFS_PAGE_MAX", "1000"))
+_BELIEF_SORTS = {"confidence": float, "updated_at": _timestamp}
+
+def _belief(row):
+    return {**row, "decision": _decision_from_confidence(row["confidence"])[0]}
+
+def _query_beliefs(*, subject, subject_prefix, min_confidence, max_confidence, updated_since, sort, limit, cursor, read_after_lsn):
+    where = []
+    params = {"limit": limit + 1}
+    if subject:
+        where.append("subject = :subject")
+        params["subject"] = subject
+    if subject_prefix:
+        # range form (not LIKE) so generic prepared plans still use the pattern index
+        where.append("subject ~>=~ :prefix_low AND subject ~<~ :prefix_high")
+        params.update(prefix_low=subject_prefix, prefix_high=subject_prefix[:-1] + chr(ord(subject_prefix[-1]) + 1))
+    if min_confidence is not None:
+        where.append("confidence >= :min_confidence")
+        params["min_confidence"] = min_confidence
+    if max_confidence is not None:
+        where.append("confidence <= :max_confidence")
+        params["max_confidence"] = max_confidence
+    if updated_since is not None:
+        where.append("updated_at >= :updated_since")
+        params["updated_since"] = updated_since
+
+    def parse(raw):
+        if raw["sort"] != sort:
+            raise ValueError("cursor belongs to another sort")
+        return _BELIEF_SORTS[sort](raw["v"]), str(raw["s"]), str(raw["h"])
+
+    after = _unpack_cursor(cursor, parse)
+    if after is not None:
+        where.append(f"({sort}, subject, hypothesis) < (:after_value, :after_subject, :after_hypothesis)")
+        params.update(after_value=after[0], after_subject=after[1], after_hypothesis=after[2])
+
+    sql = (
+        "SELECT subject, hypothesis, belief_id, trace_id, confidence, evidence_ids, updated_at FROM current_beliefs"
+        + (" WHERE " + " AND ".join(where) if where else "")
+        + f" ORDER BY {sort} DESC, subject DESC, hypothesis DESC LIMIT :limit"
+    )
+    with _session(read_after_lsn):
+        rows = exec_read(sql, **params).mappings().all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = _pack_cursor({"sort": sort, "v": last[sort], "s": last["subject"], "h": last["hypothesis"]})
+    return {"beliefs": [_belief(row) for row in rows], "next_cursor": next_cursor}
+
+@app.get("/v1/beliefs")
+def list_beliefs(
+    subject: str | None = None,
+    subject_prefix: str | None = None,
+    min_confidence: float | None = Query(default=None, ge=0, le=1),
+    max_confidence: float | None = Query(default=None, ge=0, le=1),
+    updated_since: datetime | None = None,
+    sort: str = Query(default="confidence", pattern="^(confidence|updated_at)$"),
+    limit: int = Query(default=BELIEFS_PAGE_SIZE, ge=1, le=BELIEFS_PAGE_MAX),
+    cursor: str | None = None,
+    x_read_after_lsn: str | None = Header(default=None),
+):
+    return _query_beliefs(
+        subject=subject,
+        subject_prefix=subject_prefix,
+        min_confidence=min_confidence,
+        max_confidence=max_confidence,
+        updated_since=updated_since,
+        sort=sort,
+        limit=limit,
+        cursor=cursor,
+        read_after_lsn=x_read_after_lsn,
+    )
+
+@app.get("/v1/beliefs/{subject:path}")
+def get_subject_beliefs(
+    subject: str,
+    limit: int = Query(default=BELIEFS_PAGE_SIZE, ge=1, le=BELIEFS_PAGE_MAX),
+    cursor: str | None = None,
+    x_read_after_lsn: str | None = Header(default=None),
+):
+    page = _query_beliefs(
+        subject=subject,
+        subject_prefix=None,
+        min_confidence=None,
+        max_confidence=None,
+        updated_since=None,
+        sort="confidence",
+        limit=limit,
+        cursor=cursor,
+        read_after_lsn=x_read_after_lsn,
+    )
+    return {"subject": subject, **page}
@@ -0,0 +1,204 @@
+-- 002_time_partitioning.sql
+--
+-- Native monthly RANGE partitioning on created_at for the append-only tables:
+--   events, belief_deltas, audit_log, ai_call_audit
+--
+-- Existing unpartitioned tables are renamed to <table>_legacy, their rows are
+-- copied into the partitioned table (partitions created to cover them) and the
+-- legacy table is dropped. Run in ONE transaction:
+--   psql -1 -f infra/sql/002_time_partitioning.sql
+--
+-- Partitioned tables need the partition key in every unique constraint, so
+-- primary keys become (<id>, created_at).
+--
+-- Ongoing partition creation / archival: workers/partition_maintenance.py
+
+-- -------------------------------------------------------------------
+-- Helpers
+-- -------------------------------------------------------------------
+
+CREATE OR REPLACE FUNCTION voxcortex_ensure_monthly_partitions(
+  parent TEXT,
+  from_ts TIMESTAMPTZ,
+  to_ts TIMESTAMPTZ
+) RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+  month_start TIMESTAMPTZ := date_trunc('month', from_ts AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+  part_name TEXT;
+  created INTEGER := 0;
+BEGIN
+  WHILE month_start < to_ts LOOP
+    part_name := format('%s_p%s', parent, to_char(month_start AT TIME ZONE 'UTC', 'YYYYMM'));
+    IF to_regclass(part_name) IS NULL THEN
+      EXECUTE format(
+        'CREATE TABLE %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+        part_name,
+        parent,
+        month_start,
+        month_start + INTERVAL '1 month'
+      );
+      created := created + 1;
+    END IF;
+    month_start := month_start + INTERVAL '1 month';
+  END LOOP;
+  RETURN created;
+END $$;
+
+
+CREATE OR REPLACE FUNCTION voxcortex_retire_unpartitioned(parent TEXT) RETURNS BOOLEAN
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF NOT EXISTS (
+    SELECT 1 FROM pg_class WHERE oid = to_regclass(parent) AND relkind = 'r'
+  ) THEN
+    RETURN FALSE;
+  END IF;
+
+  EXECUTE format('ALTER TABLE %I RENAME TO %I', parent, parent || '_legacy');
+  IF to_regclass(parent || '_pkey') IS NOT NULL THEN
+    EXECUTE format('ALTER INDEX %I RENAME TO %I', parent || '_pkey', parent || '_legacy_pkey');
+  END IF;
+  IF to_regclass(parent || '_id_seq') IS NOT NULL THEN
+    EXECUTE format('ALTER SEQUENCE %I RENAME TO %I', parent || '_id_seq', parent || '_legacy_id_seq');
+  END IF;
+  RETURN TRUE;
+END $$;
+
+
+CREATE OR REPLACE FUNCTION voxcortex_adopt_legacy(parent TEXT) RETURNS BIGINT
+LANGUAGE plpgsql AS $$
+DECLARE
+  legacy TEXT := parent || '_legacy';
+  min_ts TIMESTAMPTZ;
+  cols TEXT;
+  moved BIGINT := 0;
+BEGIN
+  IF to_regclass(legacy) IS NULL THEN
+    RETURN 0;
+  END IF;
+
+  EXECUTE format('SELECT min(created_at) FROM %I', legacy) INTO min_ts;
+  PERFORM voxcortex_ensure_monthly_partitions(
+    parent, COALESCE(min_ts, now()), now() + INTERVAL '3 months'
+  );
+
+  SELECT string_agg(quote_ident(l.column_name), ', ' ORDER BY l.ordinal_position)
+    INTO cols
+    FROM information_schema.columns l
+    JOIN information_schema.columns p
+      ON p.table_schema = l.table_schema
+     AND p.table_name = parent
+     AND p.column_name = l.column_name
+   WHERE l.table_schema = current_schema()
+     AND l.table_name = legacy;
+
+  EXECUTE format('INSERT INTO %I (%s) SELECT %s FROM %I', parent, cols, cols, legacy);
+  GET DIAGNOSTICS moved = ROW_COUNT;
+
+  IF EXISTS (
+    SELECT 1 FROM information_schema.columns
+     WHERE table_schema = current_schema() AND table_name = parent AND column_name = 'id'
+  ) THEN
+    EXECUTE format(
+      'SELECT setval(pg_get_serial_sequence(%L, ''id''), GREATEST((SELECT max(id) FROM %I), 1))',
+      parent,
+      parent
+    );
+  END IF;
+
+  EXECUTE format('DROP TABLE %I', legacy);
+  RETURN moved;
+END $$;
+
+-- -------------------------------------------------------------------
+-- events
+-- -------------------------------------------------------------------
+
+SELECT voxcortex_retire_unpartitioned('events');
+
+CREATE TABLE IF NOT EXISTS events (
+  event_id TEXT NOT NULL,
+  trace_id TEXT NOT NULL,
+  source TEXT NOT NULL,
+  event_type TEXT NOT NULL,
+  occurred_at TIMESTAMPTZ NOT NULL,
+  severity TEXT,
+  raw_payload JSONB NOT NULL,
+  canonical_payload JSONB NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (event_id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT;
+SELECT voxcortex_adopt_legacy('events');
+
+-- -------------------------------------------------------------------
+-- belief_deltas
+-- -------------------------------------------------------------------
+
+SELECT voxcortex_retire_unpartitioned('belief_deltas');
+
+CREATE TABLE IF NOT EXISTS belief_deltas (
+  id BIGSERIAL,
+  belief_id TEXT NOT NULL,
+  trace_id TEXT NOT NULL,
+  from_conf DOUBLE PRECISION NOT NULL,
+  to_conf DOUBLE PRECISION NOT NULL,
+  reason TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS belief_deltas_default PARTITION OF belief_deltas DEFAULT;
+SELECT voxcortex_adopt_legacy('belief_deltas');
+
+-- -------------------------------------------------------------------
+-- audit_log
+-- -------------------------------------------------------------------
+
+SELECT voxcortex_retire_unpartitioned('audit_log');
+
+CREATE TABLE IF NOT EXISTS audit_log (
+  id BIGSERIAL,
+  trace_id TEXT NOT NULL,
+  actor TEXT NOT NULL,
+  action TEXT NOT NULL,
+  details JSONB NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS audit_log_default PARTITION OF audit_log DEFAULT;
+SELECT voxcortex_adopt_legacy('audit_log');
+
+-- -------------------------------------------------------------------
+-- ai_call_audit (written by services/audit/ai_call_audit.py)
+-- -------------------------------------------------------------------
+
+SELECT voxcortex_retire_unpartitioned('ai_call_audit');
+
+CREATE TABLE IF NOT EXISTS ai_call_audit (
+  id BIGSERIAL,
+  trace_id TEXT NOT NULL,
+  phase TEXT NOT NULL,
+  model_name TEXT NOT NULL,
+  prompt_hash TEXT NOT NULL,
+  prompt_preview TEXT,
+  raw_output TEXT,
+  parsed_json JSONB,
+  policy_status TEXT NOT NULL,
+  policy_error TEXT,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+
+CREATE TABLE IF NOT EXISTS ai_call_audit_default PARTITION OF ai_call_audit DEFAULT;
+SELECT voxcortex_adopt_legacy('ai_call_audit');
+
+-- -------------------------------------------------------------------
+-- Current + upcoming months for every partitioned table
+-- -------------------------------------------------------------------
+
+SELECT voxcortex_ensure_monthly_partitions(t, now(), now() + INTERVAL '3 months')
+FROM unnest(ARRAY['events', 'belief_deltas', 'audit_log', 'ai_call_audit']) AS t;
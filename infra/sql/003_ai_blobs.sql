@@ -0,0 +1,56 @@
+-- 003_ai_blobs.sql
+--
+-- Content-addressed storage for model prompts / outputs.
+-- ai_call_audit rows point at ai_blobs by sha256 instead of storing the
+-- (mostly identical) prompt template and replayed outputs inline.
+--
+--   ai_call_audit.prompt_sha256 -> ai_blobs.sha256
+--   ai_call_audit.output_sha256 -> ai_blobs.sha256
+--
+-- Read helpers that rehydrate full rows: services/audit/ai_call_audit.py
+
+CREATE TABLE IF NOT EXISTS ai_blobs (
+  sha256 TEXT PRIMARY KEY,
+  content TEXT NOT NULL,
+  byte_len INT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+ALTER TABLE ai_call_audit ADD COLUMN IF NOT EXISTS prompt_sha256 TEXT;
+ALTER TABLE ai_call_audit ADD COLUMN IF NOT EXISTS output_sha256 TEXT;
+ALTER TABLE ai_call_audit ALTER COLUMN prompt_preview DROP NOT NULL;
+ALTER TABLE ai_call_audit ALTER COLUMN raw_output DROP NOT NULL;
+
+-- -------------------------------------------------------------------
+-- Backfill: intern inline text, point rows at it, drop the inline copy.
+-- Legacy prompt_preview was truncated to 4000 chars, so its blob key is the
+-- hash of the stored preview (prompt_hash keeps the full-prompt hash).
+-- -------------------------------------------------------------------
+
+INSERT INTO ai_blobs (sha256, content, byte_len)
+SELECT DISTINCT ON (h) h, content, octet_length(content)
+FROM (
+  SELECT encode(sha256(convert_to(prompt_preview, 'UTF8')), 'hex') AS h, prompt_preview AS content
+  FROM ai_call_audit
+  WHERE prompt_preview IS NOT NULL AND prompt_sha256 IS NULL
+  UNION ALL
+  SELECT encode(sha256(convert_to(raw_output, 'UTF8')), 'hex'), raw_output
+  FROM ai_call_audit
+  WHERE raw_output IS NOT NULL AND output_sha256 IS NULL
+) src
+ON CONFLICT (sha256) DO NOTHING;
+
+UPDATE ai_call_audit
+SET
+  prompt_sha256 = CASE
+    WHEN prompt_preview IS NULL THEN prompt_sha256
+    ELSE encode(sha256(convert_to(prompt_preview, 'UTF8')), 'hex')
+  END,
+  output_sha256 = CASE
+    WHEN raw_output IS NULL THEN output_sha256
+    ELSE encode(sha256(convert_to(raw_output, 'UTF8')), 'hex')
+  END,
+  prompt_preview = NULL,
+  raw_output = NULL
+WHERE prompt_preview IS NOT NULL
+   OR raw_output IS NOT NULL;
@@ -0,0 +1,28 @@
+-- 004_audit_chain.sql
+--
+-- Per-trace hash chain over audit_log + signed verification checkpoints.
+--   row_hash  = sha256(canonical(prev_hash, trace_id, actor, action, details, created_at))
+--   prev_hash = row_hash of the previous row of the same trace (genesis: 64 x '0')
+--
+-- Appends lock only their own trace (pg_advisory_xact_lock), so writers on
+-- different traces never serialize. See services/audit/audit_chain.py.
+-- Rows written before this migration have NULL hashes and are not chained.
+
+ALTER TABLE audit_log ADD COLUMN IF NOT EXISTS prev_hash TEXT;
+ALTER TABLE audit_log ADD COLUMN IF NOT EXISTS row_hash TEXT;
+
+-- chain tail lookup: latest row of a trace
+CREATE INDEX IF NOT EXISTS audit_log_trace_id_id_idx ON audit_log (trace_id, id);
+
+CREATE TABLE IF NOT EXISTS audit_checkpoints (
+  id BIGSERIAL PRIMARY KEY,
+  trace_id TEXT NOT NULL,
+  last_audit_id BIGINT NOT NULL,
+  last_row_hash TEXT NOT NULL,
+  row_count BIGINT NOT NULL,
+  signature TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS audit_checkpoints_trace_id_idx
+  ON audit_checkpoints (trace_id, last_audit_id DESC);
@@ -0,0 +1,117 @@
+-- 005_hot_path_indexes.sql
+--
+-- 1. Tables the code writes to but 001_init.sql never created:
+--      hypotheses         (services/cortexreasoner/hypothesis_store.py)
+--      belief_promotions  (services/cortexreasoner/hypothesis_promoter.py)
+-- 2. Constraints the writers rely on:
+--      evidence_id default (snapshot_evidence; sha256 UNIQUE is in 015)
+--      explanations.audio_bytes_len DEFAULT 0 (phase0_worker omits it)
+-- 3. Secondary indexes for every hot query (see tests/test_hot_query_plans.py)
+--
+-- Applied by the migration runner: python -m workers.migrate
+
+-- -------------------------------------------------------------------
+-- hypotheses
+-- -------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS hypotheses (
+  id BIGSERIAL PRIMARY KEY,
+  trace_id TEXT NOT NULL,
+  belief_id TEXT NOT NULL,
+  ai_call_audit_id BIGINT,
+  hypothesis_hash TEXT NOT NULL,
+  hypothesis TEXT NOT NULL,
+  confidence DOUBLE PRECISION NOT NULL,
+  evidence_ids TEXT[] NOT NULL DEFAULT '{}',
+  raw_json JSONB NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- persist_hypothesis dedup (ON CONFLICT) + find_similar_hypothesis lookup
+CREATE UNIQUE INDEX IF NOT EXISTS hypotheses_trace_belief_hash_key
+  ON hypotheses (trace_id, belief_id, hypothesis_hash);
+
+-- promote_latest_hypothesis: latest row of a belief; _index_for: all rows oldest first
+CREATE INDEX IF NOT EXISTS hypotheses_trace_belief_created_idx
+  ON hypotheses (trace_id, belief_id, created_at DESC);
+
+-- -------------------------------------------------------------------
+-- belief_promotions
+-- -------------------------------------------------------------------
+
+CREATE TABLE IF NOT EXISTS belief_promotions (
+  id BIGSERIAL PRIMARY KEY,
+  trace_id TEXT NOT NULL,
+  belief_id TEXT NOT NULL,
+  hypothesis_id BIGINT NOT NULL REFERENCES hypotheses (id),
+  ai_call_audit_id BIGINT,
+  decision TEXT NOT NULL,
+  decision_reason TEXT NOT NULL,
+  promoted_confidence DOUBLE PRECISION NOT NULL,
+  evidence_ids TEXT[] NOT NULL DEFAULT '{}',
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- ON CONFLICT (belief_id, hypothesis_id) target; INCLUDE makes the
+-- "already promoted?" lookup an index-only scan
+CREATE UNIQUE INDEX IF NOT EXISTS belief_promotions_belief_hypothesis_key
+  ON belief_promotions (belief_id, hypothesis_id)
+  INCLUDE (decision, decision_reason, promoted_confidence);
+
+-- -------------------------------------------------------------------
+-- evidence
+-- -------------------------------------------------------------------
+
+ALTER TABLE evidence_snapshots
+  ALTER COLUMN evidence_id SET DEFAULT 'evd_' || replace(gen_random_uuid()::text, '-', '');
+
+-- evidence_snapshots.sha256 UNIQUE (after collapsing duplicates): 015
+
+CREATE INDEX IF NOT EXISTS evidence_snapshots_trace_created_idx
+  ON evidence_snapshots (trace_id, created_at);
+
+CREATE INDEX IF NOT EXISTS evidence_provenance_evidence_id_idx
+  ON evidence_provenance (evidence_id);
+
+CREATE INDEX IF NOT EXISTS evidence_provenance_trace_id_idx
+  ON evidence_provenance (trace_id);
+
+-- -------------------------------------------------------------------
+-- beliefs / belief_deltas / explanations
+-- -------------------------------------------------------------------
+
+CREATE INDEX IF NOT EXISTS beliefs_trace_id_idx
+  ON beliefs (trace_id);
+
+CREATE INDEX IF NOT EXISTS belief_deltas_belief_created_idx
+  ON belief_deltas (belief_id, created_at);
+
+ALTER TABLE explanations ALTER COLUMN audio_bytes_len SET DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS explanations_trace_belief_created_idx
+  ON explanations (trace_id, belief_id, created_at DESC);
+
+-- -------------------------------------------------------------------
+-- events / audit_log / ai_call_audit (partitioned: indexes cascade to
+-- every partition, including ones created later)
+-- -------------------------------------------------------------------
+
+CREATE INDEX IF NOT EXISTS events_trace_occurred_idx
+  ON events (trace_id, occurred_at);
+
+-- adminconsole trace audit: WHERE trace_id ORDER BY created_at
+CREATE INDEX IF NOT EXISTS audit_log_trace_created_idx
+  ON audit_log (trace_id, created_at, id);
+
+-- chain tail lookup / verification only ever read chained rows;
+-- INCLUDE (row_hash) lets append_audit find the tail with an index-only scan.
+-- Supersedes 004's audit_log_trace_id_id_idx.
+CREATE INDEX IF NOT EXISTS audit_log_chained_trace_id_idx
+  ON audit_log (trace_id, id)
+  INCLUDE (row_hash)
+  WHERE row_hash IS NOT NULL;
+
+DROP INDEX IF EXISTS audit_log_trace_id_id_idx;
+
+CREATE INDEX IF NOT EXISTS ai_call_audit_trace_created_idx
+  ON ai_call_audit (trace_id, created_at, id);
@@ -0,0 +1,14 @@
+-- 006_bulk_load_offsets.sql
+--
+-- Progress of bulk backfills (services/signalmesh/bulk_loader.py).
+-- Updated in the same transaction as each COPY chunk, so a restarted load
+-- resumes at the byte offset after the last committed chunk and never
+-- loads a chunk twice.
+
+CREATE TABLE IF NOT EXISTS bulk_load_offsets (
+  load_key TEXT PRIMARY KEY,
+  byte_offset BIGINT NOT NULL,
+  events_loaded BIGINT NOT NULL DEFAULT 0,
+  rejected BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,25 @@
+-- 007_ingest_outbox.sql
+--
+-- Transactional outbox for Pub/Sub: ingest commits the event row and its
+-- outbox row together; workers/outbox_relay.py publishes pending rows in
+-- batches and stamps sent_at. See services/signalmesh/outbox.py.
+
+CREATE TABLE IF NOT EXISTS ingest_outbox (
+  id BIGSERIAL PRIMARY KEY,
+  topic TEXT NOT NULL,
+  payload JSONB NOT NULL,
+  attempts INT NOT NULL DEFAULT 0,
+  last_error TEXT,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  sent_at TIMESTAMPTZ
+);
+
+-- relay claim: oldest pending rows first
+CREATE INDEX IF NOT EXISTS ingest_outbox_pending_idx
+  ON ingest_outbox (id)
+  WHERE sent_at IS NULL;
+
+-- purge of sent rows
+CREATE INDEX IF NOT EXISTS ingest_outbox_sent_at_idx
+  ON ingest_outbox (sent_at)
+  WHERE sent_at IS NOT NULL;
@@ -0,0 +1,14 @@
+-- 008_event_idempotency.sql
+--
+-- Semantic idempotency keys of ingested events (services/signalmesh/idempotency.py).
+-- events is partitioned by created_at, so its primary key cannot make
+-- event_id unique on its own; this table is the unique constraint.
+-- Ingest claims the key in the same transaction as the event row and
+-- writes nothing when the key was already claimed.
+
+CREATE TABLE IF NOT EXISTS event_idempotency (
+  idempotency_key TEXT PRIMARY KEY,
+  event_id TEXT NOT NULL,
+  trace_id TEXT NOT NULL,
+  first_seen_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
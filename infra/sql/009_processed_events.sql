@@ -0,0 +1,17 @@
+-- 009_processed_events.sql
+--
+-- Processed-event ledger of the canonical pipeline (workers/phase0_worker.py).
+-- Written in the same transaction as the belief, delta and audit rows, so
+-- a row here means the event's effects are committed. A replay of a
+-- recorded (event_id, pipeline_version) returns the stored outcome instead
+-- of running the pipeline again; force=True reruns and bumps `runs`.
+
+CREATE TABLE IF NOT EXISTS processed_events (
+  event_id TEXT NOT NULL,
+  pipeline_version TEXT NOT NULL,
+  trace_id TEXT NOT NULL,
+  outcome JSONB NOT NULL,
+  runs INT NOT NULL DEFAULT 1,
+  processed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (event_id, pipeline_version)
+);
@@ -0,0 +1,54 @@
+-- 010_replay.sql
+--
+-- Bulk replay of stored events through the belief engine (workers/replay.py).
+-- Replays never touch production beliefs: results go to replay_beliefs,
+-- versioned by run_id, and are diffed against the latest production
+-- belief per (subject, hypothesis).
+
+CREATE TABLE IF NOT EXISTS replay_runs (
+  run_id TEXT PRIMARY KEY,
+  pipeline_version TEXT NOT NULL,
+  llm_mode TEXT NOT NULL,
+  shards INT NOT NULL,
+  since TIMESTAMPTZ,
+  until TIMESTAMPTZ,
+  started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  finished_at TIMESTAMPTZ,
+  report JSONB
+);
+
+-- Progress per subject shard; committed together with the shard's
+-- replay_beliefs upserts, so a resumed run continues after the last
+-- committed (occurred_at, event_id).
+CREATE TABLE IF NOT EXISTS replay_checkpoints (
+  run_id TEXT NOT NULL REFERENCES replay_runs (run_id) ON DELETE CASCADE,
+  shard INT NOT NULL,
+  last_occurred_at TIMESTAMPTZ,
+  last_event_id TEXT,
+  events_done BIGINT NOT NULL DEFAULT 0,
+  done BOOLEAN NOT NULL DEFAULT false,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (run_id, shard)
+);
+
+CREATE TABLE IF NOT EXISTS replay_beliefs (
+  run_id TEXT NOT NULL REFERENCES replay_runs (run_id) ON DELETE CASCADE,
+  subject TEXT NOT NULL,
+  hypothesis TEXT NOT NULL,
+  confidence DOUBLE PRECISION NOT NULL,
+  decision TEXT NOT NULL,
+  events BIGINT NOT NULL,
+  last_event_id TEXT NOT NULL,
+  last_occurred_at TIMESTAMPTZ NOT NULL,
+  explanation JSONB,
+  explanation_source TEXT,
+  PRIMARY KEY (run_id, subject, hypothesis)
+);
+
+-- replay stream order and keyset resume (cascades to partitions)
+CREATE INDEX IF NOT EXISTS events_occurred_event_idx
+  ON events (occurred_at, event_id);
+
+-- latest production belief per (subject, hypothesis) for the diff
+CREATE INDEX IF NOT EXISTS beliefs_subject_hypothesis_updated_idx
+  ON beliefs (subject, hypothesis, updated_at DESC);
@@ -0,0 +1,42 @@
+-- 011_current_beliefs.sql
+--
+-- Current-belief projection: one row per (subject, hypothesis) holding the
+-- latest belief. beliefs keeps every row the pipeline writes (one per
+-- event); phase0_worker upserts this table in the same transaction, so
+-- "what do we believe about X" and "top N by confidence" need no
+-- DISTINCT ON over the full history. Read by adminconsole /v1/beliefs.
+
+CREATE TABLE IF NOT EXISTS current_beliefs (
+  subject TEXT NOT NULL,
+  hypothesis TEXT NOT NULL,
+  belief_id TEXT NOT NULL,
+  trace_id TEXT NOT NULL,
+  confidence DOUBLE PRECISION NOT NULL,
+  evidence_ids JSONB NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL,
+  PRIMARY KEY (subject, hypothesis)
+);
+
+-- keyset pages, read backwards: ORDER BY confidence DESC, subject DESC, hypothesis DESC
+CREATE INDEX IF NOT EXISTS current_beliefs_confidence_idx
+  ON current_beliefs (confidence, subject, hypothesis);
+
+CREATE INDEX IF NOT EXISTS current_beliefs_updated_idx
+  ON current_beliefs (updated_at, subject, hypothesis);
+
+-- subject prefix filters (LIKE 'service/%') under any collation
+CREATE INDEX IF NOT EXISTS current_beliefs_subject_pattern_idx
+  ON current_beliefs (subject text_pattern_ops);
+
+-- backfill from history; rows the worker already wrote are newer
+INSERT INTO current_beliefs (subject, hypothesis, belief_id, trace_id, confidence, evidence_ids, updated_at)
+SELECT DISTINCT ON (subject, hypothesis)
+  subject, hypothesis, belief_id, trace_id, confidence, evidence_ids, updated_at
+FROM beliefs
+ORDER BY subject, hypothesis, updated_at DESC, belief_id DESC
+ON CONFLICT (subject, hypothesis) DO NOTHING;
+
+-- beliefs_subject_hypothesis_updated_idx (010) served "latest belief per
+-- (subject, hypothesis)" for the replay diff, which now reads this table.
+-- Kept only for the backfill above; every beliefs insert paid for it.
+DROP INDEX IF EXISTS beliefs_subject_hypothesis_updated_idx;
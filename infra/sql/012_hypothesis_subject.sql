@@ -0,0 +1,21 @@
+-- 012_hypothesis_subject.sql
+--
+-- The near-duplicate hypothesis index (services/cortexreasoner/hypothesis_store.py)
+-- is scoped by belief subject: the worker mints a new belief_id (and signalmesh
+-- a new trace_id) per event, so a per-belief scope never saw earlier phrasings.
+-- hypotheses records the subject it was generated for.
+
+ALTER TABLE hypotheses ADD COLUMN IF NOT EXISTS subject TEXT;
+
+UPDATE hypotheses h
+SET subject = b.subject
+FROM beliefs b
+WHERE b.belief_id = h.belief_id
+  AND h.subject IS NULL;
+
+-- _index_for: all rows of a subject oldest first; find_similar_hypothesis by hash
+CREATE INDEX IF NOT EXISTS hypotheses_subject_created_idx
+  ON hypotheses (subject, created_at);
+
+CREATE INDEX IF NOT EXISTS hypotheses_subject_hash_idx
+  ON hypotheses (subject, hypothesis_hash);
@@ -0,0 +1,8 @@
+-- 013_event_idempotency_retention.sql
+--
+-- event_idempotency keys are pruned once their events have been archived
+-- (workers/partition_maintenance.py deletes keys first seen before the
+-- archive cutoff, in batches). This index finds them oldest first.
+
+CREATE INDEX IF NOT EXISTS event_idempotency_first_seen_idx
+  ON event_idempotency (first_seen_at);
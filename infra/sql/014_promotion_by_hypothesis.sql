@@ -0,0 +1,10 @@
+-- 014_promotion_by_hypothesis.sql
+--
+-- hypothesis_promoter looks up the latest decision for a canonical
+-- hypothesis of a subject (hypotheses (subject, hypothesis_hash), 012)
+-- across beliefs: every event mints a new belief_id, so the
+-- (belief_id, hypothesis_id) key never saw an earlier decision.
+
+CREATE INDEX IF NOT EXISTS belief_promotions_hypothesis_idx
+  ON belief_promotions (hypothesis_id, id DESC)
+  INCLUDE (decision, decision_reason, promoted_confidence);
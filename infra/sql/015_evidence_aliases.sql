@@ -0,0 +1,70 @@
+-- 015_evidence_aliases.sql
+--
+-- snapshot_evidence is idempotent on sha256 (ON CONFLICT (sha256)). Older
+-- writers could store one payload under several evidence_ids, so the
+-- unique index is built after collapsing duplicates onto the oldest
+-- snapshot. Every dropped id stays resolvable:
+--   evidence_aliases                 old id -> kept id (adminconsole /v1/evidence)
+--   evidence_provenance.evidence_id  re-pointed
+--   beliefs / current_beliefs .evidence_ids  rewritten in place
+-- Other stored references (processed_events.outcome, explanation payloads,
+-- hypotheses) resolve through evidence_aliases.
+--
+-- An earlier revision of 005 collapsed duplicates without recording
+-- aliases; on databases that ran it, this file only adds the table.
+
+CREATE TABLE IF NOT EXISTS evidence_aliases (
+  alias_id TEXT PRIMARY KEY,
+  evidence_id TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+INSERT INTO evidence_aliases (alias_id, evidence_id)
+SELECT evidence_id, keep_id
+FROM (
+  SELECT
+    evidence_id,
+    first_value(evidence_id) OVER (PARTITION BY sha256 ORDER BY created_at, evidence_id) AS keep_id
+  FROM evidence_snapshots
+) ranked
+WHERE evidence_id <> keep_id
+ON CONFLICT (alias_id) DO NOTHING;
+
+UPDATE evidence_provenance p
+SET evidence_id = a.evidence_id
+FROM evidence_aliases a
+WHERE p.evidence_id = a.alias_id;
+
+UPDATE beliefs b
+SET evidence_ids = (
+  SELECT jsonb_agg(COALESCE(a.evidence_id, e.id) ORDER BY e.n)
+  FROM jsonb_array_elements_text(b.evidence_ids) WITH ORDINALITY AS e (id, n)
+  LEFT JOIN evidence_aliases a ON a.alias_id = e.id
+)
+WHERE jsonb_typeof(b.evidence_ids) = 'array'
+  AND EXISTS (
+    SELECT 1
+    FROM jsonb_array_elements_text(b.evidence_ids) AS e (id)
+    JOIN evidence_aliases a ON a.alias_id = e.id
+  );
+
+UPDATE current_beliefs b
+SET evidence_ids = (
+  SELECT jsonb_agg(COALESCE(a.evidence_id, e.id) ORDER BY e.n)
+  FROM jsonb_array_elements_text(b.evidence_ids) WITH ORDINALITY AS e (id, n)
+  LEFT JOIN evidence_aliases a ON a.alias_id = e.id
+)
+WHERE jsonb_typeof(b.evidence_ids) = 'array'
+  AND EXISTS (
+    SELECT 1
+    FROM jsonb_array_elements_text(b.evidence_ids) AS e (id)
+    JOIN evidence_aliases a ON a.alias_id = e.id
+  );
+
+DELETE FROM evidence_snapshots s
+USING evidence_aliases a
+WHERE s.evidence_id = a.alias_id;
+
+-- snapshot_evidence ON CONFLICT (sha256) target
+CREATE UNIQUE INDEX IF NOT EXISTS evidence_snapshots_sha256_key
+  ON evidence_snapshots (sha256);
@@ -1,7 +1,7 @@
 # services/audit/ai_call_audit.py
 import json
 import hashlib
-from typing import Any, Optional, Dict
+from typing import Any, Optional, Dict, List
 
 from sqlalchemy import text
 from services.shared.db import get_engine
@@ -11,6 +11,37 @@ def _sha256(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8", errors="ignore")).hexdigest()
 
 
+_INSERT_BLOB = text(
+    """
+    INSERT INTO ai_blobs (sha256, content, byte_len)
+    VALUES (:sha256, :content, :byte_len)
+    ON CONFLICT (sha256) DO NOTHING
+    """
+)
+
+# Full row with prompt/output rehydrated from ai_blobs
+# (falls back to inline columns for rows written before 003_ai_blobs.sql)
+_SELECT_REHYDRATED = """
+    SELECT
+        a.id,
+        a.trace_id,
+        a.phase,
+        a.model_name,
+        a.prompt_hash,
+        a.prompt_sha256,
+        a.output_sha256,
+        COALESCE(p.content, a.prompt_preview) AS prompt,
+        COALESCE(o.content, a.raw_output) AS raw_output,
+        a.parsed_json,
+        a.policy_status,
+        a.policy_error,
+        a.created_at
+    FROM ai_call_audit a
+    LEFT JOIN ai_blobs p ON p.sha256 = a.prompt_sha256
+    LEFT JOIN ai_blobs o ON o.sha256 = a.output_sha256
+"""
+
+
 def record_ai_call(
     *,
     trace_id: str,
@@ -24,19 +55,30 @@ def record_ai_call(
 ) -> int:
     """
     Writes an immutable audit row for EVERY model call and returns inserted id.
-    - raw_output: exact model output (string)
+    - prompt / raw_output: interned once in ai_blobs (keyed by sha256);
+      the audit row stores only prompt_sha256 / output_sha256
     - parsed_json: dict or None (stored as jsonb; NULL if None)
     """
     engine = get_engine()
 
-    prompt_hash = _sha256(prompt or "")
-    prompt_preview = (prompt[:4000] if prompt else "")  # bounded
+    prompt = prompt or ""
+    raw_output = raw_output or ""
+    prompt_hash = _sha256(prompt)
+    output_hash = _sha256(raw_output)
 
     parsed_json_text = None
     if parsed_json is not None:
         parsed_json_text = json.dumps(parsed_json, ensure_ascii=False)
 
     with engine.begin() as conn:
+        conn.execute(
+            _INSERT_BLOB,
+            [
+                {"sha256": prompt_hash, "content": prompt, "byte_len": len(prompt.encode("utf-8", errors="ignore"))},
+                {"sha256": output_hash, "content": raw_output, "byte_len": len(raw_output.encode("utf-8", errors="ignore"))},
+            ],
+        )
+
         row_id = conn.execute(
             text(
                 """
@@ -45,8 +87,8 @@ def record_ai_call(
                     phase,
                     model_name,
                     prompt_hash,
-                    prompt_preview,
-                    raw_output,
+                    prompt_sha256,
+                    output_sha256,
                     parsed_json,
                     policy_status,
                     policy_error
@@ -56,8 +98,8 @@ def record_ai_call(
                     :phase,
                     :model_name,
                     :prompt_hash,
-                    :prompt_preview,
-                    :raw_output,
+                    :prompt_sha256,
+                    :output_sha256,
                     CAST(:parsed_json_text AS jsonb),
                     :policy_status,
                     :policy_error
@@ -70,8 +112,8 @@ def record_ai_call(
                 "phase": phase,
                 "model_name": model_name,
                 "prompt_hash": prompt_hash,
-                "prompt_preview": prompt_preview,
-                "raw_output": raw_output,
+                "prompt_sha256": prompt_hash,
+                "output_sha256": output_hash,
                 "parsed_json_text": parsed_json_text,  # may be None → CAST(NULL AS jsonb) works
                 "policy_status": policy_status,
                 "policy_error": policy_error,
@@ -79,3 +121,29 @@ def record_ai_call(
         ).scalar_one()
 
     return int(row_id)
+
+
+def load_ai_call(audit_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Return one ai_call_audit row with full prompt and raw_output rehydrated.
+    """
+    engine = get_engine()
+    with engine.connect() as conn:
+        row = conn.execute(
+            text(_SELECT_REHYDRATED + " WHERE a.id = :id"),
+            {"id": audit_id},
+        ).mappings().first()
+    return dict(row) if row else None
+
+
+def load_ai_calls_for_trace(trace_id: str) -> List[Dict[str, Any]]:
+    """
+    Return every ai_call_audit row of a trace (oldest first), rehydrated.
+    """
+    engine = get_engine()
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(_SELECT_REHYDRATED + " WHERE a.trace_id = :trace_id ORDER BY a.created_at ASC, a.id ASC"),
+            {"trace_id": trace_id},
+        ).mappings().all()
+    return [dict(r) for r in rows]
@@ -0,0 +1,379 @@
+# services/audit/audit_chain.py
+import json
+from datetime import datetime, timezone
+from typing import Any, Collection, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+
+from services.shared.config import settings
+from services.shared.crypto import hmac_sign_hex
+from services.shared.db import copy_rows, get_engine, sql_text
+from services.shared.evidence_canon import canon_json, sha256_hex
+from services.shared.partitions import archived_chain_tail
+
+# -------------------------------------------------------------------
+# Hash-chained audit_log (see infra/sql/004_audit_chain.sql)
+#
+# - one chain per trace_id; appends take a per-trace advisory lock only
+# - signed checkpoints let verification re-hash only rows written since
+#   the last checkpoint of the trace
+# - rows in archived partitions are gone from the table; verification
+#   resumes from the chain tail the archive manifest recorded for them
+# -------------------------------------------------------------------
+
+GENESIS_HASH = "0" * 64
+
+
+def _created_at_iso(created_at: Any) -> str:
+    if isinstance(created_at, datetime):
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at.astimezone(timezone.utc).isoformat()
+    return str(created_at)
+
+
+def compute_row_hash(
+    prev_hash: str,
+    trace_id: str,
+    actor: str,
+    action: str,
+    details: Dict[str, Any],
+    created_at: Any,
+) -> str:
+    return sha256_hex(
+        canon_json(
+            {
+                "prev_hash": prev_hash,
+                "trace_id": trace_id,
+                "actor": actor,
+                "action": action,
+                "details": details,
+                "created_at": _created_at_iso(created_at),
+            }
+        )
+    )
+
+
+def append_audit(
+    conn,
+    *,
+    trace_id: str,
+    actor: str,
+    action: str,
+    details: Dict[str, Any],
+    created_at: Optional[datetime] = None,
+) -> str:
+    """
+    Append one audit_log row to the trace's hash chain inside the caller's
+    transaction. Returns the new row_hash.
+    """
+    created_at = created_at or datetime.now(timezone.utc)
+
+    conn.execute(
+        sql_text("SELECT pg_advisory_xact_lock(hashtextextended(:trace_id, 0))"),
+        {"trace_id": trace_id},
+    )
+
+    prev_hash = conn.execute(
+        sql_text(
+            """
+            SELECT row_hash
+            FROM audit_log
+            WHERE trace_id = :trace_id
+              AND row_hash IS NOT NULL
+            ORDER BY id DESC
+            LIMIT 1
+            """
+        ),
+        {"trace_id": trace_id},
+    ).scalar() or GENESIS_HASH
+
+    row_hash = compute_row_hash(prev_hash, trace_id, actor, action, details, created_at)
+
+    conn.execute(
+        sql_text(
+            """
+            INSERT INTO audit_log (
+                trace_id,
+                actor,
+                action,
+                details,
+                created_at,
+                prev_hash,
+                row_hash
+            )
+            VALUES (
+                :trace_id,
+                :actor,
+                :action,
+                CAST(:details AS jsonb),
+                :created_at,
+                :prev_hash,
+                :row_hash
+            )
+            """
+        ),
+        {
+            "trace_id": trace_id,
+            "actor": actor,
+            "action": action,
+            "details": json.dumps(details, ensure_ascii=False),
+            "created_at": created_at,
+            "prev_hash": prev_hash,
+            "row_hash": row_hash,
+        },
+    )
+
+    return row_hash
+
+
+_AUDIT_COLUMNS = ("trace_id", "actor", "action", "details", "created_at", "prev_hash", "row_hash")
+
+
+def append_audit_many(
+    conn,
+    entries: Sequence[Dict[str, Any]],
+    *,
+    new_trace_ids: Collection[str] = (),
+) -> int:
+    """
+    Bulk variant of append_audit: chains `entries` (dicts with trace_id,
+    actor, action, details, optional created_at) in order and writes them
+    with one COPY inside the caller's transaction.
+
+    Traces in `new_trace_ids` were minted by the caller for this batch, so
+    nobody else can append to them: they start at genesis without a lock
+    or tail lookup. All other traces are locked (sorted, to avoid
+    deadlocks between bulk writers) and continue from their stored tail.
+    Returns rows written.
+    """
+    if not entries:
+        return 0
+
+    new_trace_ids = set(new_trace_ids)
+    existing = sorted({e["trace_id"] for e in entries} - new_trace_ids)
+    tails: Dict[str, str] = {}
+
+    if existing:
+        conn.execute(
+            sql_text(
+                """
+                SELECT pg_advisory_xact_lock(hashtextextended(t, 0))
+                FROM unnest(CAST(:trace_ids AS text[])) AS t
+                ORDER BY t
+                """
+            ),
+            {"trace_ids": existing},
+        )
+        rows = conn.execute(
+            sql_text(
+                """
+                SELECT DISTINCT ON (trace_id) trace_id, row_hash
+                FROM audit_log
+                WHERE trace_id = ANY(CAST(:trace_ids AS text[]))
+                  AND row_hash IS NOT NULL
+                ORDER BY trace_id, id DESC
+                """
+            ),
+            {"trace_ids": existing},
+        ).fetchall()
+        tails = {r[0]: r[1] for r in rows}
+
+    now = datetime.now(timezone.utc)
+    out: List[tuple] = []
+    for e in entries:
+        trace_id = e["trace_id"]
+        created_at = e.get("created_at") or now
+        prev_hash = tails.get(trace_id, GENESIS_HASH)
+        row_hash = compute_row_hash(prev_hash, trace_id, e["actor"], e["action"], e["details"], created_at)
+        tails[trace_id] = row_hash
+        out.append(
+            (
+                trace_id,
+                e["actor"],
+                e["action"],
+                json.dumps(e["details"], ensure_ascii=False),
+                created_at,
+                prev_hash,
+                row_hash,
+            )
+        )
+
+    return copy_rows("audit_log", _AUDIT_COLUMNS, out, conn=conn)
+
+
+# -------------------------------------------------------------------
+# Checkpoints + verification
+# -------------------------------------------------------------------
+
+def _checkpoint_message(trace_id: str, last_audit_id: int, last_row_hash: str, row_count: int) -> bytes:
+    return canon_json(
+        {
+            "trace_id": trace_id,
+            "last_audit_id": int(last_audit_id),
+            "last_row_hash": last_row_hash,
+            "row_count": int(row_count),
+        }
+    ).encode("utf-8")
+
+
+def _latest_checkpoint(conn, trace_id: str) -> Optional[Dict[str, Any]]:
+    row = conn.execute(
+        text(
+            """
+            SELECT last_audit_id, last_row_hash, row_count, signature
+            FROM audit_checkpoints
+            WHERE trace_id = :trace_id
+            ORDER BY last_audit_id DESC
+            LIMIT 1
+            """
+        ),
+        {"trace_id": trace_id},
+    ).mappings().first()
+    return dict(row) if row else None
+
+
+def _verify_from(
+    conn,
+    trace_id: str,
+    checkpoint: Optional[Dict[str, Any]],
+    archived: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    if checkpoint is not None:
+        expected = hmac_sign_hex(
+            settings.evidence_signing_key_b64,
+            _checkpoint_message(
+                trace_id,
+                checkpoint["last_audit_id"],
+                checkpoint["last_row_hash"],
+                checkpoint["row_count"],
+            ),
+        )
+        if expected != checkpoint["signature"]:
+            return {"ok": False, "error": "checkpoint signature mismatch", "verified_rows": 0}
+        prev_hash = checkpoint["last_row_hash"]
+        after_id = int(checkpoint["last_audit_id"])
+        row_count = int(checkpoint["row_count"])
+    else:
+        prev_hash, after_id, row_count = GENESIS_HASH, 0, 0
+
+    # rows up to the archived tail can no longer be read from audit_log
+    from_archive = archived is not None and int(archived["last_audit_id"]) > after_id
+    if from_archive:
+        prev_hash = archived["last_row_hash"]
+        after_id = int(archived["last_audit_id"])
+        row_count = int(archived["row_count"])
+
+    rows = conn.execute(
+        text(
+            """
+            SELECT id, actor, action, details, created_at, prev_hash, row_hash
+            FROM audit_log
+            WHERE trace_id = :trace_id
+              AND id > :after_id
+              AND row_hash IS NOT NULL
+            ORDER BY id ASC
+            """
+        ).execution_options(stream_results=True, yield_per=1000),
+        {"trace_id": trace_id, "after_id": after_id},
+    ).mappings()
+
+    verified = 0
+    last_id = after_id
+    for r in rows:
+        if r["prev_hash"] != prev_hash:
+            return {"ok": False, "error": "chain break (row missing or reordered)", "broken_at_id": r["id"], "verified_rows": verified}
+        recomputed = compute_row_hash(prev_hash, trace_id, r["actor"], r["action"], r["details"], r["created_at"])
+        if recomputed != r["row_hash"]:
+            return {"ok": False, "error": "row content altered", "broken_at_id": r["id"], "verified_rows": verified}
+        prev_hash = r["row_hash"]
+        last_id = r["id"]
+        verified += 1
+
+    return {
+        "ok": True,
+        "verified_rows": verified,
+        "from_checkpoint": checkpoint is not None and not from_archive,
+        "from_archive": from_archive,
+        "last_audit_id": last_id,
+        "last_row_hash": prev_hash,
+        "row_count": row_count + verified,
+    }
+
+
+def verify_chain(trace_id: str, *, full: bool = False) -> Dict[str, Any]:
+    """
+    Verify the trace's chain. By default starts at the latest signed
+    checkpoint and only re-hashes rows written after it; `full` starts at
+    genesis. Either way, rows of archived partitions are skipped: the live
+    chain must continue from the tail recorded in the archive manifest.
+    """
+    engine = get_engine()
+    with engine.connect() as conn:
+        checkpoint = None if full else _latest_checkpoint(conn, trace_id)
+        return _verify_from(conn, trace_id, checkpoint, archived_chain_tail(trace_id))
+
+
+def write_checkpoint(trace_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify rows since the last checkpoint and, if intact and non-empty,
+    persist a new signed checkpoint at the chain tail.
+    Raises RuntimeError if verification fails.
+    """
+    engine = get_engine()
+    with engine.begin() as conn:
+        result = _verify_from(conn, trace_id, _latest_checkpoint(conn, trace_id), archived_chain_tail(trace_id))
+        if not result["ok"]:
+            raise RuntimeError(f"audit chain verification failed for {trace_id}: {result}")
+        if result["verified_rows"] == 0:
+            return None
+
+        signature = hmac_sign_hex(
+            settings.evidence_signing_key_b64,
+            _checkpoint_message(trace_id, result["last_audit_id"], result["last_row_hash"], result["row_count"]),
+        )
+        conn.execute(
+            text(
+                """
+                INSERT INTO audit_checkpoints (trace_id, last_audit_id, last_row_hash, row_count, signature)
+                VALUES (:trace_id, :last_audit_id, :last_row_hash, :row_count, :signature)
+                """
+            ),
+            {
+                "trace_id": trace_id,
+                "last_audit_id": result["last_audit_id"],
+                "last_row_hash": result["last_row_hash"],
+                "row_count": result["row_count"],
+                "signature": signature,
+            },
+        )
+
+    return {**result, "signature": signature}
+
+
+def traces_needing_checkpoint(since: datetime, limit: int = 1000):
+    """
+    trace_ids with chained rows (created since `since`) newer than their
+    latest checkpoint. `since` keeps the scan to recent partitions.
+    """
+    engine = get_engine()
+    with engine.connect() as conn:
+        return conn.execute(
+            text(
+                """
+                SELECT a.trace_id
+                FROM audit_log a
+                LEFT JOIN LATERAL (
+                    SELECT max(last_audit_id) AS last_audit_id
+                    FROM audit_checkpoints c
+                    WHERE c.trace_id = a.trace_id
+                ) c ON TRUE
+                WHERE a.created_at >= :since
+                  AND a.row_hash IS NOT NULL
+                  AND a.id > COALESCE(c.last_audit_id, 0)
+                GROUP BY a.trace_id
+                LIMIT :limit
+                """
+            ),
+            {"since": since, "limit": limit},
+        ).scalars().all()
@@ -0,0 +1,98 @@
+# services/cortexreasoner/explain_scheduler.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Hashable, Optional, Tuple
+
+from services.cortexreasoner.hypothesis_promoter import _decision_from_confidence
+
+# -------------------------------------------------------------------
+# Explanation scheduler (beliefcore -> cortexreasoner)
+#
+# A new explanation is requested ONLY when:
+#   1. the belief has never been explained (in this process)
+#   2. a promotion threshold (0.60 / 0.85) was crossed
+#   3. |confidence - last explained confidence| >= min_delta
+#   4. the debounce window since the last explanation expired
+#
+# Otherwise the decision is "skip" with a reason the caller records.
+# decide() does not change state: the caller record()s the explanation
+# once it is committed, so a shed or rolled-back one is retried by the
+# next event instead of being debounced. Deterministic for a given clock.
+# -------------------------------------------------------------------
+
+MIN_DELTA = float(os.getenv("EXPLAIN_MIN_CONFIDENCE_DELTA", "0.05"))
+DEBOUNCE_SECONDS = float(os.getenv("EXPLAIN_DEBOUNCE_SECONDS", "300"))
+MAX_TRACKED_BELIEFS = int(os.getenv("EXPLAIN_MAX_TRACKED_BELIEFS", "10000"))
+
+
+@dataclass(frozen=True)
+class ScheduleDecision:
+    explain: bool
+    reason: str
+    prior_confidence: Optional[float] = None
+
+    def to_dict(self):
+        return {
+            "explain": self.explain,
+            "reason": self.reason,
+            "prior_confidence": self.prior_confidence,
+        }
+
+
+class ExplanationScheduler:
+    """
+    Tracks the last explained (confidence, decision band, time) per
+    semantic belief key and decides whether a new explanation is worth it.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_delta: float = MIN_DELTA,
+        debounce_seconds: float = DEBOUNCE_SECONDS,
+        max_keys: int = MAX_TRACKED_BELIEFS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.min_delta = min_delta
+        self.debounce_seconds = debounce_seconds
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (confidence, band, explained_at)
+        self._last: "OrderedDict[Hashable, Tuple[float, str, float]]" = OrderedDict()
+
+    def decide(self, key: Hashable, confidence: float) -> ScheduleDecision:
+        now = self._clock()
+        band, _ = _decision_from_confidence(confidence)
+
+        with self._lock:
+            last = self._last.get(key)
+
+        if last is None:
+            return ScheduleDecision(True, "first_observation")
+
+        last_conf, last_band, last_at = last
+        delta = abs(confidence - last_conf)
+
+        if band != last_band:
+            return ScheduleDecision(True, f"threshold_crossed:{last_band}->{band}", last_conf)
+        if delta >= self.min_delta:
+            return ScheduleDecision(True, f"confidence_delta:{delta:.3f}", last_conf)
+        if now - last_at >= self.debounce_seconds:
+            return ScheduleDecision(True, "debounce_expired", last_conf)
+        return ScheduleDecision(False, f"insignificant_change:{delta:.3f}", last_conf)
+
+    def record(self, key: Hashable, confidence: float) -> None:
+        """Remember that `key` was explained at `confidence` (after commit)."""
+        band, _ = _decision_from_confidence(confidence)
+        now = self._clock()
+        with self._lock:
+            self._last[key] = (confidence, band, now)
+            self._last.move_to_end(key)
+            while len(self._last) > self.max_keys:
+                self._last.popitem(last=False)
+
+scheduler = ExplanationScheduler()
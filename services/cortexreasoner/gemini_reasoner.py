@@ -4,15 +4,16 @@ import json
 import logging
 from typing import Any, Dict, Optional, Tuple
 
-from google import genai
-
 from services.policy.policy_gate import PolicyGate, PolicyViolation
 from services.audit.ai_call_audit import record_ai_call
+from services.cortexreasoner.hypothesis_promoter import _decision_from_confidence
+from services.cortexreasoner.hypothesis_store import find_similar_hypothesis, persist_hypothesis
+from services.cortexreasoner.llm_dispatcher import estimate_tokens
+from services.cortexreasoner.reasoner_backend import get_backend
 
 logger = logging.getLogger(__name__)
 
 MODEL_PRIMARY = os.getenv("GEMINI_REASONER_MODEL", "models/gemini-2.5-flash")
-_client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
 
 
 def _normalize_inputs(*args, **kwargs) -> Tuple[str, Optional[str], Any, Any]:
@@ -50,10 +51,25 @@ def _normalize_inputs(*args, **kwargs) -> Tuple[str, Optional[str], Any, Any]:
     return str(trace_id), belief_id, belief, evidence
 
 
-def explain(*args, **kwargs) -> Dict[str, Any]:
-    trace_id, belief_id, belief, evidence = _normalize_inputs(*args, **kwargs)
+def fallback_explanation(
+    explanation: str = "Model output rejected by policy",
+    calibration: str = "blocked",
+    what_would_change_my_mind: str = "Return valid Phase-1 JSON",
+) -> Dict[str, Any]:
+    """
+    Deterministic, non-actionable explanation used whenever the model
+    output cannot be used (policy rejection, call shed by the dispatcher).
+    """
+    return {
+        "explanation": explanation,
+        "confidence_language": {"level": "unknown", "calibration": calibration},
+        "evidence_ids": [],
+        "what_would_change_my_mind": [what_would_change_my_mind],
+    }
 
-    prompt = f"""
+
+def build_prompt(trace_id: str, belief_id: Optional[str], belief: Any, evidence: Any) -> str:
+    return f"""
 You are a reasoning component.
 
 RULES:
@@ -79,12 +95,95 @@ trace_id = "{trace_id}"
 Return ONLY JSON.
 """.strip()
 
-    response = _client.models.generate_content(
-        model=MODEL_PRIMARY,
-        contents=prompt,
-    )
 
-    raw_text = getattr(response, "text", None) or str(response)
+def estimate_explain_tokens(*args, **kwargs) -> int:
+    """
+    Quota estimate for explain() with the same arguments, from the
+    prompt it will send (see llm_dispatcher.estimate_tokens).
+    """
+    return estimate_tokens(build_prompt(*_normalize_inputs(*args, **kwargs)))
+
+
+# -------------------------------------------------------------------
+# Near-duplicate hypotheses (hypothesis_store / hypothesis_index)
+#
+# Before calling the model, a stored hypothesis of the belief's subject
+# that is a near-duplicate of belief.hypothesis, explained in the same
+# decision band (_decision_from_confidence), is reused: its accepted
+# output is returned, marked with reused_hypothesis_id, and no model
+# call is made (callers that queue explain() on the dispatcher check
+# first, so a reuse costs no quota). With store_hypothesis=True (the phase0 worker) an
+# accepted output is stored as a hypothesis for later reuse and
+# promotion; replay and ad-hoc callers leave production rows alone.
+# -------------------------------------------------------------------
+
+def _belief_field(belief: Any, name: str) -> Any:
+    if isinstance(belief, dict):
+        return belief.get(name)
+    return getattr(belief, name, None)
+
+
+def reuse_similar_explanation(trace_id: str, belief: Any) -> Optional[Dict[str, Any]]:
+    subject = _belief_field(belief, "subject")
+    hypothesis = _belief_field(belief, "hypothesis")
+    confidence = _belief_field(belief, "confidence")
+    if not subject or not hypothesis or confidence is None:
+        return None
+
+    try:
+        similar = find_similar_hypothesis(subject=str(subject), hypothesis=str(hypothesis))
+    except Exception:
+        logger.exception("Hypothesis similarity lookup failed (trace=%s)", trace_id)
+        return None
+
+    if not similar or not isinstance(similar.get("raw_json"), dict):
+        return None
+    if _decision_from_confidence(similar["confidence"])[0] != _decision_from_confidence(float(confidence))[0]:
+        return None
+
+    logger.info("Skipping model call: near-duplicate of hypothesis %s (trace=%s)", similar["id"], trace_id)
+    return {**similar["raw_json"], "reused_hypothesis_id": similar["id"]}
+
+
+def _store_hypothesis(
+    trace_id: str,
+    belief_id: Optional[str],
+    belief: Any,
+    ai_call_audit_id: Optional[int],
+    parsed_json: Dict[str, Any],
+) -> None:
+    subject = _belief_field(belief, "subject")
+    hypothesis = _belief_field(belief, "hypothesis")
+    confidence = _belief_field(belief, "confidence")
+    if not belief_id or not subject or not hypothesis or confidence is None:
+        return
+
+    try:
+        persist_hypothesis(
+            trace_id=trace_id,
+            belief_id=str(belief_id),
+            subject=str(subject),
+            ai_call_audit_id=ai_call_audit_id,
+            hypothesis=str(hypothesis),
+            confidence=float(confidence),
+            evidence_ids=list(parsed_json.get("evidence_ids") or []),
+            raw_json=parsed_json,
+        )
+    except Exception:
+        logger.exception("Hypothesis write failed but continuing (trace=%s)", trace_id)
+
+
+def explain(*args, store_hypothesis: bool = False, **kwargs) -> Dict[str, Any]:
+    trace_id, belief_id, belief, evidence = _normalize_inputs(*args, **kwargs)
+
+    reused = reuse_similar_explanation(trace_id, belief)
+    if reused is not None:
+        return reused
+
+    prompt = build_prompt(trace_id, belief_id, belief, evidence)
+
+    backend = get_backend()
+    raw_text = backend.generate(prompt, model=MODEL_PRIMARY)
 
     parsed_json = None
     policy_status = "REJECTED"
@@ -97,11 +196,12 @@ Return ONLY JSON.
         policy_error = str(e)
 
     # --- ALWAYS audit ---
+    ai_call_audit_id = None
     try:
-        record_ai_call(
+        ai_call_audit_id = record_ai_call(
             trace_id=trace_id,
             phase="phase1",
-            model_name=MODEL_PRIMARY,
+            model_name=backend.audit_model_name(MODEL_PRIMARY),
             prompt=prompt,
             raw_output=raw_text,
             parsed_json=parsed_json,
@@ -112,11 +212,8 @@ Return ONLY JSON.
         logger.exception("AI audit write failed but continuing")
 
     if policy_status == "ACCEPTED":
+        if store_hypothesis:
+            _store_hypothesis(trace_id, belief_id, belief, ai_call_audit_id, parsed_json)
         return parsed_json
 
-    return {
-        "explanation": "Model output rejected by policy",
-        "confidence_language": {"level": "unknown", "calibration": "blocked"},
-        "evidence_ids": [],
-        "what_would_change_my_mind": ["Return valid Phase-1 JSON"],
-    }
+    return fallback_explanation()
@@ -3,8 +3,8 @@ import json
 import logging
 from typing import Any, Dict
 
-from google import genai
 from services.policy.policy_gate import PolicyGate, PolicyViolation
+from services.cortexreasoner.reasoner_backend import get_backend
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +17,6 @@ MODEL_PRIMARY = os.getenv(
     "models/gemini-2.5-flash",
 )
 
-_client = genai.Client(
-    api_key=os.environ.get("GEMINI_API_KEY")
-)
-
 # -------------------------------------------------------------------
 # explain()
 #
@@ -91,13 +87,7 @@ trace_id = "{trace_id}"
 Return ONLY the JSON object.
 """.strip()
 
-    response = _client.models.generate_content(
-        model=MODEL_PRIMARY,
-        contents=prompt,
-    )
-
-    raw_text = getattr(response, "text", None) or str(response)
-    raw_text = raw_text.strip()
+    raw_text = get_backend().generate(prompt, model=MODEL_PRIMARY).strip()
 
     # ----------------------------------------------------------------
     # HARD JSON EXTRACTION (NO TRUST)
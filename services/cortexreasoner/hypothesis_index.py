@@ -0,0 +1,189 @@
+# services/cortexreasoner/hypothesis_index.py
+import hashlib
+import random
+import re
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+# -------------------------------------------------------------------
+# Near-duplicate hypothesis index (MinHash + LSH, CPU only)
+#
+# The model rephrases the same hypothesis many times:
+#   "Issue affecting service/api-gateway"
+#   "service/api-gateway is degraded"
+#   "Issues affecting the service/api-gateway"
+# Exact hashing treats these as different rows. This index maps each
+# rephrasing onto the first (canonical) hypothesis whose token-set
+# Jaccard similarity passes the threshold.
+#
+# - one index per subject; the subject's own tokens are dropped, since
+#   every hypothesis of the subject shares them
+# - negation and state words ("not", "healthy", "degraded", "outage")
+#   must agree exactly: "X is degraded" never matches "X is not degraded"
+#   or "X is healthy", however many other tokens they share
+# - MinHash signatures + banded LSH give sub-linear candidate lookup
+# - candidates are confirmed with exact Jaccard on the token sets
+# - fully deterministic (fixed seed, blake2b token hashing)
+# -------------------------------------------------------------------
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_STOPWORDS = frozenset(
+    {
+        "a", "an", "the", "is", "are", "was", "were", "be", "been", "being",
+        "of", "on", "in", "at", "to", "for", "by", "with", "and", "or",
+        "this", "that", "it", "its", "has", "have", "had", "there",
+    }
+)
+
+
+def _stem(token: str) -> str:
+    for suffix in ("ing", "ed", "es", "s"):
+        if len(token) > len(suffix) + 2 and token.endswith(suffix):
+            token = token[: -len(suffix)]
+            break
+    # "issue"/"issues", "degrade"/"degraded" share a stem
+    if len(token) > 3 and token.endswith("e"):
+        token = token[:-1]
+    return token
+
+
+# tokens that flip meaning ("isn't" tokenizes to isn + t)
+_NEGATIONS = frozenset(
+    _stem(t)
+    for t in ("not", "no", "never", "without", "non", "none", "nor", "isn", "aren", "wasn", "weren", "doesn", "don", "didn")
+)
+
+# state / polarity words: a hypothesis is about exactly one state
+_POLARITY = frozenset(
+    _stem(t)
+    for t in (
+        "healthy", "unhealthy", "degraded", "degradation", "down", "up", "ok",
+        "outage", "issue", "incident", "failing", "failure", "error", "recovered",
+        "resolved", "restored", "normal", "stable", "unstable", "slow", "fast",
+        "available", "unavailable", "latency", "spike", "high", "low",
+    )
+)
+
+
+def shingles(text: str, exclude: FrozenSet[str] = frozenset()) -> FrozenSet[str]:
+    """
+    Normalized token set used for similarity:
+    - lowercase alphanumeric tokens (so "service/api-gateway" -> service, api, gateway)
+    - stopwords and `exclude` (the subject's shingles) removed
+    - light suffix stemming ("affecting" -> "affect")
+    """
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    stems = (_stem(t) for t in tokens if t not in _STOPWORDS)
+    return frozenset(t for t in stems if t not in exclude)
+
+
+def polarity(tokens: FrozenSet[str]) -> Tuple[bool, FrozenSet[str]]:
+    """(negated, state words) of a shingle set; near-duplicates must agree on it."""
+    return bool(tokens & _NEGATIONS), tokens & _POLARITY
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    union = len(a | b)
+    return len(a & b) / union if union else 0.0
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "big"
+    )
+
+
+class HypothesisIndex:
+    """
+    Similarity index for the hypotheses of ONE subject.
+
+    add(key, text)  -> canonical key (existing near-duplicate, or key itself)
+    find(text)      -> canonical key of best near-duplicate, or None
+    """
+
+    def __init__(
+        self,
+        *,
+        subject: str = "",
+        threshold: float = 0.7,
+        num_perm: int = 64,
+        bands: int = 32,
+        seed: int = 1,
+    ):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.threshold = threshold
+        self._exclude = shingles(subject)
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+
+        rng = random.Random(seed)
+        self._perms: List[Tuple[int, int]] = [
+            (rng.randint(1, _MERSENNE_PRIME - 1), rng.randint(0, _MERSENNE_PRIME - 1))
+            for _ in range(num_perm)
+        ]
+
+        self._tokens: Dict[str, FrozenSet[str]] = {}
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [
+            {} for _ in range(bands)
+        ]
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._tokens
+
+    def _signature(self, tokens: FrozenSet[str]) -> List[int]:
+        if not tokens:
+            return [_MAX_HASH] * self.num_perm
+        hashes = [_token_hash(t) for t in tokens]
+        return [
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._perms
+        ]
+
+    def _band_keys(self, signature: List[int]) -> List[Tuple[int, ...]]:
+        r = self.rows
+        return [tuple(signature[i * r:(i + 1) * r]) for i in range(self.bands)]
+
+    def _best_match(self, tokens: FrozenSet[str]) -> Optional[str]:
+        candidates: Set[str] = set()
+        for band, band_key in enumerate(self._band_keys(self._signature(tokens))):
+            candidates |= self._buckets[band].get(band_key, set())
+
+        best_key = None
+        best_score = 0.0
+        state = polarity(tokens)
+        # sorted() keeps tie-breaking deterministic
+        for key in sorted(candidates):
+            if polarity(self._tokens[key]) != state:
+                continue
+            score = jaccard(tokens, self._tokens[key])
+            if score >= self.threshold and score > best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def find(self, text: str) -> Optional[str]:
+        return self._best_match(shingles(text, self._exclude))
+
+    def add(self, key: str, text: str) -> str:
+        if key in self._tokens:
+            return key
+
+        tokens = shingles(text, self._exclude)
+        match = self._best_match(tokens)
+        if match is not None:
+            return match
+
+        self._tokens[key] = tokens
+        for band, band_key in enumerate(self._band_keys(self._signature(tokens))):
+            self._buckets[band].setdefault(band_key, set()).add(key)
+        return key
@@ -27,6 +27,12 @@ def promote_latest_hypothesis_for_trace(
     """
     Load latest hypothesis for (trace_id, belief_id) and write deterministic promotion decision.
     Returns the promotion row (dict) or None if no hypothesis exists.
+
+    Near-duplicate hypotheses share one canonical hypothesis_hash per
+    subject (see hypothesis_store). If the latest decision recorded for
+    that (subject, hypothesis_hash), from any belief, is the one the
+    confidence gives now, it is returned with already_promoted=True
+    instead of being promoted again.
     """
     engine = get_engine()
 
@@ -35,7 +41,8 @@ def promote_latest_hypothesis_for_trace(
         row = conn.execute(
             text(
                 """
-                SELECT id, ai_call_audit_id, hypothesis, confidence, evidence_ids
+                SELECT id, ai_call_audit_id, hypothesis, confidence, evidence_ids,
+                       subject, hypothesis_hash
                 FROM hypotheses
                 WHERE trace_id = :trace_id
                   AND belief_id = :belief_id
@@ -54,9 +61,53 @@ def promote_latest_hypothesis_for_trace(
         hypothesis_text = row[2]
         confidence = float(row[3])
         evidence_ids: List[str] = list(row[4] or [])
+        subject, hypothesis_hash = row[5], row[6]
 
         decision, reason = _decision_from_confidence(confidence)
 
+        if subject is not None:
+            existing = conn.execute(
+                text(
+                    """
+                    SELECT p.decision, p.decision_reason, p.promoted_confidence
+                    FROM hypotheses h
+                    JOIN belief_promotions p ON p.hypothesis_id = h.id
+                    WHERE h.subject = :subject
+                      AND h.hypothesis_hash = :hypothesis_hash
+                    ORDER BY p.id DESC
+                    LIMIT 1
+                    """
+                ),
+                {"subject": subject, "hypothesis_hash": hypothesis_hash},
+            ).fetchone()
+        else:
+            # rows written before hypotheses.subject (012)
+            existing = conn.execute(
+                text(
+                    """
+                    SELECT decision, decision_reason, promoted_confidence
+                    FROM belief_promotions
+                    WHERE belief_id = :belief_id
+                      AND hypothesis_id = :hypothesis_id
+                    LIMIT 1
+                    """
+                ),
+                {"belief_id": belief_id, "hypothesis_id": hypothesis_id},
+            ).fetchone()
+
+        if existing and existing[0] == decision:
+            return {
+                "trace_id": trace_id,
+                "belief_id": belief_id,
+                "hypothesis_id": hypothesis_id,
+                "ai_call_audit_id": ai_call_audit_id,
+                "decision": existing[0],
+                "decision_reason": existing[1],
+                "promoted_confidence": float(existing[2]),
+                "evidence_ids": evidence_ids,
+                "already_promoted": True,
+            }
+
         # persist promotion decision (idempotent)
         conn.execute(
             text(
@@ -105,4 +156,5 @@ def promote_latest_hypothesis_for_trace(
             "decision_reason": reason,
             "promoted_confidence": confidence,
             "evidence_ids": evidence_ids,
+            "already_promoted": False,
         }
@@ -1,43 +1,126 @@
 # services/cortexreasoner/hypothesis_store.py
 import json
 import hashlib
-from typing import Any, Dict, List, Optional
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 from sqlalchemy import text
 from services.shared.db import get_engine
+from services.cortexreasoner.hypothesis_index import HypothesisIndex
+
+# -------------------------------------------------------------------
+# Near-duplicate index configuration
+# -------------------------------------------------------------------
+
+SIMILARITY_THRESHOLD = float(os.getenv("HYPOTHESIS_SIMILARITY_THRESHOLD", "0.7"))
+MAX_INDEXED_BELIEFS = int(os.getenv("HYPOTHESIS_INDEX_MAX_BELIEFS", "1024"))
+
+# subject -> HypothesisIndex, bounded LRU. Scoped by subject, not by
+# belief: every event gets a new belief_id, so rephrasings from earlier
+# events of the same subject must be visible (infra/sql/012).
+_indexes: "OrderedDict[str, HypothesisIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
 
 
 def _sha256(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8", errors="ignore")).hexdigest()
 
 
+def _hypothesis_hash(hypothesis: str) -> str:
+    return _sha256(hypothesis.strip().lower())
+
+
+def _index_for(conn, subject: str) -> HypothesisIndex:
+    """
+    Return the similarity index for one belief subject.
+    Built lazily from already-stored hypotheses (oldest first, so the
+    first stored phrasing stays canonical) and kept in a bounded LRU.
+    """
+    key = subject
+
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    index = HypothesisIndex(subject=subject, threshold=SIMILARITY_THRESHOLD)
+    rows = conn.execute(
+        text(
+            """
+            SELECT hypothesis_hash, hypothesis
+            FROM hypotheses
+            WHERE subject = :subject
+            ORDER BY created_at ASC
+            """
+        ),
+        {"subject": subject},
+    ).fetchall()
+    for hypothesis_hash, hypothesis in rows:
+        index.add(hypothesis_hash, hypothesis)
+
+    with _indexes_lock:
+        # another thread may have built it meanwhile; keep the first one
+        index = _indexes.setdefault(key, index)
+        _indexes.move_to_end(key)
+        while len(_indexes) > MAX_INDEXED_BELIEFS:
+            _indexes.popitem(last=False)
+    return index
+
+
+def _subject_of(conn, belief_id: str) -> Optional[str]:
+    return conn.execute(
+        text("SELECT subject FROM beliefs WHERE belief_id = :belief_id"),
+        {"belief_id": belief_id},
+    ).scalar_one_or_none()
+
+
 def persist_hypothesis(
     *,
     trace_id: str,
     belief_id: str,
+    subject: Optional[str] = None,
     ai_call_audit_id: Optional[int],
     hypothesis: str,
     confidence: float,
     evidence_ids: List[str],
     raw_json: Dict[str, Any],
-) -> None:
+) -> str:
     """
     Persist Phase-1 hypothesis into hypotheses table.
     Dedup enforced by your unique index (trace_id + belief_id + hypothesis_hash).
+
+    Near-duplicate rephrasings of an already-stored hypothesis of the
+    same subject (looked up from the belief if not given) are mapped onto
+    the canonical row's hash, so they hit the same unique index and are
+    not stored (or promoted) again. The shared index only learns the hash
+    after the row committed.
+
+    Returns the canonical hypothesis_hash.
     """
     engine = get_engine()
 
-    hypothesis_hash = _sha256(hypothesis.strip().lower())
     evidence_ids_text = [str(x) for x in evidence_ids]
     raw_json_text = json.dumps(raw_json, ensure_ascii=False)
 
+    own_hash = _hypothesis_hash(hypothesis)
+
     with engine.begin() as conn:
+        subject = subject or _subject_of(conn, belief_id)
+        index = _index_for(conn, subject) if subject else None
+        hypothesis_hash = own_hash
+        if index is not None and own_hash not in index:
+            hypothesis_hash = index.find(hypothesis) or own_hash
+
         conn.execute(
             text(
                 """
                 INSERT INTO hypotheses (
                     trace_id,
                     belief_id,
+                    subject,
                     ai_call_audit_id,
                     hypothesis_hash,
                     hypothesis,
@@ -48,6 +131,7 @@ def persist_hypothesis(
                 VALUES (
                     :trace_id,
                     :belief_id,
+                    :subject,
                     :ai_call_audit_id,
                     :hypothesis_hash,
                     :hypothesis,
@@ -61,6 +145,7 @@ def persist_hypothesis(
             {
                 "trace_id": trace_id,
                 "belief_id": belief_id,
+                "subject": subject,
                 "ai_call_audit_id": ai_call_audit_id,
                 "hypothesis_hash": hypothesis_hash,
                 "hypothesis": hypothesis,
@@ -69,3 +154,58 @@ def persist_hypothesis(
                 "raw_json": raw_json_text,
             },
         )
+
+    # after commit: a rolled-back row must not become a canonical hash
+    if index is not None:
+        index.add(hypothesis_hash, hypothesis)
+
+    return hypothesis_hash
+
+
+def find_similar_hypothesis(
+    *,
+    subject: str,
+    hypothesis: str,
+) -> Optional[Dict[str, Any]]:
+    """
+    Return the stored canonical hypothesis row of `subject` that
+    `hypothesis` is a near-duplicate of, or None. Lets the reasoner skip
+    generating a hypothesis it already has, whichever event produced it.
+    """
+    engine = get_engine()
+
+    with engine.connect() as conn:
+        index = _index_for(conn, subject)
+        hypothesis_hash = _hypothesis_hash(hypothesis)
+        if hypothesis_hash not in index:
+            hypothesis_hash = index.find(hypothesis)
+        if hypothesis_hash is None:
+            return None
+
+        row = conn.execute(
+            text(
+                """
+                SELECT id, hypothesis, confidence, evidence_ids, raw_json
+                FROM hypotheses
+                WHERE subject = :subject
+                  AND hypothesis_hash = :hypothesis_hash
+                ORDER BY created_at ASC
+                LIMIT 1
+                """
+            ),
+            {
+                "subject": subject,
+                "hypothesis_hash": hypothesis_hash,
+            },
+        ).fetchone()
+
+    if not row:
+        return None
+
+    return {
+        "id": int(row[0]),
+        "hypothesis": row[1],
+        "confidence": float(row[2]),
+        "evidence_ids": list(row[3] or []),
+        "raw_json": row[4],
+    }
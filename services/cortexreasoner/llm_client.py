@@ -1,11 +1,33 @@
 from services.shared.config import settings
 import json
+import os
+import threading
 import urllib.request
 
+from services.cortexreasoner.reasoner_backend import StubBackend
+
+# Shared google-genai client, built on first use (not at import) so that
+# workers/CLIs that never call the LLM do not pay for the SDK import.
+_genai_client = None
+_genai_client_lock = threading.Lock()
+
+
+def get_genai_client():
+    global _genai_client
+    if _genai_client is None:
+        with _genai_client_lock:
+            if _genai_client is None:
+                from google import genai
+
+                _genai_client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+    return _genai_client
+
+
 class GeminiClient:
     """
     Single gateway to Gemini (Phase 0 minimal).
     In prod: add retries, model pinning, structured output validation, and request/response logging.
+    Prefer reasoner_backend.get_backend() for new callers.
     """
     def __init__(self, api_key: str | None = None, model: str | None = None):
         self.api_key = api_key or settings.gemini_api_key
@@ -14,12 +36,7 @@ class GeminiClient:
     def generate_json(self, prompt: str) -> dict:
         # Phase 0: if no key, deterministic stub output (keeps pipeline testable)
         if not self.api_key:
-            return {
-                "explanation": "STUB: Gemini API key not configured. Returning deterministic explanation.",
-                "confidence_language": {"tone": "uncertain", "markers": ["stub_mode"]},
-                "evidence_ids": [],
-                "what_would_change_my_mind": ["Configure GEMINI_API_KEY and replay incident."],
-            }
+            return json.loads(StubBackend().generate(prompt, model=self.model))
 
         # NOTE: Endpoint specifics may differ based on Gemini API surface you enable.
         # Keep it minimal here; wire the correct endpoint in your build environment.
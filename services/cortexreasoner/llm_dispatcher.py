@@ -0,0 +1,313 @@
+# services/cortexreasoner/llm_dispatcher.py
+import heapq
+import itertools
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from services.shared.ratelimit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Quota-aware priority dispatcher for LLM calls
+#
+# - Gemini quota modelled as two token buckets: requests/min + tokens/min
+# - Work ordered by (severity, distance to nearest promotion threshold)
+# - Work that cannot get quota before its deadline is SHED to the
+#   caller-provided deterministic fallback (never dropped)
+# - metrics(): queue wait, shed count, quota use; logged every
+#   METRICS_LOG_INTERVAL_S and served by signalmesh /v1/metrics
+# -------------------------------------------------------------------
+
+REQUESTS_PER_MINUTE = float(os.getenv("GEMINI_RPM", "60"))
+TOKENS_PER_MINUTE = float(os.getenv("GEMINI_TPM", "250000"))
+EST_TOKENS_PER_CALL = int(os.getenv("LLM_EST_TOKENS_PER_CALL", "1500"))  # prompt unknown
+EST_CHARS_PER_TOKEN = float(os.getenv("LLM_EST_CHARS_PER_TOKEN", "4"))
+EST_OUTPUT_TOKENS = int(os.getenv("LLM_EST_OUTPUT_TOKENS", "512"))
+DEFAULT_DEADLINE_S = float(os.getenv("LLM_DISPATCH_DEADLINE_S", "30"))
+CONCURRENCY = int(os.getenv("LLM_DISPATCH_CONCURRENCY", "4"))
+METRICS_LOG_INTERVAL_S = float(os.getenv("LLM_DISPATCH_METRICS_LOG_S", "60"))
+
+# lower rank = served first
+SEVERITY_RANK = {
+    "critical": 0,
+    "high": 1,
+    "error": 1,
+    "medium": 2,
+    "warning": 2,
+    "low": 3,
+    "info": 3,
+}
+_DEFAULT_SEVERITY_RANK = 3
+
+PROMOTION_THRESHOLDS = (0.60, 0.85)
+
+
+def priority_of(severity: Optional[str], confidence: Optional[float]) -> Tuple[int, float]:
+    """
+    Deterministic priority key (smaller sorts first):
+      1. severity rank
+      2. distance of confidence to the nearest promotion threshold
+         (beliefs about to flip HOLD/PROMOTE are explained first)
+    """
+    rank = SEVERITY_RANK.get((severity or "").lower(), _DEFAULT_SEVERITY_RANK)
+    if confidence is None:
+        return rank, 1.0
+    distance = min(abs(float(confidence) - t) for t in PROMOTION_THRESHOLDS)
+    return rank, round(distance, 6)
+
+
+def estimate_tokens(prompt: str, *, output_tokens: int = EST_OUTPUT_TOKENS) -> int:
+    """
+    Tokens a call is charged against the tokens/min bucket: the prompt
+    (~EST_CHARS_PER_TOKEN characters per token) plus the output budget.
+    """
+    return int(math.ceil(len(prompt) / EST_CHARS_PER_TOKEN)) + int(output_tokens)
+
+
+class DispatchFuture(Future):
+    """Future of a dispatched call; `shed` is True when it resolved to the fallback."""
+
+    def __init__(self):
+        super().__init__()
+        self.shed = False
+
+
+@dataclass(order=True)
+class _WorkItem:
+    sort_key: Tuple[int, float, int]
+    fn: Callable[..., Any] = field(compare=False)
+    args: Tuple[Any, ...] = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    fallback: Optional[Callable[[], Any]] = field(compare=False)
+    est_tokens: int = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    deadline_at: float = field(compare=False)
+    future: DispatchFuture = field(compare=False)
+
+
+class LLMDispatcher:
+    def __init__(
+        self,
+        *,
+        requests_per_minute: float = REQUESTS_PER_MINUTE,
+        tokens_per_minute: float = TOKENS_PER_MINUTE,
+        concurrency: int = CONCURRENCY,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self._clock = clock
+        self._requests = TokenBucket.per_minute(requests_per_minute, clock=clock)
+        self._tokens = TokenBucket.per_minute(tokens_per_minute, clock=clock)
+        self._executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="llm-dispatch"
+        )
+
+        self._heap: list = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self._metrics_logged_at = time.monotonic()
+
+        self._stats = {
+            "submitted": 0,
+            "dispatched": 0,
+            "completed": 0,
+            "failed": 0,
+            "shed": 0,
+            "queue_wait_count": 0,
+            "queue_wait_sum_s": 0.0,
+            "queue_wait_max_s": 0.0,
+            "quota_requests_used": 0,
+            "quota_tokens_used": 0,
+        }
+
+    # ----------------------------------------------------------------
+    # Public API
+    # ----------------------------------------------------------------
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        *,
+        args: Tuple[Any, ...] = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+        severity: Optional[str] = None,
+        confidence: Optional[float] = None,
+        est_tokens: int = EST_TOKENS_PER_CALL,
+        deadline_s: float = DEFAULT_DEADLINE_S,
+        fallback: Optional[Callable[[], Any]] = None,
+    ) -> DispatchFuture:
+        """
+        Queue fn(*args, **kwargs). The returned Future resolves to fn's
+        result, or to fallback() if the call is shed at its deadline
+        (future.shed tells which).
+        est_tokens should come from estimate_tokens() on the actual prompt;
+        EST_TOKENS_PER_CALL is only a default for callers that cannot.
+        """
+        self._ensure_started()
+        now = self._clock()
+        rank, distance = priority_of(severity, confidence)
+        item = _WorkItem(
+            sort_key=(rank, distance, next(self._seq)),
+            fn=fn,
+            args=tuple(args),
+            kwargs=dict(kwargs or {}),
+            fallback=fallback,
+            est_tokens=int(est_tokens),
+            enqueued_at=now,
+            deadline_at=now + float(deadline_s),
+            future=DispatchFuture(),
+        )
+        with self._cond:
+            heapq.heappush(self._heap, item)
+            self._stats["submitted"] += 1
+            self._cond.notify()
+        return item.future
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queue_depth"] = len(self._heap)
+        count = stats["queue_wait_count"]
+        stats["queue_wait_avg_s"] = stats["queue_wait_sum_s"] / count if count else 0.0
+        stats["quota_requests_available"] = self._requests.available()
+        stats["quota_tokens_available"] = self._tokens.available()
+        return stats
+
+    def shutdown(self) -> None:
+        """
+        Stop dispatching; work still queued is shed to its fallback.
+        """
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    # ----------------------------------------------------------------
+    # Dispatch loop
+    # ----------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="llm-dispatcher", daemon=True
+                )
+                self._thread.start()
+
+    def _quota_wait(self, est_tokens: int) -> float:
+        return max(self._requests.wait_time(1), self._tokens.wait_time(est_tokens))
+
+    def _run(self) -> None:
+        while True:
+            log_metrics = False
+            with self._cond:
+                while not self._heap and not self._stopped:
+                    self._cond.wait(timeout=METRICS_LOG_INTERVAL_S)
+                    if self._metrics_due():
+                        break
+                if self._stopped and not self._heap:
+                    return
+                now = self._clock()
+                log_metrics = self._metrics_due()
+
+                # shed everything that can no longer get quota in time, not
+                # just the head: work queued behind a stream of higher-priority
+                # calls must still resolve at its deadline
+                shed = [
+                    item for item in self._heap
+                    if self._stopped or now + self._quota_wait(item.est_tokens) > item.deadline_at
+                ]
+                if shed:
+                    shed_ids = {id(item) for item in shed}
+                    self._heap = [item for item in self._heap if id(item) not in shed_ids]
+                    heapq.heapify(self._heap)
+                    for item in shed:
+                        self._stats["shed"] += 1
+                        self._record_wait(now - item.enqueued_at)
+
+                dispatch = None
+                if self._heap:
+                    item = self._heap[0]
+                    if self._quota_wait(item.est_tokens) > 0:
+                        if not shed:
+                            # re-evaluate on timeout or when new (maybe higher-priority) work arrives
+                            self._cond.wait(timeout=min(self._quota_wait(item.est_tokens), 0.25))
+                    else:
+                        heapq.heappop(self._heap)
+                        self._requests.try_acquire(1)
+                        self._tokens.try_acquire(item.est_tokens)
+                        self._stats["dispatched"] += 1
+                        self._stats["quota_requests_used"] += 1
+                        self._stats["quota_tokens_used"] += item.est_tokens
+                        self._record_wait(now - item.enqueued_at)
+                        dispatch = item
+
+            for item in shed:
+                self._shed(item)
+            if dispatch is not None:
+                self._executor.submit(self._execute, dispatch)
+            if log_metrics:
+                logger.info("LLM dispatcher metrics: %s", self.metrics())
+
+    def _metrics_due(self) -> bool:
+        now = time.monotonic()
+        if now - self._metrics_logged_at < METRICS_LOG_INTERVAL_S:
+            return False
+        self._metrics_logged_at = now
+        return True
+
+    def _record_wait(self, waited: float) -> None:
+        self._stats["queue_wait_count"] += 1
+        self._stats["queue_wait_sum_s"] += waited
+        self._stats["queue_wait_max_s"] = max(self._stats["queue_wait_max_s"], waited)
+
+    def _shed(self, item: _WorkItem) -> None:
+        logger.warning("LLM call shed at deadline (priority=%s)", item.sort_key[:2])
+        item.future.shed = True
+        if item.fallback is None:
+            item.future.set_exception(TimeoutError("LLM call shed: quota unavailable before deadline"))
+            return
+        try:
+            item.future.set_result(item.fallback())
+        except Exception as e:
+            item.future.set_exception(e)
+
+    def _execute(self, item: _WorkItem) -> None:
+        try:
+            result = item.fn(*item.args, **item.kwargs)
+        except Exception as e:
+            with self._cond:
+                self._stats["failed"] += 1
+            item.future.set_exception(e)
+            return
+        with self._cond:
+            self._stats["completed"] += 1
+        item.future.set_result(result)
+
+
+_dispatcher: Optional[LLMDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher() -> LLMDispatcher:
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                _dispatcher = LLMDispatcher()
+    return _dispatcher
+
+
+def dispatcher_metrics() -> Optional[Dict[str, Any]]:
+    """metrics() of this process's dispatcher, or None if nothing was dispatched yet."""
+    return _dispatcher.metrics() if _dispatcher is not None else None
@@ -0,0 +1,258 @@
+# services/cortexreasoner/reasoner_backend.py
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# -------------------------------------------------------------------
+# Reasoner backends
+#
+# One interface for every way we reach an LLM:
+#   gemini    -> live google-genai call
+#   stub      -> deterministic JSON (no network, no key)
+#   cassette  -> record live/stub outputs to JSONL, or replay them with a
+#                configurable latency distribution (offline load tests)
+#
+# Selected by REASONER_BACKEND; defaults to gemini when GEMINI_API_KEY
+# is set, stub otherwise.
+# -------------------------------------------------------------------
+
+
+class CassetteMiss(LookupError):
+    pass
+
+
+class ReasonerBackend(ABC):
+    name = "abstract"
+
+    @abstractmethod
+    def generate(self, prompt: str, *, model: str) -> str:
+        """Return the raw model text for prompt."""
+
+    def audit_model_name(self, model: str) -> str:
+        # ai_call_audit must never claim a live model produced stub/replayed text
+        return model if self.name == "gemini" else f"{self.name}:{model}"
+
+
+class GeminiBackend(ReasonerBackend):
+    name = "gemini"
+
+    def generate(self, prompt: str, *, model: str) -> str:
+        from services.cortexreasoner.llm_client import get_genai_client
+
+        response = get_genai_client().models.generate_content(
+            model=model,
+            contents=prompt,
+        )
+        return getattr(response, "text", None) or str(response)
+
+
+class StubBackend(ReasonerBackend):
+    name = "stub"
+
+    def generate(self, prompt: str, *, model: str) -> str:
+        return json.dumps(
+            {
+                "explanation": "STUB: Gemini API key not configured. Returning deterministic explanation.",
+                "confidence_language": {"level": "uncertain", "calibration": "stub_mode"},
+                "evidence_ids": [],
+                "what_would_change_my_mind": ["Configure GEMINI_API_KEY and replay incident."],
+            }
+        )
+
+
+# -------------------------------------------------------------------
+# Latency models (milliseconds)
+#   fixed:200 | uniform:100,400 | lognormal:mu,sigma | recorded
+# -------------------------------------------------------------------
+
+
+class LatencyModel:
+    def __init__(self, spec: str = "fixed:0", seed: int = 0):
+        self.spec = spec
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2, "recorded": 0}
+        if self.kind not in expected or len(self.params) != expected[self.kind]:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+
+    def sample_ms(self, recorded_ms: Optional[float] = None) -> float:
+        with self._lock:
+            if self.kind == "fixed":
+                return self.params[0]
+            if self.kind == "uniform":
+                return self._rng.uniform(self.params[0], self.params[1])
+            if self.kind == "lognormal":
+                return self._rng.lognormvariate(self.params[0], self.params[1])
+        return float(recorded_ms or 0.0)
+
+
+# Volatile prompt fragments (generated ids, object addresses, timestamps)
+# are masked so replays match across runs.
+_VOLATILE_PATTERNS = (
+    (re.compile(r"\b[a-z]{3}_[0-9a-f]{32}\b"), "<id>"),
+    (re.compile(r"0x[0-9a-fA-F]+"), "<addr>"),
+    (re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?([+-]\d{2}:\d{2}|Z)?"), "<ts>"),
+)
+
+
+def cassette_key(model: str, prompt: str) -> str:
+    masked = prompt
+    for pattern, repl in _VOLATILE_PATTERNS:
+        masked = pattern.sub(repl, masked)
+    return hashlib.sha256(f"{model}\n{masked}".encode("utf-8")).hexdigest()
+
+
+class CassetteBackend(ReasonerBackend):
+    """
+    mode="record": call `inner`, append {key, model, output, latency_ms} to path
+    mode="replay": serve recorded outputs, sleeping per `latency`
+    on_miss (replay): "error" | "cycle" (next recording, round-robin) | "stub"
+    """
+
+    name = "cassette"
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        mode: str = "replay",
+        inner: Optional[ReasonerBackend] = None,
+        latency: Optional[LatencyModel] = None,
+        on_miss: str = "cycle",
+        sleep=time.sleep,
+    ):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Invalid cassette mode: {mode!r}")
+        if on_miss not in ("error", "cycle", "stub"):
+            raise ValueError(f"Invalid cassette on_miss: {on_miss!r}")
+
+        self.path = path
+        self.mode = mode
+        self.inner = inner or GeminiBackend()
+        self.latency = latency or LatencyModel("recorded")
+        self.on_miss = on_miss
+        self._sleep = sleep
+        self._lock = threading.Lock()
+
+        self._by_key: Dict[str, Dict[str, Any]] = {}
+        self._entries: List[Dict[str, Any]] = []
+        self._cursor = 0
+        if mode == "replay":
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self._entries.append(entry)
+                self._by_key.setdefault(entry["key"], entry)
+        logger.info("Loaded %d cassette entries from %s", len(self._entries), self.path)
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._by_key.get(key)
+            if entry is None and self.on_miss == "cycle" and self._entries:
+                entry = self._entries[self._cursor % len(self._entries)]
+                self._cursor += 1
+            return entry
+
+    def generate(self, prompt: str, *, model: str) -> str:
+        key = cassette_key(model, prompt)
+
+        if self.mode == "record":
+            started = time.perf_counter()
+            output = self.inner.generate(prompt, model=model)
+            latency_ms = (time.perf_counter() - started) * 1000.0
+            line = json.dumps(
+                {"key": key, "model": model, "output": output, "latency_ms": round(latency_ms, 3)},
+                ensure_ascii=False,
+            )
+            with self._lock:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            return output
+
+        entry = self._lookup(key)
+        if entry is None:
+            if self.on_miss == "stub":
+                output, recorded_ms = StubBackend().generate(prompt, model=model), None
+            else:
+                raise CassetteMiss(f"No cassette entry for key {key[:12]} ({self.path})")
+        else:
+            output, recorded_ms = entry["output"], entry.get("latency_ms")
+
+        delay_ms = self.latency.sample_ms(recorded_ms)
+        if delay_ms > 0:
+            self._sleep(delay_ms / 1000.0)
+        return output
+
+
+# -------------------------------------------------------------------
+# Process-wide backend selection
+# -------------------------------------------------------------------
+
+_backend: Optional[ReasonerBackend] = None
+_backend_lock = threading.Lock()
+
+
+def _backend_from_env() -> ReasonerBackend:
+    """
+    REASONER_BACKEND, or gemini when it is unset. The stub never stands in
+    for a missing GEMINI_API_KEY: its canned explanations would be stored
+    as real ones, so a misconfigured process fails here instead.
+    """
+    kind = os.getenv("REASONER_BACKEND", "").strip().lower() or "gemini"
+
+    if kind == "gemini":
+        if not os.getenv("GEMINI_API_KEY"):
+            raise RuntimeError("GEMINI_API_KEY is not set; set it, or REASONER_BACKEND=stub for local dev")
+        return GeminiBackend()
+    if kind == "stub":
+        return StubBackend()
+    if kind == "cassette":
+        mode = os.getenv("REASONER_CASSETTE_MODE", "replay")
+        inner_kind = os.getenv("REASONER_CASSETTE_INNER", "gemini")
+        return CassetteBackend(
+            os.getenv("REASONER_CASSETTE_PATH", "reasoner_cassette.jsonl"),
+            mode=mode,
+            inner=StubBackend() if inner_kind == "stub" else GeminiBackend(),
+            latency=LatencyModel(
+                os.getenv("REASONER_CASSETTE_LATENCY", "recorded"),
+                seed=int(os.getenv("REASONER_CASSETTE_SEED", "0")),
+            ),
+            on_miss=os.getenv("REASONER_CASSETTE_ON_MISS", "cycle"),
+        )
+    raise ValueError(f"Unknown REASONER_BACKEND: {kind!r}")
+
+
+def get_backend() -> ReasonerBackend:
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = _backend_from_env()
+                logger.info("Reasoner backend: %s", _backend.name)
+    return _backend
+
+
+def set_backend(backend: Optional[ReasonerBackend]) -> None:
+    """Override the process-wide backend (tests, load harnesses). None resets."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
@@ -0,0 +1,77 @@
+# services/evidencevault/cache.py
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# -------------------------------------------------------------------
+# Read-through cache for evidence responses
+#
+# Evidence snapshots are content-addressed (sha256) and never change
+# once written, so a serialized response can be kept until evicted:
+# there is nothing to invalidate. Bounded by the bytes of the cached
+# bodies; snapshots larger than MAX_ENTRY_BYTES are served but not kept.
+# -------------------------------------------------------------------
+
+MAX_BYTES = int(os.getenv("EVIDENCE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+MAX_ENTRY_BYTES = int(os.getenv("EVIDENCE_CACHE_MAX_ENTRY_BYTES", str(1024 * 1024)))
+
+Entry = Tuple[str, bytes]  # (etag, response body)
+
+
+class EvidenceCache:
+    """Thread-safe LRU of evidence_id -> (etag, body), bounded by total bytes."""
+
+    def __init__(self, *, max_bytes: int = MAX_BYTES, max_entry_bytes: int = MAX_ENTRY_BYTES):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Entry]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "oversize": 0}
+
+    @staticmethod
+    def _size(evidence_id: str, entry: Entry) -> int:
+        return len(evidence_id) + len(entry[0]) + len(entry[1])
+
+    def get(self, evidence_id: str) -> Optional[Entry]:
+        with self._lock:
+            entry = self._entries.get(evidence_id)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(evidence_id)
+            self._stats["hits"] += 1
+            return entry
+
+    def put(self, evidence_id: str, etag: str, body: bytes) -> bool:
+        """Cache a response; returns False if it is too large to keep."""
+        entry = (etag, body)
+        size = self._size(evidence_id, entry)
+        with self._lock:
+            if size > self.max_entry_bytes:
+                self._stats["oversize"] += 1
+                return False
+            previous = self._entries.pop(evidence_id, None)
+            if previous is not None:
+                self._bytes -= self._size(evidence_id, previous)
+            self._entries[evidence_id] = entry
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                key, evicted = self._entries.popitem(last=False)
+                self._bytes -= self._size(key, evicted)
+                self._stats["evictions"] += 1
+            return True
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+            }
+
+
+evidence_cache = EvidenceCache()
@@ -1,15 +1,112 @@
 import os
-from sqlalchemy import create_engine
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Sequence
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import Result
+from sqlalchemy.pool import QueuePool
 from services.shared.config import Settings
 
 _ENGINE = None
+_READ_ENGINE = None
+_ASYNC_ENGINE = None
 
+# -------------------------------------------------
+# Pool / statement settings (env overridable)
+# -------------------------------------------------
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE_S = int(os.getenv("DB_POOL_RECYCLE", "1800"))
 
-def get_engine():
-    global _ENGINE
-    if _ENGINE is not None:
-        return _ENGINE
+# psycopg3 turns a statement into a server-side prepared statement after it
+# ran this many times on a connection. "none" disables (e.g. PgBouncer in
+# transaction mode); "0" prepares on first use.
+PREPARE_THRESHOLD = os.getenv("DB_PREPARE_THRESHOLD", "5")
+
+# Read replica for read-only endpoints / reporting. Unset: reads share the
+# primary engine. Its pool is sized separately so large audit pulls do not
+# take connections away from ingestion.
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", str(POOL_SIZE)))
+READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", str(MAX_OVERFLOW)))
+
+_IDENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+
+
+# -------------------------------------------------
+# Pool checkout instrumentation
+# -------------------------------------------------
+
+class _PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_sum_s = 0.0
+        self.wait_max_s = 0.0
+
+    def record(self, waited: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_sum_s += waited
+            if waited > self.wait_max_s:
+                self.wait_max_s = waited
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "wait_sum_s": self.wait_sum_s,
+                "wait_max_s": self.wait_max_s,
+                "wait_avg_s": self.wait_sum_s / self.checkouts if self.checkouts else 0.0,
+            }
+
+
+_POOL_STATS = {"write": _PoolStats(), "read": _PoolStats()}
+
+
+class _InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited (incl. connect)."""
+
+    stats_role = "write"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            _POOL_STATS[self.stats_role].record(time.perf_counter() - started)
+
+
+class _InstrumentedReadQueuePool(_InstrumentedQueuePool):
+    stats_role = "read"
+
+
+def pool_stats(role: str = "write") -> Dict[str, Any]:
+    """
+    Checkout wait + pool occupancy of the "write" (primary) or "read" engine.
+    """
+    stats = _POOL_STATS[role].snapshot()
+    engine = _ENGINE if role == "write" else _READ_ENGINE
+    if engine is not None:
+        pool = engine.pool
+        stats.update(
+            {
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+                "checked_in": pool.checkedin(),
+            }
+        )
+    return stats
 
+
+def _resolve_db_url() -> str:
     # -------------------------------------------------
     # 1. Cloud / CI / prod override
     # -------------------------------------------------
@@ -40,10 +137,300 @@ def get_engine():
 
         db_url = f"postgresql+psycopg://{user}:{password}@{host}:{port}/{db}"
 
-    _ENGINE = create_engine(
+    return db_url
+
+
+def _connect_args(db_url: str) -> Dict[str, Any]:
+    if not db_url.startswith("postgresql+psycopg"):
+        return {}
+    threshold = PREPARE_THRESHOLD.strip().lower()
+    return {"prepare_threshold": None if threshold == "none" else int(threshold)}
+
+
+def _create_engine(
+    db_url: str,
+    *,
+    poolclass=_InstrumentedQueuePool,
+    pool_size: int = POOL_SIZE,
+    max_overflow: int = MAX_OVERFLOW,
+):
+    return create_engine(
         db_url,
         pool_pre_ping=True,
         future=True,
+        poolclass=poolclass,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=POOL_TIMEOUT_S,
+        pool_recycle=POOL_RECYCLE_S,
+        connect_args=_connect_args(db_url),
     )
 
+
+def get_engine():
+    global _ENGINE
+    if _ENGINE is not None:
+        return _ENGINE
+
+    _ENGINE = _create_engine(_resolve_db_url())
+
     return _ENGINE
+
+
+def get_read_engine():
+    """
+    Engine for read-only queries: the replica at DATABASE_READ_URL,
+    or the primary engine when no replica is configured.
+    """
+    global _READ_ENGINE
+    if _READ_ENGINE is not None:
+        return _READ_ENGINE
+    if not DATABASE_READ_URL:
+        return get_engine()
+
+    _READ_ENGINE = _create_engine(
+        DATABASE_READ_URL,
+        poolclass=_InstrumentedReadQueuePool,
+        pool_size=READ_POOL_SIZE,
+        max_overflow=READ_MAX_OVERFLOW,
+    )
+
+    return _READ_ENGINE
+
+
+def get_async_engine():
+    """
+    AsyncEngine on the primary (psycopg3 async driver) for the async
+    ingest path. sqlalchemy.ext.asyncio needs greenlet, so it is imported
+    here rather than by every process that uses the sync engine.
+    """
+    global _ASYNC_ENGINE
+    if _ASYNC_ENGINE is not None:
+        return _ASYNC_ENGINE
+
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    db_url = _resolve_db_url()
+    _ASYNC_ENGINE = create_async_engine(
+        db_url,
+        pool_pre_ping=True,
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_timeout=POOL_TIMEOUT_S,
+        pool_recycle=POOL_RECYCLE_S,
+        connect_args=_connect_args(db_url),
+    )
+
+    return _ASYNC_ENGINE
+
+
+# -------------------------------------------------
+# Read-your-writes sessions
+#
+# Inside read_your_writes(), write helpers remember the primary's WAL
+# position after they commit. exec_read() only answers from the replica
+# once it has replayed up to that position, otherwise from the primary.
+# The position can be handed to a client (current_write_lsn()) and passed
+# back on a later request: read_your_writes(lsn).
+# -------------------------------------------------
+
+class _Session:
+    def __init__(self, lsn: Optional[str] = None):
+        self.lsn = lsn
+
+
+_SESSION: ContextVar[Optional[_Session]] = ContextVar("db_read_your_writes", default=None)
+
+
+def _lsn_value(lsn: str) -> int:
+    hi, lo = lsn.split("/")
+    return (int(hi, 16) << 32) | int(lo, 16)
+
+
+def _session_advance(lsn: Optional[str]) -> None:
+    session = _SESSION.get()
+    if session is None or not lsn:
+        return
+    if session.lsn is None or _lsn_value(lsn) > _lsn_value(session.lsn):
+        session.lsn = lsn
+
+
+@contextmanager
+def read_your_writes(lsn: Optional[str] = None) -> Iterator[_Session]:
+    """
+    Session-level read-your-writes guarantee for the enclosed code
+    (optionally seeded with an LSN returned by an earlier request).
+    """
+    token = _SESSION.set(_Session(lsn or None))
+    try:
+        yield _SESSION.get()
+    finally:
+        _SESSION.reset(token)
+
+
+def current_write_lsn() -> Optional[str]:
+    session = _SESSION.get()
+    return session.lsn if session is not None else None
+
+
+def record_write() -> Optional[str]:
+    """
+    Call after committing through get_engine() directly (the helpers below
+    do it themselves). No-op outside read_your_writes().
+    """
+    if _SESSION.get() is None:
+        return None
+    with get_engine().connect() as conn:
+        lsn = conn.execute(sql_text("SELECT pg_current_wal_lsn()::text")).scalar_one()
+    _session_advance(lsn)
+    return lsn
+
+
+async def arecord_write() -> Optional[str]:
+    """record_write() for code that committed through get_async_engine()."""
+    if _SESSION.get() is None:
+        return None
+    async with get_async_engine().connect() as conn:
+        lsn = (await conn.execute(sql_text("SELECT pg_current_wal_lsn()::text"))).scalar_one()
+    _session_advance(lsn)
+    return lsn
+
+
+# -------------------------------------------------
+# Statement helpers
+# -------------------------------------------------
+
+@lru_cache(maxsize=512)
+def sql_text(sql: str):
+    """
+    Cached text() construct: bind-param parsing happens once per distinct
+    SQL string, and the identical statement text lets psycopg promote hot
+    queries to server-side prepared statements.
+    """
+    return text(sql)
+
+
+def exec_sql(sql: str, **params: Any) -> Result:
+    """
+    Execute one statement in its own transaction.
+    Row-returning results are fully buffered, so .mappings()/.all()/.first()
+    work after the connection went back to the pool.
+    """
+    with get_engine().begin() as conn:
+        result = conn.execute(sql_text(sql), params)
+        if result.returns_rows:
+            result = result.freeze()()
+    record_write()
+    return result
+
+
+def exec_read(sql: str, **params: Any) -> Result:
+    """
+    Like exec_sql, for read-only statements: runs on the read engine.
+    Inside read_your_writes(), falls back to the primary while the replica
+    has not replayed the session's last write. A server that is not in
+    recovery (pg_last_wal_replay_lsn() IS NULL) is the primary itself.
+    """
+    session = _SESSION.get()
+    engine = get_read_engine()
+
+    if session is not None and session.lsn and engine is not get_engine():
+        with engine.connect() as conn:
+            caught_up = conn.execute(sql_text(_CAUGHT_UP_SQL), {"lsn": session.lsn}).scalar_one()
+            if caught_up:
+                return conn.execute(sql_text(sql), params).freeze()()
+        engine = get_engine()
+
+    with engine.connect() as conn:
+        return conn.execute(sql_text(sql), params).freeze()()
+
+
+_CAUGHT_UP_SQL = """
+    SELECT pg_last_wal_replay_lsn() IS NULL
+        OR pg_last_wal_replay_lsn() >= CAST(:lsn AS pg_lsn)
+"""
+
+
+def read_engine():
+    """
+    The engine exec_read() would answer from right now: the read engine,
+    or the primary while it has not replayed the session's last write.
+    Resolve it inside read_your_writes() before handing it to code that
+    runs outside the session (e.g. a streaming response).
+    """
+    session = _SESSION.get()
+    engine = get_read_engine()
+    if session is None or not session.lsn or engine is get_engine():
+        return engine
+    with engine.connect() as conn:
+        caught_up = conn.execute(sql_text(_CAUGHT_UP_SQL), {"lsn": session.lsn}).scalar_one()
+    return engine if caught_up else get_engine()
+
+
+def stream_read(sql: str, *, engine=None, chunk_size: int = 1000, **params: Any) -> Iterator[Mapping[str, Any]]:
+    """
+    Yield the rows of a read-only statement as mappings through a
+    server-side cursor, `chunk_size` rows per fetch, so memory does not
+    grow with the result. The connection is held until the generator is
+    exhausted or closed.
+    """
+    engine = engine or read_engine()
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(
+            sql_text(sql), params
+        )
+        yield from result.mappings()
+
+
+def executemany(sql: str, rows: Sequence[Mapping[str, Any]], conn=None) -> int:
+    """
+    Execute one statement for many parameter sets (psycopg pipelines these
+    into a single round trip batch). Uses `conn` if given, else its own
+    transaction. Returns the number of parameter sets sent.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    if conn is not None:
+        conn.execute(sql_text(sql), rows)
+        return len(rows)
+    with get_engine().begin() as own:
+        own.execute(sql_text(sql), rows)
+    record_write()
+    return len(rows)
+
+
+def copy_rows(
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    conn=None,
+) -> int:
+    """
+    Stream rows into `table` with COPY ... FROM STDIN (psycopg3).
+    Values go through psycopg's COPY adaptation: pass jsonb as JSON text.
+    Uses `conn` (a SQLAlchemy Connection) if given, else its own transaction.
+    Returns rows written.
+    """
+    for ident in (table, *columns):
+        if not _IDENT_RE.match(ident):
+            raise ValueError(f"Invalid SQL identifier: {ident!r}")
+
+    statement = f"COPY {table} ({', '.join(columns)}) FROM STDIN"
+
+    def _copy(sa_conn) -> int:
+        written = 0
+        dbapi_conn = sa_conn.connection.driver_connection
+        with dbapi_conn.cursor() as cur:
+            with cur.copy(statement) as copy:
+                for row in rows:
+                    copy.write_row(row)
+                    written += 1
+        return written
+
+    if conn is not None:
+        return _copy(conn)
+    with get_engine().begin() as own:
+        written = _copy(own)
+    record_write()
+    return written
@@ -40,7 +40,10 @@ def snapshot_evidence(trace_id: str, payload: dict):
                     :created_at
                 )
                 ON CONFLICT (sha256) DO UPDATE
-                SET trace_id = EXCLUDED.trace_id
+                -- no-op update so RETURNING yields the existing row: a
+                -- snapshot is immutable and keeps its first trace, later
+                -- traces are linked through evidence_provenance
+                SET trace_id = evidence_snapshots.trace_id
                 RETURNING evidence_id
             """),
             {
@@ -0,0 +1,175 @@
+import hashlib
+import logging
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+
+from services.shared.db import get_engine
+
+log = logging.getLogger("migrations")
+
+# -------------------------------------------------------------------
+# Versioned schema migrations
+#
+# infra/sql/NNN_<name>.sql files are applied in version order, each in
+# its own transaction, and recorded in schema_migrations together with a
+# checksum of the file. Concurrent runners serialize on an advisory lock.
+#
+# Databases set up by hand before the runner existed: the shipped files
+# are idempotent, so a plain run simply records them; --baseline VERSION
+# marks files up to VERSION as applied without executing them.
+# -------------------------------------------------------------------
+
+MIGRATIONS_DIR = os.getenv(
+    "MIGRATIONS_DIR",
+    str(Path(__file__).resolve().parents[2] / "infra" / "sql"),
+)
+
+# arbitrary constant shared by every runner
+_LOCK_KEY = 0x766F78636F7274
+
+_FILE_RE = re.compile(r"^(?P<version>\d{3,})_(?P<name>[A-Za-z0-9_]+)\.sql$")
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    name: str
+    path: str
+    checksum: str
+
+    def sql(self) -> str:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return f.read()
+
+
+def discover(migrations_dir: Optional[str] = None) -> List[Migration]:
+    """
+    All NNN_<name>.sql files in `migrations_dir`, lowest version first.
+    """
+    migrations_dir = migrations_dir or MIGRATIONS_DIR
+    found: Dict[str, Migration] = {}
+
+    for entry in sorted(os.listdir(migrations_dir)):
+        m = _FILE_RE.match(entry)
+        if not m:
+            continue
+        path = os.path.join(migrations_dir, entry)
+        with open(path, "rb") as f:
+            checksum = hashlib.sha256(f.read()).hexdigest()
+        version = m.group("version")
+        if version in found:
+            raise RuntimeError(f"Duplicate migration version {version}: {found[version].path}, {path}")
+        found[version] = Migration(version, m.group("name"), path, checksum)
+
+    return sorted(found.values(), key=lambda mig: int(mig.version))
+
+
+def _ensure_table(conn) -> None:
+    conn.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+              version TEXT PRIMARY KEY,
+              name TEXT NOT NULL,
+              checksum TEXT NOT NULL,
+              applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+            )
+            """
+        )
+    )
+
+
+def _applied(conn) -> Dict[str, str]:
+    rows = conn.execute(text("SELECT version, checksum FROM schema_migrations")).fetchall()
+    return {r[0]: r[1] for r in rows}
+
+
+def _record(conn, migration: Migration) -> None:
+    conn.execute(
+        text(
+            """
+            INSERT INTO schema_migrations (version, name, checksum)
+            VALUES (:version, :name, :checksum)
+            """
+        ),
+        {"version": migration.version, "name": migration.name, "checksum": migration.checksum},
+    )
+
+
+def _run_script(conn, sql: str) -> None:
+    # Whole file in one execute: without bind params psycopg sends it as a
+    # simple query, so multiple statements and $$ bodies work as in psql.
+    with conn.connection.driver_connection.cursor() as cur:
+        cur.execute(sql)
+
+
+def status(engine=None, migrations_dir: Optional[str] = None) -> List[Dict[str, object]]:
+    """
+    One entry per migration file: version, name, applied, checksum_changed.
+    """
+    engine = engine or get_engine()
+    with engine.begin() as conn:
+        _ensure_table(conn)
+        applied = _applied(conn)
+
+    return [
+        {
+            "version": mig.version,
+            "name": mig.name,
+            "applied": mig.version in applied,
+            "checksum_changed": mig.version in applied and applied[mig.version] != mig.checksum,
+        }
+        for mig in discover(migrations_dir)
+    ]
+
+
+def migrate(
+    engine=None,
+    *,
+    migrations_dir: Optional[str] = None,
+    target: Optional[str] = None,
+    baseline: Optional[str] = None,
+    dry_run: bool = False,
+) -> List[str]:
+    """
+    Apply pending migrations up to `target` (default: all).
+    `baseline`: record migrations up to that version as applied without
+    running them. Returns the versions applied (or recorded).
+    """
+    engine = engine or get_engine()
+    done: List[str] = []
+
+    for mig in discover(migrations_dir):
+        if target is not None and int(mig.version) > int(target):
+            break
+
+        with engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY})
+            _ensure_table(conn)
+            applied = _applied(conn)
+
+            if mig.version in applied:
+                if applied[mig.version] != mig.checksum:
+                    log.warning("migration %s_%s changed after it was applied", mig.version, mig.name)
+                continue
+
+            if dry_run:
+                log.info("pending %s_%s", mig.version, mig.name)
+                done.append(mig.version)
+                continue
+
+            if baseline is not None and int(mig.version) <= int(baseline):
+                log.info("baseline %s_%s (not executed)", mig.version, mig.name)
+            else:
+                log.info("applying %s_%s", mig.version, mig.name)
+                _run_script(conn, mig.sql())
+
+            _record(conn, mig)
+            done.append(mig.version)
+
+    return done
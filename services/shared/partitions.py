@@ -0,0 +1,416 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from services.shared.db import get_engine
+
+log = logging.getLogger("partitions")
+
+# -------------------------------------------------------------------
+# Monthly created_at partitions (see infra/sql/002_time_partitioning.sql)
+#
+# - ensure_partitions(): create current + upcoming month partitions
+# - archive_partitions(): export old partitions to gzip JSONL + manifest,
+#   then DETACH + DROP them
+# - archived_chain_tail(): where a trace's audit chain resumes after its
+#   archived rows
+# - read_archived(): transparent reads of archived rows by trace_id,
+#   in (created_at, row key) order
+# - archived_rows(): the same rows, cached until the manifest changes
+# -------------------------------------------------------------------
+
+PARTITIONED_TABLES = ("events", "belief_deltas", "audit_log", "ai_call_audit")
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+MANIFEST_NAME = "manifest.json"
+ARCHIVE_CACHE_MAX_ROWS = int(os.getenv("ARCHIVE_CACHE_MAX_ROWS", "200000"))
+
+# tie-break after created_at: rows are archived (and read) in this order
+_ROW_KEY = {"events": "event_id"}
+_DEFAULT_ROW_KEY = "id"
+
+_PARTITION_RE = re.compile(r"^(?P<table>[a-z_]+)_p(?P<year>\d{4})(?P<month>\d{2})$")
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _row_key(table: str) -> str:
+    return _ROW_KEY.get(table, _DEFAULT_ROW_KEY)
+
+
+def _month_bounds(year: int, month: int):
+    start = datetime(year, month, 1, tzinfo=timezone.utc)
+    end = datetime(year + (month // 12), (month % 12) + 1, 1, tzinfo=timezone.utc)
+    return start, end
+
+
+# -------------------------------------------------------------------
+# Partition creation
+# -------------------------------------------------------------------
+
+def ensure_partitions(months_ahead: int = 3) -> Dict[str, int]:
+    """
+    Create monthly partitions from the current month up to `months_ahead`
+    months ahead. Idempotent. Returns {table: partitions_created}.
+    """
+    engine = get_engine()
+    created: Dict[str, int] = {}
+
+    with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            created[table] = int(
+                conn.execute(
+                    text(
+                        """
+                        SELECT voxcortex_ensure_monthly_partitions(
+                            :table,
+                            now(),
+                            now() + make_interval(months => :months_ahead)
+                        )
+                        """
+                    ),
+                    {"table": table, "months_ahead": months_ahead},
+                ).scalar_one()
+            )
+
+    return created
+
+
+def list_partitions(table: str) -> List[Dict[str, Any]]:
+    """
+    Attached monthly partitions of `table`, oldest first.
+    The DEFAULT partition is not listed.
+    """
+    engine = get_engine()
+
+    with engine.connect() as conn:
+        names = conn.execute(
+            text(
+                """
+                SELECT c.relname
+                FROM pg_inherits i
+                JOIN pg_class c ON c.oid = i.inhrelid
+                WHERE i.inhparent = to_regclass(:table)
+                """
+            ),
+            {"table": table},
+        ).scalars().all()
+
+    partitions = []
+    for name in names:
+        m = _PARTITION_RE.match(name)
+        if not m or m.group("table") != table:
+            continue
+        start, end = _month_bounds(int(m.group("year")), int(m.group("month")))
+        partitions.append({"table": table, "partition": name, "range_start": start, "range_end": end})
+
+    return sorted(partitions, key=lambda p: p["range_start"])
+
+
+# -------------------------------------------------------------------
+# Manifest
+# -------------------------------------------------------------------
+
+def load_manifest(archive_dir: str = ARCHIVE_DIR) -> Dict[str, Any]:
+    path = os.path.join(archive_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"version": 1, "partitions": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# Reads parse the manifest once per change, not once per call: it is
+# only ever replaced atomically (_write_manifest), so (mtime, size) of
+# the file identifies its content. archive_dir -> (stamp, trace index),
+# the index mapping (table, trace_id) -> entries, oldest first.
+_manifests: Dict[str, Tuple[Any, Dict[Tuple[str, str], List[Dict[str, Any]]]]] = {}
+_manifests_lock = threading.Lock()
+
+
+def _manifest_stamp(archive_dir: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(os.path.join(archive_dir, MANIFEST_NAME))
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _trace_index(archive_dir: str) -> Tuple[Any, Dict[Tuple[str, str], List[Dict[str, Any]]]]:
+    stamp = _manifest_stamp(archive_dir)
+    with _manifests_lock:
+        cached = _manifests.get(archive_dir)
+        if cached is not None and cached[0] == stamp:
+            return cached
+
+    index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+    for entry in load_manifest(archive_dir)["partitions"]:
+        for trace_id in entry.get("trace_ids", ()):
+            index.setdefault((entry["table"], trace_id), []).append(entry)
+    for entries in index.values():
+        entries.sort(key=lambda p: p["range_start"])
+
+    with _manifests_lock:
+        _manifests[archive_dir] = (stamp, index)
+    return stamp, index
+
+
+def _write_manifest(manifest: Dict[str, Any], archive_dir: str) -> None:
+    path = os.path.join(archive_dir, MANIFEST_NAME)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True, default=_json_default)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# -------------------------------------------------------------------
+# Archival
+# -------------------------------------------------------------------
+
+def _export_partition(conn, partition: str, path: str, row_key: str) -> Dict[str, Any]:
+    digest = hashlib.sha256()
+    row_count = 0
+    trace_ids = set()
+    # hash-chained tables (audit_log): per trace, the newest chained row
+    # and how many chained rows the partition holds
+    chain_tails: Dict[str, Dict[str, Any]] = {}
+
+    result = conn.execute(
+        text(f'SELECT * FROM "{partition}" ORDER BY created_at, "{row_key}"').execution_options(
+            stream_results=True, yield_per=5000
+        )
+    )
+
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        for row in result.mappings():
+            line = json.dumps(dict(row), ensure_ascii=False, sort_keys=True, default=_json_default)
+            f.write(line + "\n")
+            digest.update(line.encode("utf-8"))
+            row_count += 1
+            if row.get("trace_id") is not None:
+                trace_ids.add(row["trace_id"])
+                if row.get("row_hash") is not None:
+                    tail = chain_tails.setdefault(row["trace_id"], {"last_audit_id": 0, "row_count": 0})
+                    tail["row_count"] += 1
+                    if row["id"] > tail["last_audit_id"]:
+                        tail["last_audit_id"] = row["id"]
+                        tail["last_row_hash"] = row["row_hash"]
+
+    with open(tmp, "rb") as f:
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+    stats = {
+        "row_count": row_count,
+        "content_sha256": digest.hexdigest(),
+        "trace_ids": sorted(trace_ids),
+        "order_by": ["created_at", row_key],
+    }
+    if chain_tails:
+        stats["chain_tails"] = chain_tails
+    return stats
+
+
+def archive_partitions(
+    before: datetime,
+    *,
+    archive_dir: str = ARCHIVE_DIR,
+    tables=PARTITIONED_TABLES,
+    dry_run: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Archive every partition whose range ends at or before `before`:
+      1. stream rows to <archive_dir>/<table>/<partition>.jsonl.gz
+      2. record it in manifest.json (row count, content hash, trace_ids,
+         and for audit_log the chain tail of each trace)
+      3. DETACH + DROP the partition
+
+    Each partition is handled in one transaction that first takes a SHARE
+    lock on it, so no row can be written between the count check and the
+    DROP. Crash-safe: a partition already in the manifest is not exported
+    again unless its live row count no longer matches the manifest (rows
+    written after an interrupted run); then it is exported again, under
+    the lock, and its entry replaced.
+    """
+    engine = get_engine()
+    manifest = load_manifest(archive_dir)
+    archived = {p["partition"]: p for p in manifest["partitions"]}
+    done: List[Dict[str, Any]] = []
+
+    for table in tables:
+        for part in list_partitions(table):
+            if part["range_end"] > before:
+                continue
+
+            name = part["partition"]
+            if dry_run:
+                done.append(part)
+                continue
+
+            os.makedirs(os.path.join(archive_dir, table), exist_ok=True)
+            rel_path = os.path.join(table, f"{name}.jsonl.gz")
+
+            with engine.begin() as conn:
+                # blocks writes (not reads) until the DROP commits
+                conn.execute(text(f'LOCK TABLE "{name}" IN SHARE MODE'))
+
+                entry = archived.get(name)
+                if entry is not None:
+                    live_rows = conn.execute(text(f'SELECT count(*) FROM "{name}"')).scalar_one()
+                    if live_rows != entry["row_count"]:
+                        log.warning(
+                            "partition %s has %s rows but archive has %s; exporting again",
+                            name, live_rows, entry["row_count"],
+                        )
+                        manifest["partitions"].remove(entry)
+                        entry = None
+
+                if entry is None:
+                    stats = _export_partition(conn, name, os.path.join(archive_dir, rel_path), _row_key(table))
+                    entry = {
+                        **part,
+                        **stats,
+                        "path": rel_path,
+                        "format": "jsonl.gz",
+                        "archived_at": datetime.now(timezone.utc),
+                    }
+                    manifest["partitions"].append(entry)
+                    archived[name] = entry
+                    _write_manifest(manifest, archive_dir)
+
+                conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+                live_rows = conn.execute(text(f'SELECT count(*) FROM "{name}"')).scalar_one()
+                if live_rows != entry["row_count"]:
+                    raise RuntimeError(
+                        f"Partition {name} has {live_rows} rows but archive has {entry['row_count']}; not dropping"
+                    )
+                conn.execute(text(f'DROP TABLE "{name}"'))
+
+            log.info("archived %s (%s rows) -> %s", name, entry["row_count"], rel_path)
+            done.append(entry)
+
+    return done
+
+
+def archived_chain_tail(trace_id: str, *, archive_dir: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Where the trace's audit chain continues after its archived rows:
+    {"last_audit_id", "last_row_hash", "row_count"} over every archived
+    audit_log partition, or None when none of them holds chained rows of
+    the trace (or they were archived before tails were recorded).
+    """
+    _, index = _trace_index(archive_dir or ARCHIVE_DIR)
+    tail: Optional[Dict[str, Any]] = None
+    row_count = 0
+    for entry in index.get(("audit_log", trace_id), ()):
+        t = entry.get("chain_tails", {}).get(trace_id)
+        if t is None:
+            continue
+        row_count += t["row_count"]
+        if tail is None or t["last_audit_id"] > tail["last_audit_id"]:
+            tail = t
+    if tail is None:
+        return None
+    return {"last_audit_id": tail["last_audit_id"], "last_row_hash": tail["last_row_hash"], "row_count": row_count}
+
+
+# -------------------------------------------------------------------
+# Transparent reads
+# -------------------------------------------------------------------
+
+def _archived_sort_key(row_key: str):
+    def key(row: Dict[str, Any]):
+        created_at = datetime.fromisoformat(row["created_at"])
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return created_at, row.get(row_key)
+    return key
+
+
+def read_archived(
+    table: str,
+    *,
+    trace_id: str,
+    archive_dir: Optional[str] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield archived rows of `table` for `trace_id` in (created_at, row key)
+    order. Only partitions whose manifest lists the trace_id are opened.
+    Partitions exported before the row key tie-break (no "order_by" in
+    the manifest) have the trace's rows sorted in memory.
+    """
+    archive_dir = archive_dir or ARCHIVE_DIR
+    _, index = _trace_index(archive_dir)
+    sort_key = _archived_sort_key(_row_key(table))
+
+    for entry in index.get((table, trace_id), ()):
+        with gzip.open(os.path.join(archive_dir, entry["path"]), "rt", encoding="utf-8") as f:
+            rows = (json.loads(line) for line in f)
+            rows = (row for row in rows if row.get("trace_id") == trace_id)
+            if not entry.get("order_by"):
+                rows = iter(sorted(rows, key=sort_key))
+            yield from rows
+
+
+# Archived partitions never change once listed in the manifest, so the
+# rows of a trace stay valid until the manifest does. Bounded by the
+# total number of cached rows; a trace larger than the bound is read
+# but not kept.
+_archived_cache: "OrderedDict[Tuple[str, str, str], Tuple[Any, Tuple[Dict[str, Any], ...]]]" = OrderedDict()
+_archived_cache_rows = 0
+_archived_cache_lock = threading.Lock()
+
+
+def archived_rows(
+    table: str,
+    *,
+    trace_id: str,
+    archive_dir: Optional[str] = None,
+) -> Tuple[Dict[str, Any], ...]:
+    """
+    All archived rows of `table` for `trace_id`, as read_archived() yields
+    them, cached per trace. Callers must not mutate the rows.
+    """
+    global _archived_cache_rows
+    archive_dir = archive_dir or ARCHIVE_DIR
+    stamp, _ = _trace_index(archive_dir)
+    key = (archive_dir, table, trace_id)
+
+    with _archived_cache_lock:
+        cached = _archived_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            _archived_cache.move_to_end(key)
+            return cached[1]
+
+    rows = tuple(read_archived(table, trace_id=trace_id, archive_dir=archive_dir))
+    if len(rows) > ARCHIVE_CACHE_MAX_ROWS:
+        return rows
+
+    with _archived_cache_lock:
+        previous = _archived_cache.pop(key, None)
+        if previous is not None:
+            _archived_cache_rows -= len(previous[1])
+        _archived_cache[key] = (stamp, rows)
+        _archived_cache_rows += len(rows)
+        while _archived_cache_rows > ARCHIVE_CACHE_MAX_ROWS:
+            _, (_, evicted) = _archived_cache.popitem(last=False)
+            _archived_cache_rows -= len(evicted)
+    return rows
@@ -0,0 +1,64 @@
+import threading
+import time
+from typing import Callable
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    - capacity: burst size
+    - refill_per_second: sustained rate
+    Use per_minute() for "N per minute" quotas.
+    """
+
+    def __init__(
+        self,
+        capacity: float,
+        refill_per_second: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, limit: float, clock: Callable[[], float] = time.monotonic) -> "TokenBucket":
+        return cls(capacity=limit, refill_per_second=limit / 60.0, clock=clock)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+        self._updated = now
+
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def wait_time(self, amount: float = 1.0) -> float:
+        """
+        Seconds until `amount` tokens are available (0.0 if available now).
+        Requests larger than capacity are clamped to capacity.
+        """
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill()
+            missing = amount - self._tokens
+            if missing <= 0:
+                return 0.0
+            if self.refill_per_second <= 0:
+                return float("inf")
+            return missing / self.refill_per_second
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        amount = min(float(amount), self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return True
+            return False
@@ -0,0 +1,197 @@
+# services/signalmesh/admission.py
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from services.shared.ratelimit import TokenBucket
+
+log = logging.getLogger("signalmesh.admission")
+
+# -------------------------------------------------------------------
+# Admission control for /v1/ingest and /v1/ingest:batch
+#
+# - token buckets per source and per (source, event_type); limits from
+#   INGEST_RATE_LIMITS, e.g. "*=1000,siem=50,siem/alert=20" (events/s,
+#   "*" = any source, "*/*" = any pair, 0 = unlimited)
+# - severity-aware shedding: once downstream lag (pending ingest_outbox
+#   rows, sampled every INGEST_LAG_SAMPLE_S) crosses INGEST_SHED_LAG,
+#   low-severity events are refused first; critical is never shed
+# - refusals carry a Retry-After; stats() feeds /v1/metrics
+# -------------------------------------------------------------------
+
+RATE_LIMITS = os.getenv("INGEST_RATE_LIMITS", "*=1000")
+BURST_S = float(os.getenv("INGEST_RATE_BURST_S", "2"))
+SHED_LAG = int(os.getenv("INGEST_SHED_LAG", "10000"))
+LAG_SAMPLE_S = float(os.getenv("INGEST_LAG_SAMPLE_S", "2"))
+SHED_RETRY_AFTER_S = float(os.getenv("INGEST_SHED_RETRY_AFTER_S", "5"))
+MAX_BUCKETS = 10000
+
+# shed once lag >= SHED_LAG * factor (None: never shed)
+SHED_FACTOR = {
+    "info": 1,
+    "low": 1,
+    "medium": 2,
+    "warning": 2,
+    "high": 4,
+    "error": 4,
+    "critical": None,
+}
+_DEFAULT_SHED_FACTOR = 1
+
+
+def parse_limits(spec: str) -> Dict[str, float]:
+    """'*=1000,siem=50,siem/alert=20' -> {key: events per second}."""
+    limits: Dict[str, float] = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        key, sep, rate = part.partition("=")
+        if not sep:
+            raise ValueError(f"bad rate limit entry {part!r} (expected key=rate)")
+        limits[key.strip().lower()] = float(rate)
+    return limits
+
+
+@dataclass(frozen=True)
+class Decision:
+    admitted: bool
+    reason: str = ""
+    retry_after_s: float = 0.0
+
+    @property
+    def retry_after(self) -> str:
+        # Retry-After header value: whole seconds, at least 1
+        return str(max(1, math.ceil(self.retry_after_s)))
+
+
+ADMIT = Decision(True)
+
+
+def _outbox_pending() -> int:
+    from services.signalmesh.outbox import backlog
+
+    return backlog()["pending"]
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        *,
+        limits: Optional[Dict[str, float]] = None,
+        burst_s: float = BURST_S,
+        shed_lag: int = SHED_LAG,
+        lag_sample_s: float = LAG_SAMPLE_S,
+        lag_fn: Callable[[], int] = _outbox_pending,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.limits = parse_limits(RATE_LIMITS) if limits is None else dict(limits)
+        self.burst_s = burst_s
+        self.shed_lag = shed_lag
+        self.lag_sample_s = lag_sample_s
+        self._lag_fn = lag_fn
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, Optional[TokenBucket]]" = OrderedDict()
+        self._lag = 0
+        self._lag_at: Optional[float] = None
+        self._refreshing = False
+        self._stats: Dict[str, int] = {"admitted": 0, "rate_limited": 0, "shed": 0}
+        self._refused: Dict[str, int] = {}
+
+    # ----------------------------------------------------------------
+    # Downstream lag
+    # ----------------------------------------------------------------
+
+    def cached_lag(self) -> Optional[int]:
+        """
+        Last sampled lag, or None when a sample is due; the caller that
+        gets None samples (refresh_lag), everyone else keeps the old value.
+        """
+        with self._lock:
+            due = self._lag_at is None or self._clock() - self._lag_at >= self.lag_sample_s
+            if due and not self._refreshing:
+                self._refreshing = True
+                return None
+            return self._lag
+
+    def refresh_lag(self) -> int:
+        """Sample lag now (blocking). A failed sample keeps the previous value."""
+        try:
+            lag = int(self._lag_fn())
+        except Exception as e:
+            log.warning("admission: lag sample failed: %s", e)
+            lag = None
+        with self._lock:
+            if lag is not None:
+                self._lag = lag
+            self._lag_at = self._clock()
+            self._refreshing = False
+            return self._lag
+
+    def lag(self) -> int:
+        cached = self.cached_lag()
+        return self.refresh_lag() if cached is None else cached
+
+    # ----------------------------------------------------------------
+    # Decisions
+    # ----------------------------------------------------------------
+
+    def _bucket(self, key: str, default_key: str) -> Optional[TokenBucket]:
+        with self._lock:
+            if key in self._buckets:
+                self._buckets.move_to_end(key)
+                return self._buckets[key]
+            rate = self.limits.get(key, self.limits.get(default_key, 0.0))
+            bucket = None
+            if rate > 0:
+                bucket = TokenBucket(capacity=max(1.0, rate * self.burst_s), refill_per_second=rate, clock=self._clock)
+            self._buckets[key] = bucket
+            while len(self._buckets) > MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+            return bucket
+
+    def _refuse(self, stat: str, reason: str, retry_after_s: float) -> Decision:
+        with self._lock:
+            self._stats[stat] += 1
+            self._refused[reason] = self._refused.get(reason, 0) + 1
+        return Decision(False, reason, retry_after_s)
+
+    def admit(self, source: str, event_type: str, severity: Optional[str], *, lag: int) -> Decision:
+        severity = (severity or "").lower()
+        factor = SHED_FACTOR.get(severity, _DEFAULT_SHED_FACTOR)
+        if self.shed_lag > 0 and factor is not None and lag >= self.shed_lag * factor:
+            return self._refuse("shed", f"shed:{severity or 'none'}", SHED_RETRY_AFTER_S)
+
+        buckets = []
+        for key, default_key in ((source, "*"), (f"{source}/{event_type}", "*/*")):
+            bucket = self._bucket(key, default_key)
+            if bucket is not None:
+                buckets.append((key, bucket))
+        # a refusal must not spend the other bucket's token
+        for key, bucket in buckets:
+            if bucket.available() < 1:
+                return self._refuse("rate_limited", f"rate_limited:{key}", bucket.wait_time())
+        for key, bucket in buckets:
+            if not bucket.try_acquire():  # lost a race for the last token
+                return self._refuse("rate_limited", f"rate_limited:{key}", bucket.wait_time())
+
+        with self._lock:
+            self._stats["admitted"] += 1
+        return ADMIT
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                **self._stats,
+                "lag": self._lag,
+                "shed_lag": self.shed_lag,
+                "refused": dict(self._refused),
+            }
+
+
+controller = AdmissionController()
@@ -1,83 +1,378 @@
-from fastapi import FastAPI, Header
+from fastapi import FastAPI, Header, HTTPException, Request
+from fastapi.responses import JSONResponse
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 from services.signalmesh.schemas import IngestEvent
-from services.signalmesh.normalizer import normalize
+from services.signalmesh.normalizer import normalize, normalize_many
+from services.signalmesh.bulk_loader import EVENT_COLUMNS
 from services.shared.ids import new_id
-from services.shared.db import exec_sql
+from services.shared.db import (
+    arecord_write,
+    copy_rows,
+    current_write_lsn,
+    get_async_engine,
+    get_engine,
+    read_your_writes,
+    record_write,
+    sql_text,
+)
+from services.audit.audit_chain import append_audit, append_audit_many
 from services.shared.logging import setup_logging, TraceAdapter
-from services.shared.config import settings
+from services.signalmesh import admission, embedded, idempotency, outbox
+from services.cortexreasoner.llm_dispatcher import dispatcher_metrics
 
 import logging
 import json
 import os
+from contextlib import asynccontextmanager
 
-# Pub/Sub is optional for local dev.
-# We only initialize if explicitly enabled (prevents ADC errors locally).
-try:
-    from google.cloud import pubsub_v1
-except Exception:
-    pubsub_v1 = None
+# upper bound for one /v1/ingest:batch request (items, incl. rejected ones)
+BATCH_MAX_ITEMS = int(os.getenv("INGEST_BATCH_MAX_ITEMS", "1000"))
 
 setup_logging()
 log = TraceAdapter(logging.getLogger("signalmesh"), {"trace_id": "boot"})
 
-app = FastAPI(title="VoxCortex SignalMesh", version="0.1.0")
 
-ENABLE_PUBSUB = os.getenv("ENABLE_PUBSUB", "false").lower() == "true"
+@asynccontextmanager
+async def _lifespan(app):
+    pipeline = embedded.get_pipeline()
+    if pipeline is not None:
+        # fail at boot, not on the first event, without a reasoner backend
+        from services.cortexreasoner.reasoner_backend import get_backend
 
-_publisher = None
-if ENABLE_PUBSUB and pubsub_v1:
-    _publisher = pubsub_v1.PublisherClient()
+        get_backend()
+        pipeline.start()
+    yield
+    if pipeline is not None:
+        await run_in_threadpool(pipeline.stop)
 
 
-def publish_ingest(event_dict: dict) -> None:
-    if not _publisher or not settings.gcp_project:
-        # local dev: no-op publish, still deterministic
-        return
-    topic_path = _publisher.topic_path(settings.gcp_project, settings.pubsub_topic_ingest)
-    data = json.dumps(event_dict).encode("utf-8")
-    _publisher.publish(topic_path, data=data)
+app = FastAPI(title="VoxCortex SignalMesh", version="0.1.0", lifespan=_lifespan)
+
+
+def _embedded_backpressure(n: int):
+    # embedded mode: refuse before writing while the in-process queue is full
+    pipeline = embedded.get_pipeline()
+    if pipeline is not None and not pipeline.has_room(n):
+        raise HTTPException(
+            status_code=503,
+            detail="embedded pipeline queue full",
+            headers={"Retry-After": admission.Decision(False, retry_after_s=embedded.RETRY_AFTER_S).retry_after},
+        )
+    return pipeline
+
+
+_INSERT_EVENT = """
+    INSERT INTO events(event_id, trace_id, source, event_type, occurred_at, severity, raw_payload, canonical_payload)
+    VALUES (
+        :event_id, :trace_id, :source, :event_type, :occurred_at, :severity,
+        CAST(:raw_payload AS jsonb),
+        CAST(:canonical_payload AS jsonb)
+    )
+"""
 
 
 @app.post("/v1/ingest")
-def ingest(evt: IngestEvent, x_trace_id: str | None = Header(default=None)):
+async def ingest(
+    evt: IngestEvent,
+    x_trace_id: str | None = Header(default=None),
+    x_read_your_writes: bool = Header(default=False),
+):
+    if x_read_your_writes:
+        # response carries write_lsn; send it back to adminconsole as
+        # X-Read-After-LSN to read this event even from a lagging replica
+        with read_your_writes():
+            result = await _ingest(evt, x_trace_id)
+            await arecord_write()
+            return {**result, "write_lsn": current_write_lsn()}
+    return await _ingest(evt, x_trace_id)
+
+
+async def _ingest(evt: IngestEvent, x_trace_id: str | None):
     trace_id = x_trace_id or new_id("trc")
     tlog = TraceAdapter(logging.getLogger("signalmesh"), {"trace_id": trace_id})
 
     canonical = normalize(evt, trace_id=trace_id)
+    canonical_dict = canonical.model_dump()
+    key = canonical.idempotency_key
+
+    owner = idempotency.seen.get(key)
+    if owner is not None:
+        return _duplicate(owner)
 
-    # Store raw + canonical deterministically
-    exec_sql(
-        """
-        INSERT INTO events(event_id, trace_id, source, event_type, occurred_at, severity, raw_payload, canonical_payload)
-        VALUES (
-            :event_id, :trace_id, :source, :event_type, :occurred_at, :severity,
-            CAST(:raw_payload AS jsonb),
-            CAST(:canonical_payload AS jsonb)
+    controller = admission.controller
+    lag = controller.cached_lag()
+    if lag is None:
+        lag = await run_in_threadpool(controller.refresh_lag)
+    decision = controller.admit(canonical.source, canonical.event_type, canonical.severity, lag=lag)
+    if not decision.admitted:
+        raise HTTPException(status_code=429, detail=decision.reason, headers={"Retry-After": decision.retry_after})
+    pipeline = _embedded_backpressure(1)
+
+    # Idempotency claim, event, hash-chained audit row and outbox row commit
+    # in ONE transaction; workers/outbox_relay.py publishes the outbox row
+    # (embedded mode: the in-process pipeline handles it)
+    async with get_async_engine().begin() as conn:
+        taken = await conn.run_sync(idempotency.claim_many, [(key, canonical.event_id, trace_id)])
+        if taken:
+            owner = taken[key]
+            idempotency.seen.put(key, owner)
+            return _duplicate(owner)
+
+        await conn.execute(
+            sql_text(_INSERT_EVENT),
+            {
+                "event_id": canonical.event_id,
+                "trace_id": canonical.trace_id,
+                "source": canonical.source,
+                "event_type": canonical.event_type,
+                "occurred_at": canonical.occurred_at,
+                "severity": canonical.severity,
+                "raw_payload": json.dumps(evt.model_dump()),
+                "canonical_payload": json.dumps(canonical_dict),
+            },
         )
-        """,
-        event_id=canonical.event_id,
-        trace_id=canonical.trace_id,
-        source=canonical.source,
-        event_type=canonical.event_type,
-        occurred_at=canonical.occurred_at,
-        severity=canonical.severity,
-        raw_payload=json.dumps(evt.model_dump()),
-        canonical_payload=json.dumps(canonical.model_dump()),
-    )
 
-    publish_ingest(canonical.model_dump())
-
-    # Audit
-    exec_sql(
-        """
-        INSERT INTO audit_log(trace_id, actor, action, details)
-        VALUES (:trace_id, :actor, :action, CAST(:details AS jsonb))
-        """,
-        trace_id=trace_id,
-        actor="signalmesh",
-        action="ingest",
-        details=json.dumps({"event_id": canonical.event_id}),
-    )
+        def audit_and_enqueue(sync_conn):
+            append_audit(
+                sync_conn,
+                trace_id=trace_id,
+                actor="signalmesh",
+                action="ingest",
+                details={"event_id": canonical.event_id},
+            )
+            return outbox.enqueue(sync_conn, [canonical_dict])
+
+        outbox_ids = await conn.run_sync(audit_and_enqueue)
+
+    if pipeline is not None:
+        pipeline.submit([(outbox_ids[0], canonical_dict)])
 
+    idempotency.seen.put(key, (canonical.event_id, trace_id))
     tlog.info("ingested event", extra={"trace_id": trace_id})
     return {"ok": True, "trace_id": trace_id, "event_id": canonical.event_id}
+
+
+def _duplicate(owner) -> dict:
+    # the first delivery's ids, so retries see the same answer
+    event_id, trace_id = owner
+    return {"ok": True, "trace_id": trace_id, "event_id": event_id, "duplicate": True}
+
+
+# -------------------------------------------------------------------
+# Batch ingest: JSON array or NDJSON stream
+# -------------------------------------------------------------------
+
+def _error_text(e: Exception) -> str:
+    if isinstance(e, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    return str(e)
+
+
+async def _read_items(request: Request) -> list:
+    """
+    [(item or None, parse error or None)] from a JSON array body or an
+    NDJSON body (read as it streams in, one item per non-empty line).
+    """
+    content_type = request.headers.get("content-type", "")
+
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = []
+        buffer = b""
+
+        def take(line: bytes):
+            if not line.strip():
+                return
+            if len(items) >= BATCH_MAX_ITEMS:
+                raise HTTPException(status_code=413, detail=f"batch larger than {BATCH_MAX_ITEMS} items")
+            try:
+                items.append((json.loads(line), None))
+            except ValueError as e:
+                items.append((None, f"invalid JSON: {e}"))
+
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                take(line)
+        take(buffer)
+        return items
+
+    try:
+        body = json.loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"invalid JSON: {e}")
+    if not isinstance(body, list):
+        raise HTTPException(status_code=400, detail="expected a JSON array (or application/x-ndjson)")
+    if len(body) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"batch larger than {BATCH_MAX_ITEMS} items")
+    return [(item, None) for item in body]
+
+
+def _ingest_batch(items: list, x_trace_id: str | None) -> dict:
+    results = []
+    event_rows = []
+    audit = []
+    minted = set()
+    canonical_events = []
+    accepted_items = []
+
+    for index, (item, error) in enumerate(items):
+        if error is None:
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("item must be a JSON object")
+                evt = IngestEvent.model_validate(item)
+            except (ValidationError, ValueError) as e:
+                error = _error_text(e)
+        if error is not None:
+            results.append({"index": index, "ok": False, "error": error})
+            continue
+
+        # per-item trace_id > X-Trace-Id > new trace per item
+        trace_id = item.get("trace_id") or x_trace_id
+        if not trace_id:
+            trace_id = new_id("trc")
+            minted.add(trace_id)
+
+        accepted_items.append((index, evt, trace_id))
+        results.append(None)
+
+    canonicals = normalize_many([evt for _, evt, _ in accepted_items], [t for _, _, t in accepted_items])
+
+    # duplicates within the batch or of recent deliveries are answered
+    # without a write; the rest pass admission control and are claimed in
+    # the write transaction
+    fresh = []
+    first_in_batch = {}
+    lag = admission.controller.lag() if canonicals else 0
+    for (index, evt, trace_id), canonical_event in zip(accepted_items, canonicals):
+        key = canonical_event.idempotency_key
+        owner = idempotency.seen.get(key)
+        if owner is None and key in first_in_batch:
+            owner = first_in_batch[key]
+            idempotency.seen.count("batch_hits")
+        if owner is not None:
+            results[index] = {"index": index, **_duplicate(owner)}
+            continue
+        decision = admission.controller.admit(
+            canonical_event.source, canonical_event.event_type, canonical_event.severity, lag=lag
+        )
+        if not decision.admitted:
+            results[index] = {
+                "index": index,
+                "ok": False,
+                "error": decision.reason,
+                "status": 429,
+                "retry_after": decision.retry_after_s,
+            }
+            continue
+        first_in_batch[key] = (canonical_event.event_id, trace_id)
+        fresh.append((index, evt, trace_id, canonical_event.model_dump()))
+
+    if fresh:
+        pipeline = _embedded_backpressure(len(fresh))
+        with get_engine().begin() as conn:
+            taken = idempotency.claim_many(conn, [(c["idempotency_key"], c["event_id"], t) for _, _, t, c in fresh])
+            for index, evt, trace_id, canonical in fresh:
+                owner = taken.get(canonical["idempotency_key"])
+                if owner is not None:
+                    results[index] = {"index": index, **_duplicate(owner)}
+                    continue
+                canonical_events.append(canonical)
+                event_rows.append(
+                    (
+                        canonical["event_id"],
+                        trace_id,
+                        canonical["source"],
+                        canonical["event_type"],
+                        canonical["occurred_at"],
+                        canonical["severity"],
+                        json.dumps(evt.model_dump()),
+                        json.dumps(canonical),
+                    )
+                )
+                audit.append(
+                    {
+                        "trace_id": trace_id,
+                        "actor": "signalmesh",
+                        "action": "ingest",
+                        "details": {"event_id": canonical["event_id"]},
+                    }
+                )
+                results[index] = {"index": index, "ok": True, "trace_id": trace_id, "event_id": canonical["event_id"]}
+
+            # all accepted items commit (or fail) together, outbox rows included
+            if event_rows:
+                copy_rows("events", EVENT_COLUMNS, event_rows, conn=conn)
+                append_audit_many(conn, audit, new_trace_ids=minted)
+                outbox_ids = outbox.enqueue(conn, canonical_events)
+        if event_rows:
+            record_write()
+            if pipeline is not None:
+                pipeline.submit(list(zip(outbox_ids, canonical_events)))
+        for index, _, _, canonical in fresh:
+            idempotency.seen.put(canonical["idempotency_key"], (results[index]["event_id"], results[index]["trace_id"]))
+
+    accepted = len(event_rows)
+    throttled = sum(1 for r in results if r.get("status") == 429)
+    rejected = sum(1 for r in results if not r["ok"]) - throttled
+    duplicates = len(results) - accepted - rejected - throttled
+    log.info(
+        "batch ingested %d events, %d duplicates, throttled %d, rejected %d",
+        accepted, duplicates, throttled, rejected,
+    )
+    return {
+        "ok": rejected == 0 and throttled == 0,
+        "accepted": accepted,
+        "duplicates": duplicates,
+        "throttled": throttled,
+        "rejected": rejected,
+        "results": results,
+    }
+
+
+@app.post("/v1/ingest:batch")
+async def ingest_batch(
+    request: Request,
+    x_trace_id: str | None = Header(default=None),
+    x_read_your_writes: bool = Header(default=False),
+):
+    """
+    Body: JSON array of IngestEvent, or application/x-ndjson (one per line,
+    may be sent chunked). Items may carry their own trace_id.
+    Invalid items are reported per index and do not block the others.
+    """
+    items = await _read_items(request)
+
+    if x_read_your_writes:
+        def run():
+            with read_your_writes():
+                return {**_ingest_batch(items, x_trace_id), "write_lsn": current_write_lsn()}
+        result = await run_in_threadpool(run)
+    else:
+        result = await run_in_threadpool(_ingest_batch, items, x_trace_id)
+
+    # nothing admitted: answer the whole batch with 429 so clients back off
+    if result.get("throttled") and result["throttled"] == len(result["results"]):
+        retry_after = max(r["retry_after"] for r in result["results"])
+        return JSONResponse(
+            result,
+            status_code=429,
+            headers={"Retry-After": admission.Decision(False, retry_after_s=retry_after).retry_after},
+        )
+    return result
+
+
+@app.get("/v1/metrics")
+def metrics():
+    # in-process counters of this replica
+    out = {"idempotency": idempotency.seen.stats(), "admission": admission.controller.stats()}
+    pipeline = embedded.get_pipeline()
+    if pipeline is not None:
+        out["embedded"] = pipeline.stats()
+    # LLM calls of the embedded pipeline (standalone workers log theirs)
+    llm = dispatcher_metrics()
+    if llm is not None:
+        out["llm_dispatcher"] = llm
+    return out
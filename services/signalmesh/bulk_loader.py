@@ -0,0 +1,428 @@
+# services/signalmesh/bulk_loader.py
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from services.audit.audit_chain import append_audit_many
+from services.shared.db import copy_rows, get_engine, sql_text
+from services.shared.ids import new_id
+from services.signalmesh.normalizer import normalize_many
+from services.signalmesh import idempotency, outbox
+from services.signalmesh.schemas import IngestEvent
+
+log = logging.getLogger("signalmesh.bulk_loader")
+
+# -------------------------------------------------------------------
+# Bulk backfill of historical alerts (Datadog / Jira / SIEM exports)
+#
+# NDJSON or CSV -> IngestEvent -> normalize_many() -> COPY into events, plus
+# one chained audit row per event (append_audit_many), chunk by chunk.
+# Each chunk commits together with its end offset in bulk_load_offsets,
+# so a restarted load continues exactly after the last committed chunk.
+# -------------------------------------------------------------------
+
+CHUNK_SIZE = int(os.getenv("BULK_LOAD_CHUNK_SIZE", "5000"))
+
+EVENT_COLUMNS = (
+    "event_id",
+    "trace_id",
+    "source",
+    "event_type",
+    "occurred_at",
+    "severity",
+    "raw_payload",
+    "canonical_payload",
+)
+
+_INGEST_FIELDS = ("source", "event_type", "occurred_at", "severity")
+
+# rejected records logged individually before going quiet
+_MAX_LOGGED_REJECTS = 20
+
+
+# -------------------------------------------------------------------
+# Readers: yield (offset after the record, record dict or None)
+# -------------------------------------------------------------------
+
+def _iter_ndjson(f, offset: int, stop: Optional[int] = None) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    for line in f:
+        if stop is not None and offset >= stop:
+            return
+        offset += len(line)
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield offset, None
+            continue
+        yield offset, record if isinstance(record, dict) else None
+
+
+def _split_csv(line: str) -> List[str]:
+    return next(csv.reader([line]))
+
+
+def _csv_record(header: List[str], values: List[str]) -> Optional[Dict[str, Any]]:
+    if len(values) != len(header):
+        return None
+    row = dict(zip(header, values))
+
+    record: Dict[str, Any] = {}
+    for field in (*_INGEST_FIELDS, "trace_id"):
+        value = row.pop(field, None)
+        if value:
+            record[field] = value
+
+    if "payload" in row:
+        try:
+            record["payload"] = json.loads(row["payload"] or "{}")
+        except ValueError:
+            return None
+    else:
+        # no payload column: every other column is payload
+        record["payload"] = {k: v for k, v in row.items() if v != ""}
+    return record
+
+
+def _iter_csv(f, offset: int) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    f.seek(0)
+    header_line = f.readline()
+    header = [h.strip() for h in _split_csv(header_line.decode("utf-8-sig"))]
+    if offset < len(header_line):
+        offset = len(header_line)
+    f.seek(offset)
+
+    pending = b""
+    for line in f:
+        offset += len(line)
+        pending += line
+        # RFC 4180: quoted fields may span lines; escaped quotes are doubled,
+        # so an odd quote count means the record continues on the next line
+        if pending.count(b'"') % 2:
+            continue
+        text_line, pending = pending.decode("utf-8").rstrip("\r\n"), b""
+        if not text_line:
+            continue
+        try:
+            yield offset, _csv_record(header, _split_csv(text_line))
+        except Exception:
+            yield offset, None
+
+
+def iter_records(
+    path: str,
+    fmt: str,
+    start_offset: int = 0,
+    stop_offset: Optional[int] = None,
+) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """
+    Records of `path` starting at byte `start_offset` (and, NDJSON only,
+    before `stop_offset`). None marks a record that could not be parsed.
+    """
+    with open(path, "rb") as f:
+        if fmt == "csv":
+            if stop_offset is not None:
+                raise ValueError("CSV records may span lines; byte ranges are NDJSON only")
+            yield from _iter_csv(f, start_offset)
+        else:
+            f.seek(start_offset)
+            yield from _iter_ndjson(f, start_offset, stop_offset)
+
+
+def split_ranges(path: str, parts: int) -> List[Tuple[int, int]]:
+    """
+    `parts` byte ranges of an NDJSON file, each starting at a line start.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, bounds[-1]))
+            if f.tell() > 0:
+                f.seek(f.tell() - 1)
+                f.readline()  # finish the line we landed in
+            bounds.append(min(f.tell(), size))
+    bounds.append(size)
+    return [(bounds[i], bounds[i + 1]) for i in range(parts) if bounds[i] < bounds[i + 1]]
+
+
+def detect_format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+# -------------------------------------------------------------------
+# Offsets
+# -------------------------------------------------------------------
+
+def get_offset(load_key: str) -> int:
+    with get_engine().connect() as conn:
+        offset = conn.execute(
+            sql_text("SELECT byte_offset FROM bulk_load_offsets WHERE load_key = :load_key"),
+            {"load_key": load_key},
+        ).scalar()
+    return int(offset or 0)
+
+
+def _save_offset(conn, load_key: str, byte_offset: int, loaded: int, rejected: int) -> None:
+    conn.execute(
+        sql_text(
+            """
+            INSERT INTO bulk_load_offsets (load_key, byte_offset, events_loaded, rejected, updated_at)
+            VALUES (:load_key, :byte_offset, :loaded, :rejected, now())
+            ON CONFLICT (load_key) DO UPDATE
+            SET
+                byte_offset = EXCLUDED.byte_offset,
+                events_loaded = bulk_load_offsets.events_loaded + EXCLUDED.events_loaded,
+                rejected = bulk_load_offsets.rejected + EXCLUDED.rejected,
+                updated_at = EXCLUDED.updated_at
+            """
+        ),
+        {"load_key": load_key, "byte_offset": byte_offset, "loaded": loaded, "rejected": rejected},
+    )
+
+
+# -------------------------------------------------------------------
+# Loader
+# -------------------------------------------------------------------
+
+class _Chunk:
+    def __init__(self):
+        # validated (IngestEvent, trace_id); normalized in one pass by _build()
+        self.pending: List[tuple] = []
+        self.event_rows: List[tuple] = []
+        self.audit: List[Dict[str, Any]] = []
+        self.minted: set = set()
+        self.canonical: List[Dict[str, Any]] = []
+        self.rejected = 0
+        self.duplicates = 0
+        self.end_offset = 0
+
+    def __len__(self):
+        return len(self.pending)
+
+
+def _add(chunk: _Chunk, record: Dict[str, Any], defaults: Dict[str, str]) -> bool:
+    for key, value in defaults.items():
+        record.setdefault(key, value)
+
+    trace_id = record.pop("trace_id", None)
+    try:
+        evt = IngestEvent.model_validate(record)
+    except ValidationError:
+        return False
+
+    if not trace_id:
+        trace_id = new_id("trc")
+        chunk.minted.add(trace_id)
+
+    chunk.pending.append((evt, trace_id))
+    return True
+
+
+def _build(chunk: _Chunk, conn, enqueue: bool) -> None:
+    canonicals = normalize_many([evt for evt, _ in chunk.pending], [t for _, t in chunk.pending])
+    fresh = []
+    keys = set()
+    for (evt, trace_id), canonical_event in zip(chunk.pending, canonicals):
+        if canonical_event.idempotency_key in keys:
+            chunk.duplicates += 1
+            continue
+        keys.add(canonical_event.idempotency_key)
+        fresh.append((evt, trace_id, canonical_event.model_dump()))
+
+    # events already ingested (live or by an earlier load) are skipped
+    taken = idempotency.claim_many(conn, [(c["idempotency_key"], c["event_id"], t) for _, t, c in fresh])
+    chunk.duplicates += len(taken)
+
+    for evt, trace_id, canonical in fresh:
+        if canonical["idempotency_key"] in taken:
+            continue
+        chunk.event_rows.append(
+            (
+                canonical["event_id"],
+                trace_id,
+                canonical["source"],
+                canonical["event_type"],
+                canonical["occurred_at"],
+                canonical["severity"],
+                json.dumps(evt.model_dump()),
+                json.dumps(canonical),
+            )
+        )
+        chunk.audit.append(
+            {
+                "trace_id": trace_id,
+                "actor": "bulk_loader",
+                "action": "ingest",
+                "details": {"event_id": canonical["event_id"]},
+            }
+        )
+        if enqueue:
+            chunk.canonical.append(canonical)
+
+
+def _flush(chunk: _Chunk, load_key: str, enqueue: bool) -> None:
+    with get_engine().begin() as conn:
+        # A crash may lose the last commits, but every chunk commits together
+        # with its offset, so resume stays exact and the WAL flush wait per
+        # chunk goes away.
+        conn.execute(sql_text("SET LOCAL synchronous_commit = off"))
+        _build(chunk, conn, enqueue)
+        if chunk.event_rows:
+            copy_rows("events", EVENT_COLUMNS, chunk.event_rows, conn=conn)
+            append_audit_many(conn, chunk.audit, new_trace_ids=chunk.minted)
+            # published by workers/outbox_relay.py once this chunk committed
+            outbox.enqueue(conn, chunk.canonical)
+        _save_offset(conn, load_key, chunk.end_offset, len(chunk.event_rows), chunk.rejected)
+
+
+def _load_range(
+    path: str,
+    fmt: str,
+    load_key: str,
+    start: int,
+    stop: Optional[int],
+    chunk_size: int,
+    defaults: Dict[str, str],
+    enqueue: bool,
+) -> Dict[str, Any]:
+    start_offset = max(get_offset(load_key), start)
+    loaded = 0
+    rejected = 0
+    duplicates = 0
+    chunk = _Chunk()
+    chunk.end_offset = start_offset
+
+    for end_offset, record in iter_records(path, fmt, start_offset, stop):
+        chunk.end_offset = end_offset
+        if record is None or not _add(chunk, record, defaults):
+            chunk.rejected += 1
+            if rejected + chunk.rejected <= _MAX_LOGGED_REJECTS:
+                log.warning("%s: rejected record ending at byte %d", path, end_offset)
+            continue
+        if len(chunk) >= chunk_size:
+            _flush(chunk, load_key, enqueue)
+            loaded += len(chunk.event_rows)
+            rejected += chunk.rejected
+            duplicates += chunk.duplicates
+            next_chunk = _Chunk()
+            next_chunk.end_offset = chunk.end_offset
+            chunk = next_chunk
+
+    if len(chunk) or chunk.rejected or chunk.end_offset != start_offset:
+        _flush(chunk, load_key, enqueue)
+        loaded += len(chunk.event_rows)
+        rejected += chunk.rejected
+        duplicates += chunk.duplicates
+
+    return {
+        "start_offset": start_offset,
+        "end_offset": chunk.end_offset,
+        "loaded": loaded,
+        "rejected": rejected,
+        "duplicates": duplicates,
+    }
+
+
+def _load_range_star(args) -> Dict[str, Any]:
+    return _load_range(*args)
+
+
+def _shard_key(load_key: str, index: int, workers: int) -> str:
+    return f"{load_key}#{index + 1}/{workers}"
+
+
+# a load key and all of its shard keys
+_KEYS_WHERE = "load_key = :load_key OR load_key LIKE :shard_prefix"
+
+
+def _key_params(load_key: str) -> Dict[str, str]:
+    escaped = load_key.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return {"load_key": load_key, "shard_prefix": escaped + "#%"}
+
+
+def _check_sharding(load_key: str, workers: int) -> None:
+    with get_engine().connect() as conn:
+        keys = conn.execute(
+            sql_text("SELECT load_key FROM bulk_load_offsets WHERE " + _KEYS_WHERE),
+            _key_params(load_key),
+        ).scalars().all()
+    expected = {load_key} if workers == 1 else {_shard_key(load_key, i, workers) for i in range(workers)}
+    stray = set(keys) - expected
+    if stray:
+        raise ValueError(
+            f"{load_key} was started with a different worker count ({sorted(stray)[0]}); "
+            "resume with the same --workers or use --restart"
+        )
+
+
+def load_file(
+    path: str,
+    *,
+    fmt: Optional[str] = None,
+    load_key: Optional[str] = None,
+    chunk_size: int = CHUNK_SIZE,
+    defaults: Optional[Dict[str, str]] = None,
+    enqueue: bool = False,
+    restart: bool = False,
+    workers: int = 1,
+) -> Dict[str, Any]:
+    """
+    Load one export file. Resumes from the committed offset of `load_key`
+    (default: the absolute path) unless `restart`.
+    `defaults` fills missing source / event_type / severity per record.
+    `enqueue` adds each canonical event to the outbox in its chunk's
+    transaction, for the relay to publish to the worker.
+    `workers` > 1 (NDJSON only) splits the file into line-aligned byte
+    ranges loaded by separate processes, each with its own offset; resume
+    with the same worker count.
+    """
+    fmt = fmt or detect_format(path)
+    load_key = load_key or os.path.abspath(path)
+    defaults = {k: v for k, v in (defaults or {}).items() if v}
+    if workers > 1 and fmt != "ndjson":
+        raise ValueError("parallel loading needs NDJSON input")
+
+    if restart:
+        with get_engine().begin() as conn:
+            conn.execute(
+                sql_text("DELETE FROM bulk_load_offsets WHERE " + _KEYS_WHERE),
+                _key_params(load_key),
+            )
+    _check_sharding(load_key, workers)
+
+    started = time.perf_counter()
+
+    if workers == 1:
+        parts = [_load_range(path, fmt, load_key, 0, None, chunk_size, defaults, enqueue)]
+    else:
+        jobs = [
+            (path, fmt, _shard_key(load_key, i, workers), start, stop, chunk_size, defaults, enqueue)
+            for i, (start, stop) in enumerate(split_ranges(path, workers))
+        ]
+        # spawn: children build their own engine instead of sharing the parent's pool
+        with multiprocessing.get_context("spawn").Pool(len(jobs)) as pool:
+            parts = pool.map(_load_range_star, jobs)
+
+    elapsed = time.perf_counter() - started
+    loaded = sum(p["loaded"] for p in parts)
+    return {
+        "path": path,
+        "load_key": load_key,
+        "format": fmt,
+        "workers": workers,
+        "start_offset": min(p["start_offset"] for p in parts),
+        "end_offset": max(p["end_offset"] for p in parts),
+        "loaded": loaded,
+        "rejected": sum(p["rejected"] for p in parts),
+        "duplicates": sum(p["duplicates"] for p in parts),
+        "elapsed_s": round(elapsed, 3),
+        "events_per_s": round(loaded / elapsed, 1) if elapsed > 0 else None,
+    }
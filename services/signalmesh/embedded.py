@@ -0,0 +1,249 @@
+# services/signalmesh/embedded.py
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+from services.shared.db import get_engine, sql_text
+from services.signalmesh.outbox import MAX_ATTEMPTS
+
+log = logging.getLogger("signalmesh.embedded")
+
+# -------------------------------------------------------------------
+# Embedded single-node mode (INGEST_MODE=embedded)
+#
+# SignalMesh runs the canonical pipeline in-process instead of going
+# through Pub/Sub:
+# - ingest still commits event + audit + outbox row in one transaction;
+#   the outbox row is the durable work item
+# - after commit the event is handed to a bounded queue drained by
+#   worker threads running handle_canonical_event; a handled event gets
+#   sent_at on its outbox row, a failed one counts an attempt
+# - backpressure: ingest answers 503 + Retry-After while the queue has
+#   no room, before anything is written
+# - recovery: a sweeper enqueues pending outbox rows nobody holds, at
+#   start (events accepted before a crash) and every SWEEP_S after
+#
+# Replaces workers/outbox_relay.py on that node; run one replica.
+# -------------------------------------------------------------------
+
+MODE = os.getenv("INGEST_MODE", "pubsub").lower()
+QUEUE_SIZE = int(os.getenv("INGEST_EMBEDDED_QUEUE_SIZE", "1000"))
+WORKERS = int(os.getenv("INGEST_EMBEDDED_WORKERS", "2"))
+SWEEP_S = float(os.getenv("INGEST_EMBEDDED_SWEEP_S", "30"))
+RETRY_AFTER_S = float(os.getenv("INGEST_EMBEDDED_RETRY_AFTER_S", "2"))
+# rows younger than this are left to the ingest request that wrote them
+SWEEP_GRACE_S = 5.0
+
+WorkItem = Tuple[int, Dict[str, Any]]  # (outbox id, canonical event)
+
+
+def enabled() -> bool:
+    return MODE == "embedded"
+
+
+def _default_handler(event: Dict[str, Any]) -> None:
+    # imported on first use: the pipeline pulls in the reasoner stack
+    from workers.phase0_worker import handle_canonical_event
+
+    handle_canonical_event(event)
+
+
+class EmbeddedPipeline:
+    def __init__(
+        self,
+        *,
+        handler: Callable[[Dict[str, Any]], None] = _default_handler,
+        queue_size: int = QUEUE_SIZE,
+        workers: int = WORKERS,
+        sweep_s: float = SWEEP_S,
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.sweep_s = sweep_s
+        self._queue: "queue.Queue[Optional[WorkItem]]" = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._held: Set[int] = set()  # queued or being handled
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._stats = {"submitted": 0, "recovered": 0, "handled": 0, "failed": 0, "dropped": 0}
+
+    # ----------------------------------------------------------------
+    # Ingest side
+    # ----------------------------------------------------------------
+
+    def has_room(self, n: int = 1) -> bool:
+        return self._queue.maxsize - self._queue.qsize() >= n
+
+    def submit(self, items: Sequence[WorkItem]) -> int:
+        """
+        Hand committed events to the workers without blocking. Items that
+        do not fit stay pending in the outbox for the sweeper. Returns the
+        number queued.
+        """
+        queued = 0
+        for item in items:
+            if not self._offer(item):
+                with self._lock:
+                    self._stats["dropped"] += len(items) - queued
+                break
+            queued += 1
+        with self._lock:
+            self._stats["submitted"] += queued
+        return queued
+
+    def _offer(self, item: WorkItem) -> bool:
+        with self._lock:
+            if item[0] in self._held:
+                return True
+            self._held.add(item[0])
+        try:
+            self._queue.put_nowait(item)
+            return True
+        except queue.Full:
+            with self._lock:
+                self._held.discard(item[0])
+            return False
+
+    # ----------------------------------------------------------------
+    # Workers
+    # ----------------------------------------------------------------
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._work, name=f"embedded-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        sweeper = threading.Thread(target=self._sweep_loop, name="embedded-sweep", daemon=True)
+        sweeper.start()
+        self._threads.append(sweeper)
+        log.info("embedded pipeline started: %d workers, queue %d", self.workers, self._queue.maxsize)
+
+    def stop(self, timeout: float = 10.0) -> None:
+        """Finish the events being handled; queued ones stay pending in the outbox."""
+        self._stop.set()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                with self._lock:
+                    self._held.discard(item[0])
+        for _ in range(self.workers):
+            self._queue.put(None)
+        deadline = time.monotonic() + timeout
+        for t in self._threads:
+            t.join(max(0.0, deadline - time.monotonic()))
+        self._threads = []
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._stop.is_set():
+                with self._lock:
+                    self._held.discard(item[0])
+                continue
+            self.handle(item)
+
+    def handle(self, item: WorkItem) -> bool:
+        outbox_id, event = item
+        try:
+            self.handler(event)
+        except Exception as e:
+            log.exception("embedded: event %s failed", event.get("event_id"))
+            self._mark(outbox_id, error=str(e)[:1000])
+            ok = False
+        else:
+            self._mark(outbox_id)
+            ok = True
+        with self._lock:
+            self._held.discard(outbox_id)
+            self._stats["handled" if ok else "failed"] += 1
+        return ok
+
+    def _mark(self, outbox_id: int, error: Optional[str] = None) -> None:
+        try:
+            with get_engine().begin() as conn:
+                if error is None:
+                    conn.execute(sql_text("UPDATE ingest_outbox SET sent_at = now() WHERE id = :id"), {"id": outbox_id})
+                else:
+                    conn.execute(
+                        sql_text("UPDATE ingest_outbox SET attempts = attempts + 1, last_error = :error WHERE id = :id"),
+                        {"id": outbox_id, "error": error},
+                    )
+        except Exception:
+            # row stays pending: handled again after the next sweep (at-least-once)
+            log.exception("embedded: could not update outbox row %d", outbox_id)
+
+    # ----------------------------------------------------------------
+    # Recovery
+    # ----------------------------------------------------------------
+
+    def sweep(self, grace_s: float = SWEEP_GRACE_S) -> int:
+        """Queue pending outbox rows not held in-process. Returns rows queued."""
+        room = self._queue.maxsize - self._queue.qsize()
+        if room <= 0:
+            return 0
+        with self._lock:
+            held = list(self._held)
+        with get_engine().connect() as conn:
+            rows = conn.execute(
+                sql_text(
+                    """
+                    SELECT id, payload
+                    FROM ingest_outbox
+                    WHERE sent_at IS NULL
+                      AND attempts < :max_attempts
+                      AND created_at < now() - make_interval(secs => :grace_s)
+                      AND NOT (id = ANY(CAST(:held AS bigint[])))
+                    ORDER BY id
+                    LIMIT :room
+                    """
+                ),
+                {"max_attempts": MAX_ATTEMPTS, "grace_s": grace_s, "held": held, "room": room},
+            ).fetchall()
+        queued = 0
+        for outbox_id, payload in rows:
+            if not self._offer((outbox_id, payload)):
+                break
+            queued += 1
+        if queued:
+            with self._lock:
+                self._stats["recovered"] += queued
+            log.info("embedded: recovered %d pending events", queued)
+        return queued
+
+    def _sweep_loop(self) -> None:
+        grace_s = 0.0  # at start nothing is in flight: take everything pending
+        while not self._stop.is_set():
+            try:
+                self.sweep(grace_s)
+            except Exception:
+                log.exception("embedded: sweep failed")
+            grace_s = SWEEP_GRACE_S
+            self._stop.wait(self.sweep_s)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self._stats, "queued": self._queue.qsize(), "held": len(self._held)}
+
+
+_pipeline: Optional[EmbeddedPipeline] = None
+
+
+def get_pipeline() -> Optional[EmbeddedPipeline]:
+    """The process-wide pipeline in embedded mode, else None."""
+    global _pipeline
+    if not enabled():
+        return None
+    if _pipeline is None:
+        _pipeline = EmbeddedPipeline()
+    return _pipeline
@@ -0,0 +1,171 @@
+# services/signalmesh/idempotency.py
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from services.shared.db import get_engine, sql_text
+
+# -------------------------------------------------------------------
+# Semantic idempotency at the ingest edge
+#
+# The key is computed by the normalizer (normalizer.idempotency_key);
+# event_id is derived from it. Two layers:
+# - TTL cache: recently seen key -> (event_id, trace_id); a hit answers
+#   the request before any write
+# - event_idempotency (infra/sql/008_event_idempotency.sql): unique key,
+#   claimed with ON CONFLICT DO NOTHING in the ingest transaction, so
+#   concurrent deliveries of the same event write it exactly once
+# - prune_keys(): retention; keys of events already archived are deleted
+#   by partition maintenance (infra/sql/013_event_idempotency_retention.sql)
+# -------------------------------------------------------------------
+
+CACHE_TTL_S = float(os.getenv("INGEST_IDEMPOTENCY_TTL_S", "600"))
+CACHE_MAX_KEYS = int(os.getenv("INGEST_IDEMPOTENCY_CACHE_SIZE", "100000"))
+PRUNE_BATCH_SIZE = int(os.getenv("INGEST_IDEMPOTENCY_PRUNE_BATCH", "10000"))
+
+Owner = Tuple[str, str]  # (event_id, trace_id) of the first delivery
+
+
+class SeenCache:
+    """Thread-safe LRU of key -> owner, entries expire after `ttl_seconds`."""
+
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float = CACHE_TTL_S,
+        max_keys: int = CACHE_MAX_KEYS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (event_id, trace_id, expires_at)
+        self._seen: "OrderedDict[str, Tuple[str, str, float]]" = OrderedDict()
+        self._stats = {"checked": 0, "cache_hits": 0, "batch_hits": 0, "db_hits": 0}
+
+    def get(self, key: str) -> Optional[Owner]:
+        now = self._clock()
+        with self._lock:
+            self._stats["checked"] += 1
+            entry = self._seen.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= now:
+                del self._seen[key]
+                return None
+            self._stats["cache_hits"] += 1
+            return entry[0], entry[1]
+
+    def put(self, key: str, owner: Owner) -> None:
+        expires_at = self._clock() + self.ttl_seconds
+        with self._lock:
+            self._seen[key] = (owner[0], owner[1], expires_at)
+            self._seen.move_to_end(key)
+            while len(self._seen) > self.max_keys:
+                self._seen.popitem(last=False)
+
+    def count(self, stat: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[stat] += n
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            checked = self._stats["checked"]
+            duplicates = self._stats["cache_hits"] + self._stats["batch_hits"] + self._stats["db_hits"]
+            return {
+                **self._stats,
+                "duplicates": duplicates,
+                "duplicate_rate": round(duplicates / checked, 4) if checked else 0.0,
+                "cached_keys": len(self._seen),
+            }
+
+
+seen = SeenCache()
+
+
+def claim_many(conn, entries: Sequence[Tuple[str, str, str]]) -> Dict[str, Owner]:
+    """
+    Claim (key, event_id, trace_id) entries inside the caller's transaction.
+    Returns the first delivery's owner for every key that was already
+    claimed; the caller writes only the others. Keys must be distinct.
+    """
+    if not entries:
+        return {}
+    claimed = set(
+        conn.execute(
+            sql_text(
+                """
+                INSERT INTO event_idempotency (idempotency_key, event_id, trace_id)
+                SELECT k, e, t
+                FROM unnest(CAST(:keys AS text[]), CAST(:event_ids AS text[]), CAST(:trace_ids AS text[])) AS u (k, e, t)
+                ORDER BY k  -- same lock order in concurrent batches
+                ON CONFLICT (idempotency_key) DO NOTHING
+                RETURNING idempotency_key
+                """
+            ),
+            {
+                "keys": [k for k, _, _ in entries],
+                "event_ids": [e for _, e, _ in entries],
+                "trace_ids": [t for _, _, t in entries],
+            },
+        ).scalars()
+    )
+    taken = [k for k, _, _ in entries if k not in claimed]
+    if not taken:
+        return {}
+    # a conflicting insert waited for the claiming transaction, so its row is visible
+    rows = conn.execute(
+        sql_text(
+            """
+            SELECT idempotency_key, event_id, trace_id
+            FROM event_idempotency
+            WHERE idempotency_key = ANY(CAST(:keys AS text[]))
+            """
+        ),
+        {"keys": taken},
+    ).fetchall()
+    seen.count("db_hits", len(rows))
+    return {k: (e, t) for k, e, t in rows}
+
+
+def prune_keys(before: datetime, *, batch_size: int = PRUNE_BATCH_SIZE, dry_run: bool = False) -> int:
+    """
+    Delete keys first seen before `before`, `batch_size` rows per
+    transaction so ingest never waits long on the deletes. Returns the
+    number of keys deleted (or that would be, with dry_run).
+    """
+    engine = get_engine()
+
+    if dry_run:
+        with engine.connect() as conn:
+            return conn.execute(
+                sql_text("SELECT count(*) FROM event_idempotency WHERE first_seen_at < :before"),
+                {"before": before},
+            ).scalar_one()
+
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            n = conn.execute(
+                sql_text(
+                    """
+                    DELETE FROM event_idempotency
+                    WHERE idempotency_key IN (
+                        SELECT idempotency_key
+                        FROM event_idempotency
+                        WHERE first_seen_at < :before
+                        ORDER BY first_seen_at
+                        LIMIT :batch_size
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    """
+                ),
+                {"before": before, "batch_size": batch_size},
+            ).rowcount
+        deleted += n
+        if n < batch_size:
+            return deleted
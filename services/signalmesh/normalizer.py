@@ -1,22 +1,316 @@
-from services.shared.ids import new_id
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
 from services.signalmesh.schemas import IngestEvent, CanonicalEvent
 
-def normalize(ingest: IngestEvent, trace_id: str) -> CanonicalEvent:
-    # Deterministic normalization only: schema shaping + safe defaults
-    event_id = new_id("evt")
-    normalized = {
-        "raw_keys": sorted(list(ingest.payload.keys())),
-        "message": str(ingest.payload.get("message") or ingest.payload.get("title") or ""),
-        "service": ingest.payload.get("service") or ingest.payload.get("app") or "unknown",
-        "region": ingest.payload.get("region") or "unknown",
-    }
+# -------------------------------------------------------------------
+# Per-source normalizers
+#
+# Each connector source gets a SourceNormalizer: candidate extraction
+# paths per canonical field ("issue.fields.summary", "components.0.name"
+# or a callable), compiled once at registration into getters. The first
+# non-empty candidate wins. Unknown sources use the generic normalizer,
+# which keeps the original message/title, service/app, region probing.
+#
+# event_id is derived from the semantic idempotency key (source, event
+# type, occurred_at instant, the normalizer's identity fields), so a
+# re-delivered alert gets the same event_id as the first delivery.
+#
+# Deterministic normalization only: schema shaping + safe defaults.
+# -------------------------------------------------------------------
+
+Getter = Callable[[Dict[str, Any]], Any]
+Candidate = Union[str, Getter]
+
+_DEFAULTS = {"message": "", "service": "unknown", "region": "unknown"}
+_IDENTITY = ("external_id", "service", "host", "region", "message")
+
+
+def compile_path(path: str) -> Getter:
+    """'a.b.0.c' -> getter walking dicts by key and lists by index."""
+    steps: Tuple[Union[str, int], ...] = tuple(int(p) if p.isdigit() else p for p in path.split("."))
+
+    if len(steps) == 1 and isinstance(steps[0], str):
+        key = steps[0]
+        return lambda payload: payload.get(key)
+
+    def get(payload: Dict[str, Any]) -> Any:
+        value: Any = payload
+        for step in steps:
+            if isinstance(value, dict):
+                value = value.get(step if isinstance(step, str) else str(step))
+            elif isinstance(value, list) and isinstance(step, int) and step < len(value):
+                value = value[step]
+            else:
+                return None
+            if value is None:
+                return None
+        return value
+
+    return get
+
+
+def tag(name: str, path: str = "tags") -> Getter:
+    """Value of a 'name:value' tag; tags as a list or a comma-separated string."""
+    get_tags = compile_path(path)
+    prefix = f"{name}:"
+
+    def get(payload: Dict[str, Any]) -> Any:
+        tags = get_tags(payload)
+        if isinstance(tags, str):
+            tags = tags.split(",")
+        if not isinstance(tags, list):
+            return None
+        for t in tags:
+            if isinstance(t, str) and t.strip().startswith(prefix):
+                return t.strip()[len(prefix):]
+        return None
+
+    return get
+
+
+class SourceNormalizer:
+    def __init__(
+        self,
+        name: str,
+        fields: Dict[str, Sequence[Candidate]],
+        *,
+        aliases: Iterable[str] = (),
+        event_types: Optional[Dict[str, str]] = None,
+        severities: Optional[Dict[str, str]] = None,
+        identity: Sequence[str] = _IDENTITY,
+    ):
+        self.name = name
+        self.aliases = tuple(aliases)
+        self.identity = tuple(identity)
+        self.event_types = {k.lower(): v for k, v in (event_types or {}).items()}
+        self.severities = {k.lower(): v for k, v in (severities or {}).items()}
+        self._fields: List[Tuple[str, Tuple[Getter, ...]]] = [
+            (field, tuple(compile_path(c) if isinstance(c, str) else c for c in candidates))
+            for field, candidates in fields.items()
+        ]
+
+    def extract(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for field, getters in self._fields:
+            value = None
+            for getter in getters:
+                value = getter(payload)
+                if value is not None and value != "":
+                    break
+            out[field] = value
+        return out
+
+    def event_type(self, raw: str) -> str:
+        key = raw.strip().lower()
+        return self.event_types.get(key, key)
+
+    def severity(self, raw: Optional[str], extracted: Any) -> Optional[str]:
+        value = raw if raw else extracted
+        if value is None or value == "":
+            return None
+        key = str(value).strip().lower()
+        return self.severities.get(key, key)
+
+
+_REGISTRY: Dict[str, SourceNormalizer] = {}
+
+
+def register(normalizer: SourceNormalizer) -> SourceNormalizer:
+    for key in (normalizer.name, *normalizer.aliases):
+        _REGISTRY[key.lower()] = normalizer
+    return normalizer
+
+
+def get_normalizer(source: str) -> SourceNormalizer:
+    return _REGISTRY.get(source.strip().lower(), GENERIC)
+
+
+def _subject(normalized: Dict[str, Any], source: str) -> str:
+    if normalized["service"] != "unknown":
+        return f"service/{normalized['service']}"
+    if normalized.get("host"):
+        return f"host/{normalized['host']}"
+    return f"source/{source}"
+
+
+def _instant(occurred_at: str) -> str:
+    # "...Z", "+00:00" and other offsets of the same instant key alike
+    try:
+        parsed = datetime.fromisoformat(occurred_at.strip())
+    except ValueError:
+        return occurred_at.strip()
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).isoformat()
+
+
+def idempotency_key(
+    source: str,
+    event_type: str,
+    occurred_at: str,
+    normalized: Dict[str, Any],
+    identity: Sequence[str],
+    payload: Dict[str, Any],
+) -> str:
+    """
+    sha256 over source, event type, occurred_at instant and the identity
+    fields. Payloads without any identity field key on their full content.
+    """
+    values = [normalized.get(f) for f in identity]
+    parts: List[Any] = [source, event_type, _instant(occurred_at)]
+    if all(v is None or v == _DEFAULTS.get(f, "") for f, v in zip(identity, values)):
+        parts.append(payload)
+    else:
+        parts.extend(values)
+    blob = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def _canonical(ingest: IngestEvent, trace_id: str, normalizer: SourceNormalizer) -> CanonicalEvent:
+    payload = ingest.payload
+    extracted = normalizer.extract(payload)
+    severity = normalizer.severity(ingest.severity, extracted.pop("severity", None))
+
+    normalized: Dict[str, Any] = {"raw_keys": sorted(payload.keys())}
+    for field, default in _DEFAULTS.items():
+        value = extracted.pop(field, None)
+        normalized[field] = default if value is None or value == "" else str(value)
+    normalized.update((k, v) for k, v in extracted.items() if v is not None)
+
+    source = ingest.source.strip().lower()
+    event_type = normalizer.event_type(ingest.event_type)
+    key = idempotency_key(source, event_type, ingest.occurred_at, normalized, normalizer.identity, payload)
+    normalized["normalizer"] = normalizer.name
+    normalized["subject"] = _subject(normalized, source)
 
     return CanonicalEvent(
-        event_id=event_id,
+        event_id=f"evt_{key[:32]}",
         trace_id=trace_id,
-        source=ingest.source,
-        event_type=ingest.event_type,
+        source=source,
+        event_type=event_type,
         occurred_at=ingest.occurred_at,
-        severity=ingest.severity,
-        normalized=normalized
+        severity=severity,
+        normalized=normalized,
+        idempotency_key=key,
+    )
+
+
+def normalize(ingest: IngestEvent, trace_id: str) -> CanonicalEvent:
+    return _canonical(ingest, trace_id, get_normalizer(ingest.source))
+
+
+def normalize_many(ingests: Sequence[IngestEvent], trace_ids: Sequence[str]) -> List[CanonicalEvent]:
+    """Batch form of normalize(); resolves each distinct source once."""
+    if len(ingests) != len(trace_ids):
+        raise ValueError("ingests and trace_ids differ in length")
+    resolved: Dict[str, SourceNormalizer] = {}
+    out: List[CanonicalEvent] = []
+    for ingest, trace_id in zip(ingests, trace_ids):
+        normalizer = resolved.get(ingest.source)
+        if normalizer is None:
+            normalizer = resolved[ingest.source] = get_normalizer(ingest.source)
+        out.append(_canonical(ingest, trace_id, normalizer))
+    return out
+
+
+# -------------------------------------------------------------------
+# Built-in sources
+# -------------------------------------------------------------------
+
+GENERIC = SourceNormalizer(
+    "generic",
+    {
+        "message": ("message", "title"),
+        "service": ("service", "app"),
+        "region": ("region",),
+    },
+)
+
+register(
+    SourceNormalizer(
+        "datadog",
+        {
+            "message": ("title", "msg_title", "event.title", "message", "body", "text"),
+            "service": (tag("service"), "service"),
+            "region": (tag("region"), tag("availability-zone"), "region"),
+            "host": ("host", "hostname"),
+            "env": (tag("env"),),
+            "external_id": ("id", "event.id", "alert_id"),
+            "monitor_id": ("monitor_id", "alert_id"),
+            "status": ("alert_transition", "alert_status"),
+            "url": ("link", "url"),
+            "severity": ("priority", "alert_type"),
+        },
+        event_types={
+            "triggered": "alert",
+            "re-triggered": "alert",
+            "renotify": "alert",
+            "warn": "alert",
+            "no data": "alert",
+            "recovered": "resolved",
+        },
+        severities={"p1": "critical", "p2": "high", "p3": "medium", "p4": "low", "p5": "info",
+                    "error": "high", "warning": "medium", "success": "info"},
+    )
+)
+
+register(
+    SourceNormalizer(
+        "jira",
+        {
+            "message": ("issue.fields.summary", "summary", "title"),
+            "service": ("issue.fields.components.0.name", "component", "service"),
+            "region": ("region",),
+            "external_id": ("issue.key", "key"),
+            "project": ("issue.fields.project.key", "project"),
+            "status": ("issue.fields.status.name", "status"),
+            "assignee": ("issue.fields.assignee.displayName",),
+            "severity": ("issue.fields.priority.name", "priority"),
+        },
+        event_types={
+            "jira:issue_created": "incident",
+            "jira:issue_updated": "change",
+        },
+        severities={"highest": "critical", "blocker": "critical", "lowest": "low", "trivial": "low"},
+    )
+)
+
+register(
+    SourceNormalizer(
+        "siem",
+        {
+            "message": ("message", "rule.name", "alert.name", "signature", "title"),
+            "service": ("service.name", "service", "app"),
+            "region": ("cloud.region", "region"),
+            "host": ("host.name", "host.hostname", "host", "dest_host"),
+            "external_id": ("alert.id", "event.id", "id"),
+            "rule": ("rule.name", "rule.id", "signature_id"),
+            "src_ip": ("source.ip", "src_ip", "src"),
+            "user": ("user.name", "user"),
+            "severity": ("event.severity_label", "alert.severity", "severity"),
+        },
+        aliases=("splunk", "sentinel", "qradar"),
+    )
+)
+
+register(
+    SourceNormalizer(
+        "pagerduty",
+        {
+            "message": ("event.data.title", "title", "summary"),
+            "service": ("event.data.service.summary", "service.summary", "service"),
+            "region": ("region",),
+            "external_id": ("event.data.id", "id"),
+            "url": ("event.data.html_url", "html_url"),
+            "severity": ("event.data.urgency", "urgency"),
+        },
+        event_types={
+            "incident.triggered": "incident",
+            "incident.acknowledged": "change",
+            "incident.resolved": "resolved",
+        },
     )
+)
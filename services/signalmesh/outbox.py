@@ -0,0 +1,200 @@
+# services/signalmesh/outbox.py
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence
+
+from services.shared.config import settings
+from services.shared.db import get_engine, sql_text
+from services.signalmesh.publisher import get_publisher
+
+log = logging.getLogger("signalmesh.outbox")
+
+# -------------------------------------------------------------------
+# Transactional outbox (see infra/sql/007_ingest_outbox.sql)
+#
+# - enqueue(): inside the ingest transaction, next to the event row
+# - relay_once(): claim pending rows (FOR UPDATE SKIP LOCKED, so relays
+#   can run side by side), publish them as one batch per topic, stamp
+#   sent_at on the published ones and count attempts on the rest
+# - buses: PubSubBus for production, InMemoryBus for tests / local dev
+# -------------------------------------------------------------------
+
+BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "500"))
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+PUBLISH_TIMEOUT_S = float(os.getenv("OUTBOX_PUBLISH_TIMEOUT_S", "30"))
+
+
+def enqueue(conn, event_dicts: Sequence[Dict[str, Any]], topic: Optional[str] = None) -> List[int]:
+    """
+    Add canonical events to the outbox inside the caller's transaction.
+    Returns the outbox ids, in the order of `event_dicts`.
+    """
+    if not event_dicts:
+        return []
+    # one multi-row statement; works on run_sync() connections of the
+    # async engine too, where COPY through the sync driver is not possible
+    ids = conn.execute(
+        sql_text(
+            """
+            INSERT INTO ingest_outbox (topic, payload)
+            SELECT :topic, CAST(p AS jsonb)
+            FROM unnest(CAST(:payloads AS text[])) WITH ORDINALITY AS t (p, n)
+            ORDER BY n
+            RETURNING id
+            """
+        ),
+        {"topic": topic or settings.pubsub_topic_ingest, "payloads": [json.dumps(e) for e in event_dicts]},
+    ).scalars().all()
+    # ids are drawn in ORDER BY n order
+    return sorted(ids)
+
+
+# -------------------------------------------------------------------
+# Buses: publish_batch(topic, payloads) -> one error (or None) per payload
+# -------------------------------------------------------------------
+
+class PubSubBus:
+    def __init__(self, publisher=None, timeout_s: float = PUBLISH_TIMEOUT_S):
+        self.publisher = publisher or get_publisher()
+        if self.publisher is None or not settings.gcp_project:
+            raise RuntimeError("Pub/Sub unavailable: set ENABLE_PUBSUB=true and GCP_PROJECT")
+        self.timeout_s = timeout_s
+
+    def publish_batch(self, topic: str, payloads: List[bytes]) -> List[Optional[Exception]]:
+        topic_path = self.publisher.topic_path(settings.gcp_project, topic)
+        # all publishes are enqueued first so the client packs them into batches
+        futures = [self.publisher.publish(topic_path, data=p) for p in payloads]
+        errors: List[Optional[Exception]] = []
+        for future in futures:
+            try:
+                future.result(timeout=self.timeout_s)
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+
+
+class InMemoryBus:
+    """
+    Stand-in for Pub/Sub. Keeps published payloads per topic; `fail_next`
+    makes that many upcoming publishes fail.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.messages: Dict[str, List[bytes]] = defaultdict(list)
+        self.fail_next = 0
+
+    def publish_batch(self, topic: str, payloads: List[bytes]) -> List[Optional[Exception]]:
+        errors: List[Optional[Exception]] = []
+        with self._lock:
+            for payload in payloads:
+                if self.fail_next > 0:
+                    self.fail_next -= 1
+                    errors.append(RuntimeError("injected publish failure"))
+                    continue
+                self.messages[topic].append(payload)
+                errors.append(None)
+        return errors
+
+    def events(self, topic: Optional[str] = None) -> List[Dict[str, Any]]:
+        topic = topic or settings.pubsub_topic_ingest
+        with self._lock:
+            return [json.loads(p) for p in self.messages[topic]]
+
+
+# -------------------------------------------------------------------
+# Relay
+# -------------------------------------------------------------------
+
+def relay_once(bus, *, batch_size: int = BATCH_SIZE, max_attempts: int = MAX_ATTEMPTS) -> Dict[str, int]:
+    """
+    Publish up to `batch_size` pending rows. Returns {"claimed", "sent", "failed"}.
+    Rows stay locked while their batch is published; a relay that dies
+    mid-batch rolls back and the rows are claimed again (at-least-once).
+    """
+    with get_engine().begin() as conn:
+        rows = conn.execute(
+            sql_text(
+                """
+                SELECT id, topic, payload::text
+                FROM ingest_outbox
+                WHERE sent_at IS NULL
+                  AND attempts < :max_attempts
+                ORDER BY id
+                LIMIT :batch_size
+                FOR UPDATE SKIP LOCKED
+                """
+            ),
+            {"max_attempts": max_attempts, "batch_size": batch_size},
+        ).fetchall()
+
+        if not rows:
+            return {"claimed": 0, "sent": 0, "failed": 0}
+
+        by_topic: Dict[str, List[tuple]] = defaultdict(list)
+        for row_id, topic, payload in rows:
+            by_topic[topic].append((row_id, payload))
+
+        sent: List[int] = []
+        failed: List[Dict[str, Any]] = []
+        for topic, items in by_topic.items():
+            errors = bus.publish_batch(topic, [payload.encode("utf-8") for _, payload in items])
+            for (row_id, _), error in zip(items, errors):
+                if error is None:
+                    sent.append(row_id)
+                else:
+                    failed.append({"id": row_id, "error": str(error)[:1000]})
+
+        if sent:
+            conn.execute(
+                sql_text("UPDATE ingest_outbox SET sent_at = now() WHERE id = ANY(CAST(:ids AS bigint[]))"),
+                {"ids": sent},
+            )
+        if failed:
+            conn.execute(
+                sql_text(
+                    """
+                    UPDATE ingest_outbox
+                    SET attempts = attempts + 1, last_error = :error
+                    WHERE id = :id
+                    """
+                ),
+                failed,
+            )
+
+    if failed:
+        log.warning("outbox: %d of %d publishes failed (first: %s)", len(failed), len(rows), failed[0]["error"])
+    return {"claimed": len(rows), "sent": len(sent), "failed": len(failed)}
+
+
+def purge_sent(older_than: timedelta) -> int:
+    """Delete rows published more than `older_than` ago. Returns rows deleted."""
+    cutoff = datetime.now(timezone.utc) - older_than
+    with get_engine().begin() as conn:
+        return conn.execute(
+            sql_text("DELETE FROM ingest_outbox WHERE sent_at IS NOT NULL AND sent_at < :cutoff"),
+            {"cutoff": cutoff},
+        ).rowcount
+
+
+def backlog() -> Dict[str, int]:
+    """Pending rows, and rows that exhausted their attempts (dead)."""
+    with get_engine().connect() as conn:
+        row = conn.execute(
+            sql_text(
+                """
+                SELECT
+                    count(*) FILTER (WHERE attempts < :max_attempts),
+                    count(*) FILTER (WHERE attempts >= :max_attempts)
+                FROM ingest_outbox
+                WHERE sent_at IS NULL
+                """
+            ),
+            {"max_attempts": MAX_ATTEMPTS},
+        ).one()
+    return {"pending": int(row[0]), "dead": int(row[1])}
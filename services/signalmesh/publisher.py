@@ -0,0 +1,46 @@
+import logging
+import os
+import threading
+
+from services.shared.config import settings
+
+log = logging.getLogger("signalmesh.publisher")
+
+# Pub/Sub is optional for local dev.
+# We only initialize if explicitly enabled (prevents ADC errors locally).
+# The google-cloud-pubsub import and client construction are deferred
+# to the first publish so processes that never publish do not pay for them.
+ENABLE_PUBSUB = os.getenv("ENABLE_PUBSUB", "false").lower() == "true"
+
+# publish() only enqueues; the client sends a batch when any limit is hit
+BATCH_MAX_MESSAGES = int(os.getenv("PUBSUB_BATCH_MAX_MESSAGES", "100"))
+BATCH_MAX_BYTES = int(os.getenv("PUBSUB_BATCH_MAX_BYTES", str(1024 * 1024)))
+BATCH_MAX_LATENCY_S = float(os.getenv("PUBSUB_BATCH_MAX_LATENCY_S", "0.01"))
+
+_publisher = None
+_publisher_lock = threading.Lock()
+_publisher_unavailable = False
+
+
+def get_publisher():
+    global _publisher, _publisher_unavailable
+    if not ENABLE_PUBSUB or _publisher_unavailable:
+        return None
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None and not _publisher_unavailable:
+                try:
+                    from google.cloud import pubsub_v1
+                except Exception:
+                    log.warning("ENABLE_PUBSUB=true but google-cloud-pubsub is not importable")
+                    _publisher_unavailable = True
+                    return None
+                _publisher = pubsub_v1.PublisherClient(
+                    batch_settings=pubsub_v1.types.BatchSettings(
+                        max_messages=BATCH_MAX_MESSAGES,
+                        max_bytes=BATCH_MAX_BYTES,
+                        max_latency=BATCH_MAX_LATENCY_S,
+                    )
+                )
+    return _publisher
+
@@ -16,3 +16,4 @@ class CanonicalEvent(BaseModel):
     occurred_at: str
     severity: Optional[str] = None
     normalized: Dict[str, Any] = Field(default_factory=dict)
+    idempotency_key: Optional[str] = None
@@ -0,0 +1,91 @@
+# tests/test_admission.py
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from services.signalmesh import admission
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _controller(clock, **kwargs):
+    kwargs.setdefault("limits", admission.parse_limits("*=10,siem=2,siem/alert=1"))
+    kwargs.setdefault("burst_s", 1)
+    kwargs.setdefault("lag_fn", lambda: 0)
+    return admission.AdmissionController(clock=clock, **kwargs)
+
+
+def test_parse_limits():
+    assert admission.parse_limits(" *=5, Siem/Alert=0.5 ,") == {"*": 5.0, "siem/alert": 0.5}
+    with pytest.raises(ValueError):
+        admission.parse_limits("siem")
+
+
+def test_rate_limits_per_source_and_event_type():
+    clock = _Clock()
+    c = _controller(clock)
+
+    assert c.admit("siem", "alert", "high", lag=0).admitted
+    refused = c.admit("siem", "alert", "high", lag=0)
+    assert not refused.admitted and refused.reason == "rate_limited:siem/alert"
+    assert refused.retry_after == "1"
+
+    assert c.admit("siem", "change", "high", lag=0).admitted  # last source token
+    refused = c.admit("siem", "change", "high", lag=0)
+    assert refused.reason == "rate_limited:siem"
+
+    # other sources have their own bucket
+    assert all(c.admit("datadog", "alert", None, lag=0).admitted for _ in range(10))
+
+    clock.now = 1.0
+    assert c.admit("siem", "alert", "high", lag=0).admitted
+    assert c.stats()["rate_limited"] == 2
+
+
+def test_shedding_by_severity():
+    c = _controller(_Clock(), limits={}, shed_lag=100)
+    assert c.admit("siem", "alert", "low", lag=99).admitted
+    assert c.admit("siem", "alert", "low", lag=100).reason == "shed:low"
+    assert c.admit("siem", "alert", None, lag=100).reason == "shed:none"
+    assert c.admit("siem", "alert", "medium", lag=150).admitted
+    assert c.admit("siem", "alert", "high", lag=399).admitted
+    assert not c.admit("siem", "alert", "high", lag=400).admitted
+    assert c.admit("siem", "alert", "critical", lag=10**9).admitted
+    assert c.stats()["refused"] == {"shed:low": 1, "shed:none": 1, "shed:high": 1}
+
+
+def test_lag_is_sampled_once_per_interval():
+    clock = _Clock()
+    samples = iter([5, 7])
+    c = _controller(clock, lag_sample_s=2, lag_fn=lambda: next(samples))
+
+    assert c.lag() == 5
+    assert c.cached_lag() == 5
+    clock.now = 2.0
+    assert c.cached_lag() is None  # this caller samples ...
+    assert c.cached_lag() == 5  # ... the others keep the old value meanwhile
+    assert c.refresh_lag() == 7
+
+    c._lag_fn = lambda: 1 / 0
+    clock.now = 4.0
+    assert c.lag() == 7  # failed sample keeps the last value
+
+
+def test_ingest_returns_429_with_retry_after(monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import services.signalmesh.app as signalmesh
+
+    monkeypatch.setattr(admission, "controller", _controller(_Clock(), limits={"*": 0.0}, shed_lag=1, lag_fn=lambda: 5))
+    body = {"source": "siem", "event_type": "alert", "occurred_at": "2026-01-01T00:00:00Z", "severity": "low", "payload": {"id": "x"}}
+    r = TestClient(signalmesh.app).post("/v1/ingest", json=body)
+    assert r.status_code == 429
+    assert r.headers["retry-after"] == "5"
+    assert r.json()["detail"] == "shed:low"
@@ -0,0 +1,109 @@
+# tests/test_audit_api.py
+import gzip
+import json
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+import apps.adminconsole.api as api
+from services.shared import db, partitions
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TRACE = "trc_audit_api_test"
+
+
+def test_cursor_roundtrip_and_invalid_cursor():
+    cursor = api._encode_cursor("2026-01-01T00:00:00+00:00", 7, True)
+    created_at, row_id, live = api._decode_cursor(cursor)
+    assert (created_at.isoformat(), row_id, live) == ("2026-01-01T00:00:00+00:00", 7, True)
+
+    r = TestClient(api.app).get(f"/v1/audit/{TRACE}", params={"cursor": "not-a-cursor"})
+    assert r.status_code == 400 and r.json()["detail"] == "invalid cursor"
+
+
+@pytest.fixture
+def audit_db(monkeypatch, tmp_path):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from sqlalchemy import create_engine, text
+
+    from services.shared.migrations import migrate
+
+    engine = create_engine(TEST_DATABASE_URL, future=True)
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM audit_log WHERE trace_id = :t"), {"t": TRACE})
+        for i in range(5):
+            conn.execute(
+                text(
+                    "INSERT INTO audit_log (trace_id, actor, action, details, created_at) "
+                    "VALUES (:t, :actor, 'ingest', '{}', '2026-10-01T00:00:00Z'::timestamptz + make_interval(mins => :i))"
+                ),
+                {"t": TRACE, "actor": "worker" if i % 2 else "signalmesh", "i": i},
+            )
+
+    # one archived (detached) partition with three older rows, exported
+    # in created_at order only: the tied rows are out of id order
+    os.makedirs(tmp_path / "audit_log")
+    with gzip.open(tmp_path / "audit_log" / "audit_log_p202001.jsonl.gz", "wt") as f:
+        for row_id, minute in ((1, 0), (3, 1), (2, 1)):
+            row = {"id": row_id, "trace_id": TRACE, "actor": "signalmesh", "action": "ingest",
+                   "details": {"n": row_id - 1}, "created_at": f"2020-01-01T00:0{minute}:00+00:00"}
+            f.write(json.dumps(row) + "\n")
+    manifest = {"version": 1, "partitions": [{"table": "audit_log", "range_start": "2020-01-01T00:00:00+00:00",
+                                              "path": "audit_log/audit_log_p202001.jsonl.gz", "trace_ids": [TRACE]}]}
+    (tmp_path / "manifest.json").write_text(json.dumps(manifest))
+
+    monkeypatch.setattr(partitions, "ARCHIVE_DIR", str(tmp_path))
+    monkeypatch.setattr(db, "DATABASE_READ_URL", "")
+    monkeypatch.setattr(db, "_READ_ENGINE", None)
+    monkeypatch.setattr(db, "get_engine", lambda: engine)
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM audit_log WHERE trace_id = :t"), {"t": TRACE})
+    engine.dispose()
+
+
+def test_pages_cross_from_archive_to_live(audit_db):
+    client = TestClient(api.app)
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        body = client.get(f"/v1/audit/{TRACE}", params=params).json()
+        assert len(body["events"]) <= 3
+        seen += body["events"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 8
+    assert [e["created_at"][:4] for e in seen] == ["2020"] * 3 + ["2026"] * 5
+    assert seen == sorted(seen, key=lambda e: e["created_at"])
+    assert [e["details"]["n"] for e in seen[:3]] == [0, 1, 2]
+
+
+def test_single_row_pages_do_not_skip_tied_archived_rows(audit_db):
+    client = TestClient(api.app)
+    seen, cursor = [], None
+    for _ in range(3):
+        params = {"limit": 1, **({"cursor": cursor} if cursor else {})}
+        body = client.get(f"/v1/audit/{TRACE}", params=params).json()
+        seen += body["events"]
+        cursor = body["next_cursor"]
+    assert [e["details"]["n"] for e in seen] == [0, 1, 2]
+
+
+def test_filters_and_ndjson_stream(audit_db):
+    client = TestClient(api.app)
+    body = client.get(f"/v1/audit/{TRACE}", params={"actor": "worker"}).json()
+    assert [e["actor"] for e in body["events"]] == ["worker", "worker"] and body["next_cursor"] is None
+
+    r = client.get(f"/v1/audit/{TRACE}", params={"actor": "signalmesh"}, headers={"Accept": "application/x-ndjson"})
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert len(lines) == 6 and [line["details"]["n"] for line in lines[:3]] == [0, 1, 2]
@@ -0,0 +1,19 @@
+# tests/test_audit_chain.py
+from datetime import datetime, timezone
+
+from services.audit.audit_chain import GENESIS_HASH, compute_row_hash
+
+TS = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_row_hash_is_canonical():
+    a = compute_row_hash(GENESIS_HASH, "trc_1", "signalmesh", "ingest", {"a": 1, "b": 2}, TS)
+    b = compute_row_hash(GENESIS_HASH, "trc_1", "signalmesh", "ingest", {"b": 2, "a": 1}, TS.replace(tzinfo=None))
+    assert a == b
+
+
+def test_row_hash_links_to_predecessor():
+    first = compute_row_hash(GENESIS_HASH, "trc_1", "w", "x", {}, TS)
+    second = compute_row_hash(first, "trc_1", "w", "x", {}, TS)
+    assert second != first
+    assert compute_row_hash("f" * 64, "trc_1", "w", "x", {}, TS) != second
@@ -0,0 +1,59 @@
+# tests/test_bulk_loader.py
+import json
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from services.signalmesh.bulk_loader import iter_records, split_ranges
+
+
+def _ndjson(tmp_path, n):
+    path = tmp_path / "events.ndjson"
+    with open(path, "w") as f:
+        for i in range(n):
+            f.write(json.dumps({"source": "datadog", "event_type": "alert", "occurred_at": "2026-01-01T00:00:00Z", "payload": {"i": i}}) + "\n")
+        f.write("not json\n\n")
+    return str(path)
+
+
+def test_ndjson_offsets_resume_exactly(tmp_path):
+    path = _ndjson(tmp_path, 5)
+    records = list(iter_records(path, "ndjson"))
+    assert [r["payload"]["i"] for _, r in records[:5]] == [0, 1, 2, 3, 4]
+    assert records[5][1] is None  # unparseable line is reported, blank line skipped
+
+    resumed = list(iter_records(path, "ndjson", start_offset=records[2][0]))
+    assert [r["payload"]["i"] for _, r in resumed[:2]] == [3, 4]
+
+
+def test_split_ranges_cover_file_on_line_boundaries(tmp_path):
+    path = _ndjson(tmp_path, 50)
+    ranges = split_ranges(path, 4)
+    assert ranges[0][0] == 0
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+
+    seen = []
+    for start, stop in ranges:
+        seen += [r["payload"]["i"] for _, r in iter_records(path, "ndjson", start, stop) if r]
+    assert seen == list(range(50))
+
+
+def test_csv_multiline_fields_and_payload_columns(tmp_path):
+    path = tmp_path / "export.csv"
+    path.write_text(
+        'occurred_at,severity,title,description\n'
+        '2026-01-01T00:00:00Z,high,disk full,"line1\nline2 ""quoted"""\n'
+        '2026-01-01T01:00:00Z,,cpu,plain\n'
+        'short,row\n'
+    )
+    records = list(iter_records(str(path), "csv"))
+    first, second, bad = (r for _, r in records)
+
+    assert first["severity"] == "high"
+    assert first["payload"] == {"title": "disk full", "description": 'line1\nline2 "quoted"'}
+    assert "severity" not in second
+    assert bad is None
+
+    resumed = list(iter_records(str(path), "csv", start_offset=records[0][0]))
+    assert resumed[0][1]["payload"]["title"] == "cpu"
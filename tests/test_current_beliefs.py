@@ -0,0 +1,85 @@
+# tests/test_current_beliefs.py
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+import apps.adminconsole.api as api
+from services.shared import db
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+BELIEFS = [
+    ("cbtest/api", "Issue affecting cbtest/api", 0.9),
+    ("cbtest/api", "Latency on cbtest/api", 0.4),
+    ("cbtest/db", "Issue affecting cbtest/db", 0.7),
+    ("cbtest/db", "Disk on cbtest/db", 0.7),
+    ("cbtestx/web", "Issue affecting cbtestx/web", 0.95),
+]
+
+
+@pytest.fixture
+def beliefs_db(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from sqlalchemy import create_engine, text
+
+    from services.shared.migrations import migrate
+
+    engine = create_engine(TEST_DATABASE_URL, future=True)
+    migrate(engine)
+    cleanup = "DELETE FROM current_beliefs WHERE subject LIKE 'cbtest%'"
+    with engine.begin() as conn:
+        conn.execute(text(cleanup))
+        for i, (subject, hypothesis, confidence) in enumerate(BELIEFS):
+            conn.execute(
+                text(
+                    "INSERT INTO current_beliefs (subject, hypothesis, belief_id, trace_id, confidence, evidence_ids, updated_at) "
+                    "VALUES (:s, :h, :b, 'trc_cb', :c, '[]', now() - make_interval(mins => :i))"
+                ),
+                {"s": subject, "h": hypothesis, "b": f"blf_cb_{i}", "c": confidence, "i": i},
+            )
+    monkeypatch.setattr(db, "DATABASE_READ_URL", "")
+    monkeypatch.setattr(db, "_READ_ENGINE", None)
+    monkeypatch.setattr(db, "get_engine", lambda: engine)
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text(cleanup))
+    engine.dispose()
+
+
+def _pages(client, params):
+    seen, cursor = [], None
+    while True:
+        body = client.get("/v1/beliefs", params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        seen += body["beliefs"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+def test_top_beliefs_by_confidence_across_pages(beliefs_db):
+    client = TestClient(api.app)
+    seen = _pages(client, {"subject_prefix": "cbtest/", "limit": 1})
+    assert [(b["subject"], b["confidence"]) for b in seen] == [
+        ("cbtest/api", 0.9), ("cbtest/db", 0.7), ("cbtest/db", 0.7), ("cbtest/api", 0.4)
+    ]
+    assert [b["decision"] for b in seen] == ["PROMOTE", "HOLD", "HOLD", "REJECT"]
+
+    seen = _pages(client, {"subject_prefix": "cbtest", "min_confidence": 0.7, "sort": "updated_at", "limit": 2})
+    assert [b["belief_id"] for b in seen] == ["blf_cb_0", "blf_cb_2", "blf_cb_3", "blf_cb_4"]
+
+
+def test_beliefs_of_one_subject(beliefs_db):
+    client = TestClient(api.app)
+    body = client.get("/v1/beliefs/cbtest/db").json()
+    assert body["subject"] == "cbtest/db"
+    assert {b["hypothesis"] for b in body["beliefs"]} == {"Issue affecting cbtest/db", "Disk on cbtest/db"}
+
+    cursor = client.get("/v1/beliefs", params={"subject": "cbtest/api", "limit": 1}).json()["next_cursor"]
+    r = client.get("/v1/beliefs", params={"sort": "updated_at", "cursor": cursor})
+    assert r.status_code == 400  # cursor of another sort order
@@ -0,0 +1,127 @@
+# tests/test_evidence_cache.py
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from services.evidencevault.cache import EvidenceCache
+
+
+def test_lru_is_bounded_by_bytes():
+    cache = EvidenceCache(max_bytes=100, max_entry_bytes=60)
+    assert cache.put("a", '"1"', b"x" * 40)
+    assert cache.put("b", '"2"', b"x" * 40)
+    assert cache.get("a") is not None  # a is now most recent
+    assert cache.put("c", '"3"', b"x" * 40)  # evicts b
+
+    assert cache.get("b") is None
+    assert cache.get("c") == ('"3"', b"x" * 40)
+    assert not cache.put("d", '"4"', b"x" * 80)  # larger than one entry may be
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["oversize"]) == (2, 1, 1)
+    assert stats["bytes"] <= 100
+
+
+def test_put_replaces_entry_size():
+    cache = EvidenceCache(max_bytes=100)
+    cache.put("a", '"1"', b"x" * 50)
+    cache.put("a", '"1"', b"x" * 10)
+    assert cache.stats()["bytes"] == 1 + 3 + 10
+
+
+class _Result:
+    def __init__(self, row):
+        self.row = row
+
+    def mappings(self):
+        return self
+
+    def first(self):
+        return self.row
+
+
+def test_evidence_is_read_once_and_revalidated_with_etag(monkeypatch):
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+
+    import apps.adminconsole.api as api
+
+    row = {
+        "evidence_id": "evd_1",
+        "trace_id": "trc_1",
+        "sha256": "ab" * 32,
+        "created_at": datetime(2026, 1, 1, tzinfo=timezone.utc),
+        "payload": {"k": "v"},
+    }
+    reads = []
+
+    def exec_read(sql, **params):
+        reads.append(params["evidence_id"])
+        return _Result(row if params["evidence_id"] == "evd_1" else None)
+
+    monkeypatch.setattr(api, "exec_read", exec_read)
+    monkeypatch.setattr(api, "evidence_cache", EvidenceCache())
+    client = TestClient(api.app)
+
+    first = client.get("/v1/evidence/evd_1")
+    assert first.status_code == 200
+    assert first.headers["etag"] == f'"{"ab" * 32}"'
+    assert "immutable" in first.headers["cache-control"]
+    assert first.json()["evidence"]["created_at"] == "2026-01-01T00:00:00+00:00"
+
+    assert client.get("/v1/evidence/evd_1").content == first.content
+    revalidated = client.get("/v1/evidence/evd_1", headers={"If-None-Match": f'"x", W/{first.headers["etag"]}'})
+    assert revalidated.status_code == 304 and revalidated.content == b""
+    assert reads == ["evd_1"]
+
+    # misses are not cached: the snapshot may not be on the replica yet
+    assert client.get("/v1/evidence/evd_2").json() == {"evidence": None}
+    assert client.get("/v1/evidence/evd_2").json() == {"evidence": None}
+    assert reads == ["evd_1", "evd_2", "evd_2"]
+
+
+def test_collapsed_duplicate_ids_resolve_to_the_kept_snapshot(monkeypatch):
+    test_database_url = os.getenv("TEST_DATABASE_URL")
+    if not test_database_url:
+        pytest.skip("TEST_DATABASE_URL not set")
+    pytest.importorskip("httpx")
+    from fastapi.testclient import TestClient
+    from sqlalchemy import create_engine, text
+
+    import apps.adminconsole.api as api
+    from services.shared import db
+    from services.shared.migrations import migrate
+
+    engine = create_engine(test_database_url, future=True)
+    migrate(engine)
+    cleanup = [
+        "DELETE FROM evidence_aliases WHERE alias_id = 'evd_alias_test'",
+        "DELETE FROM evidence_snapshots WHERE evidence_id = 'evd_kept_test'",
+    ]
+    with engine.begin() as conn:
+        for sql in cleanup:
+            conn.execute(text(sql))
+        conn.execute(
+            text(
+                "INSERT INTO evidence_snapshots (evidence_id, trace_id, sha256, created_at, payload) "
+                "VALUES ('evd_kept_test', 'trc_alias', :sha256, now(), '{\"k\": 1}')"
+            ),
+            {"sha256": "cd" * 32},
+        )
+        conn.execute(text("INSERT INTO evidence_aliases (alias_id, evidence_id) VALUES ('evd_alias_test', 'evd_kept_test')"))
+    monkeypatch.setattr(db, "DATABASE_READ_URL", "")
+    monkeypatch.setattr(db, "_READ_ENGINE", None)
+    monkeypatch.setattr(db, "get_engine", lambda: engine)
+    monkeypatch.setattr(api, "evidence_cache", EvidenceCache())
+
+    try:
+        evidence = TestClient(api.app).get("/v1/evidence/evd_alias_test").json()["evidence"]
+        assert evidence["evidence_id"] == "evd_kept_test"
+        assert evidence["payload"] == {"k": 1}
+    finally:
+        with engine.begin() as conn:
+            for sql in cleanup:
+                conn.execute(text(sql))
@@ -0,0 +1,70 @@
+# tests/test_explain_scheduler.py
+from services.cortexreasoner.explain_scheduler import ExplanationScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def _scheduler(clock):
+    return ExplanationScheduler(min_delta=0.05, debounce_seconds=60, clock=clock)
+
+
+def _explain(s, key, confidence):
+    """decide() and, when it says explain, record() as the worker does after commit."""
+    d = s.decide(key, confidence)
+    if d.explain:
+        s.record(key, confidence)
+    return d
+
+
+def test_first_observation_explains():
+    s = _scheduler(FakeClock())
+    d = _explain(s, "b1", 0.40)
+    assert d.explain and d.reason == "first_observation"
+
+
+def test_small_change_is_skipped_with_reason():
+    clock = FakeClock()
+    s = _scheduler(clock)
+    _explain(s, "b1", 0.40)
+    clock.t = 5
+    d = _explain(s, "b1", 0.401)
+    assert not d.explain
+    assert d.reason.startswith("insignificant_change")
+    assert d.prior_confidence == 0.40
+
+
+def test_threshold_crossing_explains_even_for_tiny_delta():
+    s = _scheduler(FakeClock())
+    _explain(s, "b1", 0.849)
+    d = _explain(s, "b1", 0.851)
+    assert d.explain and d.reason == "threshold_crossed:HOLD->PROMOTE"
+
+
+def test_skips_accumulate_against_last_explained():
+    s = _scheduler(FakeClock())
+    _explain(s, "b1", 0.40)
+    assert not _explain(s, "b1", 0.43).explain
+    assert _explain(s, "b1", 0.46).explain
+
+
+def test_debounce_expiry_explains():
+    clock = FakeClock()
+    s = _scheduler(clock)
+    _explain(s, "b1", 0.40)
+    clock.t = 61
+    d = _explain(s, "b1", 0.40)
+    assert d.explain and d.reason == "debounce_expired"
+
+
+def test_unrecorded_explanation_is_retried():
+    # shed or rolled back: the worker never records it
+    s = _scheduler(FakeClock())
+    assert s.decide("b1", 0.40).explain
+    d = s.decide("b1", 0.40)
+    assert d.explain and d.reason == "first_observation"
@@ -0,0 +1,119 @@
+# tests/test_hot_query_plans.py
+#
+# Runs the migrations against TEST_DATABASE_URL and asserts that every hot
+# query is planned with an index. enable_seqscan=off makes the planner pick
+# an index whenever one is usable, so a Seq Scan in the plan means none is.
+import json
+import os
+
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+
+HOT_QUERIES = {
+    "adminconsole audit by trace": (
+        "SELECT id, created_at, actor, action, details FROM audit_log WHERE trace_id = :trace_id "
+        "AND (created_at, id) > (:after_created_at, :after_id) ORDER BY created_at, id LIMIT :limit",
+        {"trace_id": "trc_x", "after_created_at": "2026-01-01T00:00:00Z", "after_id": 0, "limit": 500},
+    ),
+    "audit chain tail": (
+        "SELECT row_hash FROM audit_log WHERE trace_id = :trace_id AND row_hash IS NOT NULL ORDER BY id DESC LIMIT 1",
+        {"trace_id": "trc_x"},
+    ),
+    "audit checkpoint latest": (
+        "SELECT last_audit_id FROM audit_checkpoints WHERE trace_id = :trace_id ORDER BY last_audit_id DESC LIMIT 1",
+        {"trace_id": "trc_x"},
+    ),
+    "latest hypothesis of belief": (
+        "SELECT id, hypothesis FROM hypotheses WHERE trace_id = :trace_id AND belief_id = :belief_id "
+        "ORDER BY created_at DESC LIMIT 1",
+        {"trace_id": "trc_x", "belief_id": "blf_x"},
+    ),
+    "hypothesis similarity index build": (
+        "SELECT hypothesis_hash, hypothesis FROM hypotheses WHERE subject = :subject ORDER BY created_at ASC",
+        {"subject": "service/x"},
+    ),
+    "hypothesis by hash": (
+        "SELECT id FROM hypotheses WHERE subject = :subject AND hypothesis_hash = :hypothesis_hash "
+        "ORDER BY created_at ASC LIMIT 1",
+        {"subject": "service/x", "hypothesis_hash": "h"},
+    ),
+    "promotion exists": (
+        "SELECT decision, decision_reason, promoted_confidence FROM belief_promotions "
+        "WHERE belief_id = :belief_id AND hypothesis_id = :hypothesis_id LIMIT 1",
+        {"belief_id": "blf_x", "hypothesis_id": 1},
+    ),
+    "promotion of canonical hypothesis": (
+        "SELECT p.decision FROM hypotheses h JOIN belief_promotions p ON p.hypothesis_id = h.id "
+        "WHERE h.subject = :subject AND h.hypothesis_hash = :hypothesis_hash ORDER BY p.id DESC LIMIT 1",
+        {"subject": "service/x", "hypothesis_hash": "h"},
+    ),
+    "evidence by id or alias": (
+        "SELECT payload FROM evidence_snapshots WHERE evidence_id = COALESCE("
+        "(SELECT evidence_id FROM evidence_aliases WHERE alias_id = :evidence_id), :evidence_id)",
+        {"evidence_id": "evd_x"},
+    ),
+    "evidence by sha256": (
+        "SELECT evidence_id FROM evidence_snapshots WHERE sha256 = :sha256",
+        {"sha256": "0" * 64},
+    ),
+    "provenance by evidence": (
+        "SELECT signature FROM evidence_provenance WHERE evidence_id = :evidence_id",
+        {"evidence_id": "evd_x"},
+    ),
+    "ai calls of trace": (
+        "SELECT id FROM ai_call_audit WHERE trace_id = :trace_id ORDER BY created_at ASC, id ASC",
+        {"trace_id": "trc_x"},
+    ),
+    "idempotency keys to prune": (
+        "SELECT idempotency_key FROM event_idempotency WHERE first_seen_at < :before "
+        "ORDER BY first_seen_at LIMIT :batch_size",
+        {"before": "2026-01-01T00:00:00Z", "batch_size": 10000},
+    ),
+    "current beliefs top by confidence": (
+        "SELECT subject, hypothesis, confidence FROM current_beliefs "
+        "WHERE (confidence, subject, hypothesis) < (:c, :s, :h) "
+        "ORDER BY confidence DESC, subject DESC, hypothesis DESC LIMIT :limit",
+        {"c": 0.9, "s": "service/x", "h": "h", "limit": 100},
+    ),
+    "current beliefs by subject prefix": (
+        "SELECT subject, hypothesis, confidence FROM current_beliefs "
+        "WHERE subject ~>=~ :low AND subject ~<~ :high",
+        {"low": "service/", "high": "service0"},
+    ),
+}
+
+
+def _scan_nodes(plan):
+    yield plan["Node Type"]
+    for child in plan.get("Plans", ()):
+        yield from _scan_nodes(child)
+
+
+@pytest.fixture(scope="module")
+def engine():
+    from sqlalchemy import create_engine
+
+    from services.shared.migrations import migrate
+
+    eng = create_engine(TEST_DATABASE_URL, future=True)
+    migrate(eng)
+    yield eng
+    eng.dispose()
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(engine, name):
+    from sqlalchemy import text
+
+    sql, params = HOT_QUERIES[name]
+    with engine.begin() as conn:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        raw = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql), params).scalar_one()
+
+    plan = (raw if isinstance(raw, list) else json.loads(raw))[0]["Plan"]
+    nodes = list(_scan_nodes(plan))
+    assert "Seq Scan" not in nodes, f"{name}: {nodes}"
+    assert any("Index" in n for n in nodes), f"{name}: {nodes}"
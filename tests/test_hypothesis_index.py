@@ -0,0 +1,49 @@
+# tests/test_hypothesis_index.py
+from services.cortexreasoner.hypothesis_index import HypothesisIndex, shingles
+
+SUBJECT = "service/api-gateway"
+
+
+def test_rephrasings_map_to_canonical():
+    idx = HypothesisIndex(subject=SUBJECT)
+    assert idx.add("h1", "Issue affecting service/api-gateway") == "h1"
+    assert idx.add("h2", "Issues affecting the service/api-gateway") == "h1"
+    assert idx.add("h3", "service/api-gateway is degraded") == "h3"
+    assert idx.add("h4", "service/api-gateway degrading") == "h3"
+    assert len(idx) == 2
+
+
+def test_opposite_or_different_states_do_not_match():
+    idx = HypothesisIndex(subject=SUBJECT)
+    texts = [
+        "service/api-gateway is healthy",
+        "service/api-gateway is degraded",
+        "service/api-gateway is not degraded",
+        "Issue affecting service/api-gateway",
+        "Outage affecting service/api-gateway",
+        "service/api-gateway isn't healthy",
+    ]
+    for i, text in enumerate(texts):
+        assert idx.add(f"h{i}", text) == f"h{i}", text
+    assert len(idx) == len(texts)
+
+
+def test_unrelated_hypothesis_gets_own_row():
+    idx = HypothesisIndex(subject=SUBJECT)
+    idx.add("h1", "Issue affecting service/api-gateway")
+    assert idx.add("h2", "Replication lag on db/primary") == "h2"
+    assert len(idx) == 2
+
+
+def test_find_does_not_insert():
+    idx = HypothesisIndex(subject=SUBJECT)
+    idx.add("h1", "Issue affecting service/api-gateway")
+    assert idx.find("Issues affecting the service/api-gateway") == "h1"
+    assert idx.find("service/api-gateway is not affected by the issue") is None
+    assert idx.find("Certificate expiry on edge/lb") is None
+    assert len(idx) == 1
+
+
+def test_shingles_are_normalized():
+    assert shingles("The API-Gateway is FAILING") == shingles("api gateway failing")
+    assert shingles("Issue affecting service/api-gateway", shingles(SUBJECT)) == shingles("issues affecting")
@@ -0,0 +1,151 @@
+# tests/test_hypothesis_store.py
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from services.cortexreasoner import hypothesis_store
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+SUBJECT = "service/hyp-store-test"
+
+
+@pytest.fixture
+def store_db(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from sqlalchemy import create_engine, text
+
+    from services.shared.migrations import migrate
+
+    engine = create_engine(TEST_DATABASE_URL, future=True)
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM belief_promotions WHERE hypothesis_id IN (SELECT id FROM hypotheses WHERE subject = :s)"),
+            {"s": SUBJECT},
+        )
+        conn.execute(text("DELETE FROM hypotheses WHERE subject = :s"), {"s": SUBJECT})
+        conn.execute(text("DELETE FROM beliefs WHERE subject = :s"), {"s": SUBJECT})
+        for i in (1, 2):
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO beliefs (belief_id, trace_id, subject, hypothesis, confidence, updated_at, evidence_ids)
+                    VALUES (:belief_id, :trace_id, :subject, 'x', 0.5, now(), '[]')
+                    """
+                ),
+                {"belief_id": f"blf_hyp_{i}", "trace_id": f"trc_hyp_{i}", "subject": SUBJECT},
+            )
+    monkeypatch.setattr(hypothesis_store, "get_engine", lambda: engine)
+    hypothesis_store._indexes.clear()
+    yield engine
+    hypothesis_store._indexes.clear()
+    with engine.begin() as conn:
+        conn.execute(
+            text("DELETE FROM belief_promotions WHERE hypothesis_id IN (SELECT id FROM hypotheses WHERE subject = :s)"),
+            {"s": SUBJECT},
+        )
+        conn.execute(text("DELETE FROM hypotheses WHERE subject = :s"), {"s": SUBJECT})
+        conn.execute(text("DELETE FROM beliefs WHERE subject = :s"), {"s": SUBJECT})
+    engine.dispose()
+
+
+def _persist(i, hypothesis, confidence=0.5, **kw):
+    return hypothesis_store.persist_hypothesis(
+        trace_id=f"trc_hyp_{i}",
+        belief_id=f"blf_hyp_{i}",
+        ai_call_audit_id=None,
+        hypothesis=hypothesis,
+        confidence=confidence,
+        evidence_ids=[],
+        raw_json={"hypothesis": hypothesis},
+        **kw,
+    )
+
+
+def test_rephrasing_from_a_later_event_matches_the_subject(store_db):
+    first = _persist(1, "Issue affecting service/hyp-store-test")
+
+    # a later event: new trace and belief, same subject
+    assert _persist(2, "Issues affecting the service/hyp-store-test") == first
+    similar = hypothesis_store.find_similar_hypothesis(
+        subject=SUBJECT, hypothesis="issue affecting service/hyp-store-test"
+    )
+    assert similar is not None and similar["hypothesis"] == "Issue affecting service/hyp-store-test"
+
+    # a different state of the same subject is its own hypothesis
+    assert _persist(2, "service/hyp-store-test is not degraded") != first
+    assert hypothesis_store.find_similar_hypothesis(subject=SUBJECT, hypothesis="service/hyp-store-test is healthy") is None
+
+
+def test_near_duplicate_from_a_later_belief_is_not_promoted_again(store_db, monkeypatch):
+    from services.cortexreasoner import hypothesis_promoter
+
+    monkeypatch.setattr(hypothesis_promoter, "get_engine", lambda: store_db)
+
+    _persist(1, "Issue affecting service/hyp-store-test", confidence=0.7)
+    first = hypothesis_promoter.promote_latest_hypothesis_for_trace(trace_id="trc_hyp_1", belief_id="blf_hyp_1")
+    assert (first["decision"], first["already_promoted"]) == ("HOLD", False)
+
+    # next event: new belief, rephrased hypothesis, same decision
+    _persist(2, "Issues affecting the service/hyp-store-test", confidence=0.72)
+    again = hypothesis_promoter.promote_latest_hypothesis_for_trace(trace_id="trc_hyp_2", belief_id="blf_hyp_2")
+    assert (again["decision"], again["already_promoted"]) == ("HOLD", True)
+
+
+def test_rolled_back_insert_leaves_index_untouched(store_db):
+    _persist(1, "Issue affecting service/hyp-store-test")
+    index = hypothesis_store._indexes[SUBJECT]
+
+    with pytest.raises(Exception):
+        hypothesis_store.persist_hypothesis(
+            trace_id="trc_hyp_1",
+            belief_id="blf_hyp_1",
+            ai_call_audit_id=None,
+            hypothesis="Replication lag on db/primary",
+            confidence="not a number",  # fails the INSERT
+            evidence_ids=[],
+            raw_json={},
+        )
+
+    assert len(index) == 1
+    assert index.find("Replication lag on db/primary") is None
+
+
+def test_reasoner_reuses_stored_near_duplicate(store_db, monkeypatch):
+    from services.cortexreasoner import gemini_reasoner
+    from services.cortexreasoner.reasoner_backend import StubBackend
+
+    calls = []
+
+    class CountingBackend(StubBackend):
+        def generate(self, prompt, *, model):
+            calls.append(prompt)
+            return super().generate(prompt, model=model)
+
+    monkeypatch.setattr(gemini_reasoner, "get_backend", lambda: CountingBackend())
+    monkeypatch.setattr(gemini_reasoner, "record_ai_call", lambda **kw: None)
+
+    def belief(i, hypothesis, confidence=0.7):
+        return {"belief_id": f"blf_hyp_{i}", "subject": SUBJECT, "hypothesis": hypothesis, "confidence": confidence}
+
+    first = gemini_reasoner.explain(
+        "trc_hyp_1", belief_id="blf_hyp_1", belief=belief(1, "Issue affecting service/hyp-store-test"),
+        evidence={}, store_hypothesis=True,
+    )
+    assert len(calls) == 1 and "reused_hypothesis_id" not in first
+
+    # a later event rephrasing the same hypothesis, same decision band: no model call
+    again = gemini_reasoner.explain(
+        "trc_hyp_2", belief_id="blf_hyp_2", belief=belief(2, "Issues affecting the service/hyp-store-test"), evidence={},
+    )
+    assert len(calls) == 1 and again["reused_hypothesis_id"]
+    assert again["explanation"] == first["explanation"]
+
+    # crossing into PROMOTE asks the model again; so does another state
+    gemini_reasoner.explain("trc_hyp_2", belief=belief(2, "Issue affecting service/hyp-store-test", 0.9), evidence={})
+    gemini_reasoner.explain("trc_hyp_2", belief=belief(2, "service/hyp-store-test is healthy"), evidence={})
+    assert len(calls) == 3
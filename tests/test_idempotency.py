@@ -0,0 +1,124 @@
+# tests/test_idempotency.py
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from services.signalmesh import idempotency
+from services.signalmesh.normalizer import normalize
+from services.signalmesh.schemas import IngestEvent
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def _evt(occurred_at="2026-01-01T00:00:00Z", **payload):
+    return IngestEvent(source="datadog", event_type="triggered", occurred_at=occurred_at, payload=payload)
+
+
+def test_key_is_semantic():
+    a = normalize(_evt(id="42", title="cpu"), trace_id="trc_a")
+    b = normalize(_evt("2026-01-01T01:00:00+01:00", id="42", title="cpu"), trace_id="trc_b")
+    assert a.idempotency_key == b.idempotency_key  # same instant, other trace
+    assert a.event_id == b.event_id == f"evt_{a.idempotency_key[:32]}"
+
+    assert normalize(_evt(id="43", title="cpu"), "trc_a").idempotency_key != a.idempotency_key
+    assert normalize(_evt("2026-01-01T00:00:01Z", id="42", title="cpu"), "trc_a").event_id != a.event_id
+
+
+def test_payloads_without_identity_fields_key_on_content():
+    a = normalize(_evt(i=1), trace_id="trc_a")
+    b = normalize(_evt(i=2), trace_id="trc_a")
+    assert a.event_id != b.event_id
+    assert normalize(_evt(i=1), trace_id="trc_b").event_id == a.event_id
+
+
+def test_seen_cache_expires_and_counts():
+    now = [0.0]
+    cache = idempotency.SeenCache(ttl_seconds=10, max_keys=2, clock=lambda: now[0])
+    assert cache.get("k1") is None
+    cache.put("k1", ("evt_1", "trc_1"))
+    assert cache.get("k1") == ("evt_1", "trc_1")
+
+    now[0] = 11
+    assert cache.get("k1") is None
+
+    cache.put("k1", ("evt_1", "trc_1"))
+    cache.put("k2", ("evt_2", "trc_2"))
+    cache.put("k3", ("evt_3", "trc_3"))  # evicts k1
+    assert cache.get("k1") is None
+
+    stats = cache.stats()
+    assert stats["checked"] == 4 and stats["duplicates"] == 1 and stats["duplicate_rate"] == 0.25
+
+
+@pytest.fixture
+def ingest_db(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from sqlalchemy import create_engine, text
+
+    import services.signalmesh.app as signalmesh
+    from services.shared import db
+    from services.shared.migrations import migrate
+
+    engine = create_engine(TEST_DATABASE_URL, future=True)
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM event_idempotency WHERE trace_id LIKE 'trc_idem%'"))
+        conn.execute(text("DELETE FROM events WHERE trace_id LIKE 'trc_idem%'"))
+    monkeypatch.setattr(db, "get_engine", lambda: engine)
+    monkeypatch.setattr(signalmesh, "get_engine", lambda: engine)
+    monkeypatch.setattr(idempotency, "get_engine", lambda: engine)
+    monkeypatch.setattr(idempotency, "seen", idempotency.SeenCache())
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM event_idempotency WHERE trace_id LIKE 'trc_idem%'"))
+    engine.dispose()
+
+
+def test_batch_writes_each_event_once(ingest_db):
+    import services.signalmesh.app as signalmesh
+    from sqlalchemy import text
+
+    item = {"source": "datadog", "event_type": "alert", "occurred_at": "2026-02-01T00:00:00Z", "payload": {"id": "idem-1"}}
+    first = signalmesh._ingest_batch([(dict(item, trace_id="trc_idem_1"), None), (dict(item, trace_id="trc_idem_2"), None)], None)
+    assert (first["accepted"], first["duplicates"]) == (1, 1)
+    assert first["results"][1]["duplicate"] and first["results"][1]["trace_id"] == "trc_idem_1"
+
+    # cache gone (another replica): the unique claim still stops the write
+    idempotency.seen = idempotency.SeenCache()
+    again = signalmesh._ingest_batch([(dict(item, trace_id="trc_idem_3"), None)], None)
+    assert (again["accepted"], again["duplicates"]) == (0, 1)
+    assert again["results"][0]["event_id"] == first["results"][0]["event_id"]
+    assert idempotency.seen.stats()["db_hits"] == 1
+
+    with ingest_db.connect() as conn:
+        n = conn.execute(text("SELECT count(*) FROM events WHERE trace_id LIKE 'trc_idem%'")).scalar_one()
+    assert n == 1
+
+
+def test_prune_deletes_only_keys_older_than_cutoff(ingest_db):
+    from datetime import datetime, timezone
+
+    from sqlalchemy import text
+
+    with ingest_db.begin() as conn:
+        for i in range(5):
+            conn.execute(
+                text(
+                    "INSERT INTO event_idempotency (idempotency_key, event_id, trace_id, first_seen_at) "
+                    "VALUES (:k, :k, 'trc_idem_prune', :seen)"
+                ),
+                {"k": f"idem-prune-{i}", "seen": datetime(2001, 1, 1 + i, tzinfo=timezone.utc)},
+            )
+
+    cutoff = datetime(2001, 1, 4, tzinfo=timezone.utc)
+    assert idempotency.prune_keys(cutoff, dry_run=True) == 3
+    assert idempotency.prune_keys(cutoff, batch_size=2) == 3
+
+    with ingest_db.connect() as conn:
+        left = conn.execute(
+            text("SELECT idempotency_key FROM event_idempotency WHERE trace_id = 'trc_idem_prune' ORDER BY 1")
+        ).scalars().all()
+    assert left == ["idem-prune-3", "idem-prune-4"]
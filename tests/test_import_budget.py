@@ -0,0 +1,40 @@
+# tests/test_import_budget.py
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Cold-start budget for the canonical worker import (seconds).
+IMPORT_BUDGET_S = float(os.getenv("IMPORT_BUDGET_S", "1.5"))
+
+_PROBE = """
+import sys, time
+t0 = time.perf_counter()
+import workers.phase0_worker
+elapsed = time.perf_counter() - t0
+heavy = [m for m in ("google.genai", "google.cloud.pubsub_v1") if m in sys.modules]
+print(elapsed)
+print(",".join(heavy))
+"""
+
+
+def test_phase0_worker_import_within_budget():
+    out = subprocess.run(
+        [sys.executable, "-c", _PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+
+    elapsed = float(out[0])
+    heavy = out[1] if len(out) > 1 else ""
+
+    assert heavy == "", f"heavy SDKs imported eagerly: {heavy}"
+    assert elapsed < IMPORT_BUDGET_S, f"import took {elapsed:.3f}s (budget {IMPORT_BUDGET_S}s)"
@@ -0,0 +1,50 @@
+# tests/test_ingest_batch.py
+import json
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient
+
+import services.signalmesh.app as signalmesh
+
+EVENT = {"source": "datadog", "event_type": "alert", "occurred_at": "2026-01-01T00:00:00Z", "payload": {}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    # echo parsed items instead of writing them
+    monkeypatch.setattr(
+        signalmesh,
+        "_ingest_batch",
+        lambda items, trace_id: {"items": [[item, error] for item, error in items]},
+    )
+    return TestClient(signalmesh.app)
+
+
+def test_ndjson_stream_split_across_chunks(client):
+    line = json.dumps(EVENT)
+
+    def body():
+        yield (line + "\n" + line[:10]).encode()
+        yield (line[10:] + "\n\nnot json\n").encode()
+
+    r = client.post("/v1/ingest:batch", content=body(), headers={"content-type": "application/x-ndjson"})
+    items = r.json()["items"]
+    assert [i[0] for i in items[:2]] == [EVENT, EVENT]
+    assert items[2][0] is None and items[2][1].startswith("invalid JSON")
+
+
+def test_json_array_limits(client, monkeypatch):
+    assert client.post("/v1/ingest:batch", json={"not": "a list"}).status_code == 400
+    monkeypatch.setattr(signalmesh, "BATCH_MAX_ITEMS", 2)
+    assert client.post("/v1/ingest:batch", json=[EVENT] * 3).status_code == 413
+
+
+def test_invalid_items_are_reported_per_index():
+    result = signalmesh._ingest_batch([({"source": "x"}, None), (7, None), (None, "invalid JSON")], None)
+    assert result["accepted"] == 0 and result["rejected"] == 3
+    assert [r["index"] for r in result["results"]] == [0, 1, 2]
+    assert "event_type" in result["results"][0]["error"]
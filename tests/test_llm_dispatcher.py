@@ -0,0 +1,91 @@
+# tests/test_llm_dispatcher.py
+from services.shared.ratelimit import TokenBucket
+from services.cortexreasoner.llm_dispatcher import LLMDispatcher, estimate_tokens, priority_of
+
+
+class FakeClock:
+    def __init__(self):
+        self.t = 0.0
+
+    def __call__(self):
+        return self.t
+
+
+def test_token_bucket_refills_per_minute():
+    clock = FakeClock()
+    bucket = TokenBucket.per_minute(60, clock=clock)
+    assert bucket.try_acquire(60)
+    assert not bucket.try_acquire(1)
+    assert bucket.wait_time(1) == 1.0
+    clock.t = 1.0
+    assert bucket.try_acquire(1)
+
+
+def test_priority_prefers_severity_then_promotion_proximity():
+    assert priority_of("critical", 0.1) < priority_of("low", 0.85)
+    assert priority_of("low", 0.84) < priority_of("low", 0.30)
+    assert priority_of(None, None) == priority_of("info", None)
+
+
+def test_token_estimate_scales_with_prompt():
+    assert estimate_tokens("", output_tokens=0) == 0
+    assert estimate_tokens("x" * 4000, output_tokens=0) == 1000
+    assert estimate_tokens("x" * 4001, output_tokens=100) == 1101
+
+
+def test_dispatch_runs_call_and_counts_quota():
+    d = LLMDispatcher(requests_per_minute=10, tokens_per_minute=10_000, concurrency=1)
+    try:
+        assert d.submit(lambda x: x * 2, args=(21,), est_tokens=100).result(timeout=5) == 42
+        m = d.metrics()
+        assert m["completed"] == 1
+        assert m["quota_requests_used"] == 1
+        assert m["quota_tokens_used"] == 100
+    finally:
+        d.shutdown()
+
+
+def test_exhausted_quota_sheds_to_fallback():
+    d = LLMDispatcher(requests_per_minute=1, tokens_per_minute=10_000, concurrency=1)
+    try:
+        live = d.submit(lambda: "live", deadline_s=5)
+        assert live.result(timeout=5) == "live" and not live.shed
+        shed = d.submit(lambda: "live", deadline_s=0.1, fallback=lambda: "fallback")
+        assert shed.result(timeout=5) == "fallback" and shed.shed
+        assert d.metrics()["shed"] == 1
+    finally:
+        d.shutdown()
+
+
+def test_higher_priority_served_first_when_quota_frees():
+    clock = FakeClock()
+    d = LLMDispatcher(requests_per_minute=1, tokens_per_minute=10_000, concurrency=1, clock=clock)
+    order = []
+    try:
+        d.submit(lambda: None, deadline_s=1000).result(timeout=5)
+        low = d.submit(order.append, args=("low",), severity="low", deadline_s=1000)
+        high = d.submit(order.append, args=("critical",), severity="critical", deadline_s=1000)
+        clock.t = 60.0
+        high.result(timeout=5)
+        assert order == ["critical"]
+        clock.t = 120.0
+        low.result(timeout=5)
+        assert order == ["critical", "low"]
+    finally:
+        d.shutdown()
+
+
+def test_work_behind_the_head_is_shed_at_its_deadline():
+    clock = FakeClock()
+    d = LLMDispatcher(requests_per_minute=1, tokens_per_minute=10_000, concurrency=1, clock=clock)
+    try:
+        d.submit(lambda: None, deadline_s=1000).result(timeout=5)
+        high = d.submit(lambda: "critical", severity="critical", deadline_s=1000)
+        low = d.submit(lambda: "low", severity="low", deadline_s=30, fallback=lambda: "fallback")
+        # the head keeps waiting for quota; the low item behind it cannot make its deadline
+        assert low.result(timeout=5) == "fallback" and low.shed
+        assert not high.done()
+        clock.t = 60.0
+        assert high.result(timeout=5) == "critical"
+    finally:
+        d.shutdown()
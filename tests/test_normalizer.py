@@ -0,0 +1,96 @@
+# tests/test_normalizer.py
+import pytest
+
+from services.signalmesh.normalizer import (
+    SourceNormalizer,
+    compile_path,
+    get_normalizer,
+    normalize,
+    normalize_many,
+    register,
+)
+from services.signalmesh.schemas import IngestEvent
+
+
+def _evt(source, payload, event_type="alert", severity=None):
+    return IngestEvent(source=source, event_type=event_type, occurred_at="2026-01-01T00:00:00Z", severity=severity, payload=payload)
+
+
+def test_compile_path_walks_dicts_and_lists():
+    get = compile_path("issue.fields.components.0.name")
+    assert get({"issue": {"fields": {"components": [{"name": "billing"}]}}}) == "billing"
+    assert get({"issue": {"fields": {"components": []}}}) is None
+    assert get({"issue": "not a dict"}) is None
+
+
+def test_generic_fallback_keeps_original_probing():
+    c = normalize(_evt("MyTool", {"title": "disk full", "app": "db", "x": 1}), trace_id="trc_1")
+    assert c.source == "mytool"
+    assert c.normalized["normalizer"] == "generic"
+    assert c.normalized["message"] == "disk full"
+    assert c.normalized["service"] == "db"
+    assert c.normalized["region"] == "unknown"
+    assert c.normalized["raw_keys"] == ["app", "title", "x"]
+    assert c.normalized["subject"] == "service/db"
+
+
+def test_datadog_tags_event_type_and_severity():
+    c = normalize(
+        _evt(
+            "datadog",
+            {"title": "[P1] High latency", "tags": "env:prod,service:api-gateway,region:eu-west-1", "host": "web-1", "priority": "P1"},
+            event_type="Triggered",
+        ),
+        trace_id="trc_1",
+    )
+    assert c.event_type == "alert"
+    assert c.severity == "critical"
+    assert c.normalized["service"] == "api-gateway"
+    assert c.normalized["region"] == "eu-west-1"
+    assert c.normalized["env"] == "prod"
+    assert c.normalized["host"] == "web-1"
+
+
+def test_jira_nested_fields_and_explicit_severity_wins():
+    payload = {
+        "issue": {
+            "key": "OPS-42",
+            "fields": {"summary": "Checkout failing", "components": [{"name": "checkout"}], "priority": {"name": "Highest"}},
+        }
+    }
+    c = normalize(_evt("jira", payload, event_type="jira:issue_created"), trace_id="trc_1")
+    assert c.event_type == "incident"
+    assert c.severity == "critical"
+    assert c.normalized["external_id"] == "OPS-42"
+    assert c.normalized["subject"] == "service/checkout"
+
+    c = normalize(_evt("jira", payload, severity="LOW"), trace_id="trc_1")
+    assert c.severity == "low"
+
+
+def test_siem_alias_and_host_subject():
+    c = normalize(_evt("Splunk", {"rule": {"name": "Brute force"}, "host": {"name": "bastion"}, "source": {"ip": "10.0.0.9"}}), trace_id="trc_1")
+    assert c.normalized["normalizer"] == "siem"
+    assert c.normalized["message"] == "Brute force"
+    assert c.normalized["src_ip"] == "10.0.0.9"
+    assert c.normalized["subject"] == "host/bastion"
+
+
+def test_normalize_many_matches_normalize_and_checks_lengths():
+    events = [_evt("datadog", {"tags": ["service:a"]}), _evt("unknown", {"service": "b"}), _evt("datadog", {"tags": ["service:c"]})]
+    batch = normalize_many(events, ["t1", "t2", "t3"])
+    assert [c.normalized["subject"] for c in batch] == ["service/a", "service/b", "service/c"]
+    assert [c.trace_id for c in batch] == ["t1", "t2", "t3"]
+    assert len({c.event_id for c in batch}) == 3
+    for one, many in zip([normalize(e, t) for e, t in zip(events, ["t1", "t2", "t3"])], batch):
+        assert one.model_dump(exclude={"event_id"}) == many.model_dump(exclude={"event_id"})
+
+    with pytest.raises(ValueError):
+        normalize_many(events, ["t1"])
+
+
+def test_register_custom_source():
+    register(SourceNormalizer("acme-test", {"service": ("meta.svc",)}, aliases=("acme-alias",)))
+    assert get_normalizer("ACME-ALIAS").name == "acme-test"
+    c = normalize(_evt("acme-test", {"meta": {"svc": "queue"}}), trace_id="trc_1")
+    assert c.normalized["service"] == "queue"
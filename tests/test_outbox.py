@@ -0,0 +1,58 @@
+# tests/test_outbox.py
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from services.signalmesh import outbox
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def test_in_memory_bus_reports_failures_per_message():
+    bus = outbox.InMemoryBus()
+    bus.fail_next = 1
+    errors = bus.publish_batch("t", [b'{"n": 1}', b'{"n": 2}'])
+    assert isinstance(errors[0], RuntimeError) and errors[1] is None
+    assert bus.events("t") == [{"n": 2}]
+
+
+@pytest.fixture
+def outbox_db(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from sqlalchemy import create_engine, text
+
+    from services.shared import db
+    from services.shared.migrations import migrate
+
+    engine = create_engine(TEST_DATABASE_URL, future=True)
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM ingest_outbox"))
+    monkeypatch.setattr(outbox, "get_engine", lambda: engine)
+    monkeypatch.setattr(db, "get_engine", lambda: engine)
+    yield engine
+    engine.dispose()
+
+
+def test_relay_publishes_in_order_and_retries_failures(outbox_db):
+    with outbox_db.begin() as conn:
+        outbox.enqueue(conn, [{"event_id": f"evt_{i}"} for i in range(5)], topic="ingest")
+
+    # rolled back ingest: its outbox rows never become visible
+    with pytest.raises(RuntimeError):
+        with outbox_db.begin() as conn:
+            outbox.enqueue(conn, [{"event_id": "evt_rolled_back"}], topic="ingest")
+            raise RuntimeError("ingest failed")
+
+    bus = outbox.InMemoryBus()
+    bus.fail_next = 1
+    assert outbox.relay_once(bus, batch_size=10) == {"claimed": 5, "sent": 4, "failed": 1}
+    assert outbox.relay_once(bus, batch_size=10) == {"claimed": 1, "sent": 1, "failed": 0}
+    assert outbox.relay_once(bus, batch_size=10)["claimed"] == 0
+
+    published = [e["event_id"] for e in bus.events("ingest")]
+    assert published == ["evt_1", "evt_2", "evt_3", "evt_4", "evt_0"]
+    assert outbox.backlog() == {"pending": 0, "dead": 0}
@@ -0,0 +1,136 @@
+# tests/test_partitions.py
+import gzip
+import json
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from services.shared import partitions
+
+TRACE = "trc_partitions_test"
+
+
+def _archive(tmp_path, name, rows, **entry):
+    os.makedirs(tmp_path / "audit_log", exist_ok=True)
+    with gzip.open(tmp_path / "audit_log" / f"{name}.jsonl.gz", "wt") as f:
+        for row in rows:
+            f.write(json.dumps({"trace_id": TRACE, **row}) + "\n")
+    return {"table": "audit_log", "partition": name, "path": f"audit_log/{name}.jsonl.gz", "trace_ids": [TRACE], **entry}
+
+
+def _write(tmp_path, entries):
+    partitions._write_manifest({"version": 1, "partitions": entries}, str(tmp_path))
+
+
+def test_manifest_is_parsed_once_per_change(tmp_path, monkeypatch):
+    first = _archive(tmp_path, "audit_log_p202001", [{"id": 1, "created_at": "2020-01-01T00:00:00+00:00"}],
+                     range_start="2020-01-01T00:00:00+00:00")
+    _write(tmp_path, [first])
+
+    loads = []
+    original = partitions.load_manifest
+    monkeypatch.setattr(partitions, "load_manifest", lambda d: loads.append(d) or original(d))
+
+    for _ in range(3):
+        assert [r["id"] for r in partitions.read_archived("audit_log", trace_id=TRACE, archive_dir=str(tmp_path))] == [1]
+    assert len(loads) == 1
+
+    second = _archive(tmp_path, "audit_log_p202002", [{"id": 2, "created_at": "2020-02-01T00:00:00+00:00"}],
+                      range_start="2020-02-01T00:00:00+00:00")
+    _write(tmp_path, [second, first])
+    assert [r["id"] for r in partitions.read_archived("audit_log", trace_id=TRACE, archive_dir=str(tmp_path))] == [1, 2]
+    assert len(loads) == 2
+    assert list(partitions.read_archived("audit_log", trace_id="trc_other", archive_dir=str(tmp_path))) == []
+
+
+def test_rows_are_read_in_created_at_id_order(tmp_path):
+    # exported before the id tie-break: same created_at, ids out of order
+    legacy = _archive(tmp_path, "audit_log_p202001", [
+        {"id": 3, "created_at": "2020-01-01T00:00:00+00:00"},
+        {"id": 1, "created_at": "2020-01-01T00:00:00+00:00"},
+        {"id": 2, "created_at": "2020-01-01T00:00:00+00:00"},
+    ], range_start="2020-01-01T00:00:00+00:00")
+    ordered = _archive(tmp_path, "audit_log_p202002", [
+        {"id": 4, "created_at": "2020-02-01T00:00:00+00:00"},
+    ], range_start="2020-02-01T00:00:00+00:00", order_by=["created_at", "id"])
+    _write(tmp_path, [ordered, legacy])
+
+    rows = partitions.read_archived("audit_log", trace_id=TRACE, archive_dir=str(tmp_path))
+    assert [r["id"] for r in rows] == [1, 2, 3, 4]
+
+
+def test_archived_rows_are_cached_until_the_manifest_changes(tmp_path, monkeypatch):
+    entry = _archive(tmp_path, "audit_log_p202001", [{"id": 1, "created_at": "2020-01-01T00:00:00+00:00"}],
+                     range_start="2020-01-01T00:00:00+00:00")
+    _write(tmp_path, [entry])
+
+    reads = []
+    original = partitions.read_archived
+    monkeypatch.setattr(partitions, "read_archived", lambda *a, **kw: reads.append(1) or original(*a, **kw))
+
+    first = partitions.archived_rows("audit_log", trace_id=TRACE, archive_dir=str(tmp_path))
+    assert partitions.archived_rows("audit_log", trace_id=TRACE, archive_dir=str(tmp_path)) is first
+    assert len(reads) == 1
+
+    later = _archive(tmp_path, "audit_log_p202002", [{"id": 2, "created_at": "2020-02-01T00:00:00+00:00"}],
+                     range_start="2020-02-01T00:00:00+00:00")
+    _write(tmp_path, [entry, later])
+    assert [r["id"] for r in partitions.archived_rows("audit_log", trace_id=TRACE, archive_dir=str(tmp_path))] == [1, 2]
+    assert len(reads) == 2
+
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture
+def archive_db(tmp_path, monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from sqlalchemy import create_engine, text
+
+    from services.audit import audit_chain
+    from services.shared.migrations import migrate
+
+    engine = create_engine(TEST_DATABASE_URL, future=True)
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS "audit_log_p200101"'))
+        conn.execute(text("DELETE FROM audit_log WHERE trace_id = :t"), {"t": TRACE})
+        conn.execute(text("SELECT voxcortex_ensure_monthly_partitions('audit_log', '2001-01-01Z', '2001-01-02Z')"))
+    monkeypatch.setattr(partitions, "get_engine", lambda: engine)
+    monkeypatch.setattr(audit_chain, "get_engine", lambda: engine)
+    monkeypatch.setattr(partitions, "ARCHIVE_DIR", str(tmp_path))
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text('DROP TABLE IF EXISTS "audit_log_p200101"'))
+        conn.execute(text("DELETE FROM audit_log WHERE trace_id = :t"), {"t": TRACE})
+
+
+def test_archiving_keeps_the_audit_chain_verifiable(archive_db, tmp_path):
+    from datetime import datetime, timezone
+
+    from services.audit.audit_chain import append_audit, verify_chain
+
+    with archive_db.begin() as conn:
+        for day in (15, 16):
+            append_audit(conn, trace_id=TRACE, actor="test", action="old", details={"day": day},
+                         created_at=datetime(2001, 1, day, tzinfo=timezone.utc))
+    # an interrupted earlier run exported the partition before the second row
+    _write(tmp_path, [{"table": "audit_log", "partition": "audit_log_p200101", "row_count": 1,
+                       "path": "audit_log/audit_log_p200101.jsonl.gz", "trace_ids": [TRACE],
+                       "range_start": "2001-01-01T00:00:00+00:00"}])
+    with archive_db.begin() as conn:
+        append_audit(conn, trace_id=TRACE, actor="test", action="live", details={})
+
+    [entry] = partitions.archive_partitions(
+        datetime(2001, 2, 1, tzinfo=timezone.utc), archive_dir=str(tmp_path), tables=("audit_log",)
+    )
+    assert entry["row_count"] == 2
+    assert entry["chain_tails"][TRACE]["row_count"] == 2
+    assert len(partitions.load_manifest(str(tmp_path))["partitions"]) == 1
+
+    result = verify_chain(TRACE, full=True)
+    assert result["ok"] and result["from_archive"]
+    assert result["verified_rows"] == 1 and result["row_count"] == 3
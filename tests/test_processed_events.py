@@ -0,0 +1,49 @@
+# tests/test_processed_events.py
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+import workers.phase0_worker as worker
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def test_replay_returns_stored_outcome_without_running(monkeypatch):
+    stored = {"event_id": "evt_1", "belief_id": "bel_1"}
+    monkeypatch.setattr(worker, "processed_outcome", lambda event_id, conn=None: stored)
+
+    def must_not_run(**kwargs):
+        raise AssertionError("pipeline ran for a processed event")
+
+    monkeypatch.setattr(worker, "snapshot_evidence", must_not_run)
+    assert worker.handle_canonical_event({"event_id": "evt_1", "trace_id": "trc_1"}) is stored
+
+    # force (and events without an id) bypass the ledger
+    with pytest.raises(AssertionError):
+        worker.handle_canonical_event({"event_id": "evt_1", "trace_id": "trc_1"}, force=True)
+    with pytest.raises(AssertionError):
+        worker.handle_canonical_event({"trace_id": "trc_1"})
+
+
+def test_ledger_roundtrip_and_rerun_count():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from sqlalchemy import create_engine, text
+
+    from services.shared.migrations import migrate
+
+    engine = create_engine(TEST_DATABASE_URL, future=True)
+    migrate(engine)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM processed_events WHERE event_id = 'evt_ledger_test'"))
+        assert worker.processed_outcome("evt_ledger_test", conn) is None
+        worker._record_outcome(conn, "evt_ledger_test", "trc_1", {"belief_id": "bel_1"}, now)
+        worker._record_outcome(conn, "evt_ledger_test", "trc_1", {"belief_id": "bel_2"}, now)
+        assert worker.processed_outcome("evt_ledger_test", conn) == {"belief_id": "bel_2"}
+        runs = conn.execute(text("SELECT runs FROM processed_events WHERE event_id = 'evt_ledger_test'")).scalar_one()
+    assert runs == 2
+    engine.dispose()
@@ -0,0 +1,34 @@
+# tests/test_read_routing.py
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from services.shared import db
+
+
+def test_lsn_ordering_is_numeric():
+    assert db._lsn_value("0/2D39B60") < db._lsn_value("0/5000000")
+    assert db._lsn_value("0/FFFFFFFF") < db._lsn_value("1/0")
+
+
+def test_session_keeps_highest_write_lsn():
+    assert db.current_write_lsn() is None
+    with db.read_your_writes("0/100"):
+        db._session_advance("0/90")
+        assert db.current_write_lsn() == "0/100"
+        db._session_advance("1/0")
+        assert db.current_write_lsn() == "1/0"
+    assert db.current_write_lsn() is None
+
+
+def test_record_write_is_noop_outside_session(monkeypatch):
+    monkeypatch.setattr(db, "get_engine", lambda: pytest.fail("no query expected"))
+    assert db.record_write() is None
+
+
+def test_read_engine_defaults_to_primary(monkeypatch):
+    primary = object()
+    monkeypatch.setattr(db, "DATABASE_READ_URL", "")
+    monkeypatch.setattr(db, "_READ_ENGINE", None)
+    monkeypatch.setattr(db, "get_engine", lambda: primary)
+    assert db.get_read_engine() is primary
@@ -0,0 +1,74 @@
+# tests/test_reasoner_backend.py
+import pytest
+
+from services.policy.policy_gate import PolicyGate
+from services.cortexreasoner.reasoner_backend import (
+    CassetteBackend,
+    CassetteMiss,
+    GeminiBackend,
+    LatencyModel,
+    StubBackend,
+    _backend_from_env,
+    cassette_key,
+)
+
+PROMPT = 'belief_id = "blf_0123456789abcdef0123456789abcdef" at 2026-01-01T00:00:00+00:00'
+
+
+def test_stub_output_passes_policy_gate():
+    out = PolicyGate.validate(StubBackend().generate("anything", model="m"))
+    assert out["confidence_language"]["calibration"] == "stub_mode"
+
+
+def test_cassette_key_masks_volatile_ids():
+    other = 'belief_id = "blf_ffffffffffffffffffffffffffffffff" at 2027-05-05T12:00:00+00:00'
+    assert cassette_key("m", PROMPT) == cassette_key("m", other)
+    assert cassette_key("m", PROMPT) != cassette_key("other-model", PROMPT)
+
+
+def test_record_then_replay(tmp_path):
+    path = str(tmp_path / "cassette.jsonl")
+    recorder = CassetteBackend(path, mode="record", inner=StubBackend())
+    recorded = recorder.generate(PROMPT, model="m")
+
+    slept = []
+    player = CassetteBackend(
+        path, mode="replay", latency=LatencyModel("fixed:250"), on_miss="error", sleep=slept.append
+    )
+    assert player.generate(PROMPT, model="m") == recorded
+    assert slept == [0.25]
+
+    with pytest.raises(CassetteMiss):
+        player.generate("unrecorded prompt", model="m")
+
+
+def test_replay_cycles_on_miss(tmp_path):
+    path = tmp_path / "cassette.jsonl"
+    path.write_text(
+        '{"key": "a", "model": "m", "output": "one", "latency_ms": 0}\n'
+        '{"key": "b", "model": "m", "output": "two", "latency_ms": 0}\n'
+    )
+    player = CassetteBackend(str(path), mode="replay", on_miss="cycle")
+    assert [player.generate("x", model="m") for _ in range(3)] == ["one", "two", "one"]
+
+
+def test_latency_model_is_seeded():
+    a = LatencyModel("lognormal:5,0.5", seed=7)
+    b = LatencyModel("lognormal:5,0.5", seed=7)
+    assert [a.sample_ms() for _ in range(5)] == [b.sample_ms() for _ in range(5)]
+    with pytest.raises(ValueError):
+        LatencyModel("uniform:1")
+
+
+def test_missing_api_key_fails_instead_of_stubbing(monkeypatch):
+    monkeypatch.delenv("REASONER_BACKEND", raising=False)
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    with pytest.raises(RuntimeError):
+        _backend_from_env()
+
+    monkeypatch.setenv("REASONER_BACKEND", "stub")
+    assert isinstance(_backend_from_env(), StubBackend)
+
+    monkeypatch.delenv("REASONER_BACKEND")
+    monkeypatch.setenv("GEMINI_API_KEY", "k")
+    assert isinstance(_backend_from_env(), GeminiBackend)
@@ -0,0 +1,160 @@
+# tests/test_replay.py
+import json
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from workers import replay
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+T0 = datetime(2001, 1, 1, tzinfo=timezone.utc)
+
+
+def test_fold_keeps_last_outcome_per_belief():
+    rows = [
+        ("evt_1", T0, {"subject": "service/a", "prior": 0.2, "signal": 0.1}),
+        ("evt_2", T0, {"normalized": {"subject": "service/b"}}),
+        ("evt_3", T0, {"subject": "service/a", "prior": 0.9, "signal": 0.9}),
+    ]
+    state = replay.fold(rows)
+
+    a = state[("service/a", "Issue affecting service/a")]
+    assert (a["confidence"], a["decision"], a["events"], a["last_event_id"]) == (0.99, "PROMOTE", 2, "evt_3")
+    b = state[("service/b", "Issue affecting service/b")]
+    assert (b["confidence"], b["decision"], b["events"]) == (0.805, "HOLD", 1)
+
+
+def test_stream_sql_only_filters_what_is_set():
+    assert "WHERE" not in replay._stream_sql(1, None, None, resume=False)
+    sql = replay._stream_sql(4, T0, None, resume=True)
+    assert "hashtextextended" in sql and "occurred_at >= :since" in sql
+    assert "(occurred_at, event_id) > (:last_occurred_at, :last_event_id)" in sql
+    assert sql.endswith("ORDER BY occurred_at, event_id")
+
+
+@pytest.fixture
+def replay_db(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from sqlalchemy import create_engine, text
+
+    from services.shared import db
+    from services.shared.migrations import migrate
+
+    engine = create_engine(TEST_DATABASE_URL, future=True)
+    migrate(engine)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM events WHERE event_id LIKE 'evt_replay_%'"))
+        conn.execute(text("DELETE FROM replay_runs WHERE run_id LIKE 'rpl_test_%'"))
+        conn.execute(text("DELETE FROM current_beliefs WHERE subject LIKE 'service/replay-%'"))
+        for i in range(30):
+            payload = {"subject": f"service/replay-{i % 3}", "prior": 0.6, "signal": 0.1 * (i % 10)}
+            conn.execute(
+                text(
+                    """
+                    INSERT INTO events (event_id, trace_id, source, event_type, occurred_at, raw_payload, canonical_payload)
+                    VALUES (:event_id, 'trc_replay', 'test', 'alert', :occurred_at, '{}', CAST(:payload AS jsonb))
+                    """
+                ),
+                {"event_id": f"evt_replay_{i:02d}", "occurred_at": T0 + timedelta(minutes=i), "payload": json.dumps(payload)},
+            )
+        # production says HOLD for replay-0; the replay ends on a PROMOTE
+        conn.execute(
+            text(
+                """
+                INSERT INTO current_beliefs (subject, hypothesis, belief_id, trace_id, confidence, evidence_ids, updated_at)
+                VALUES ('service/replay-0', 'Issue affecting service/replay-0', 'bel_replay_0', 'trc_replay', 0.7, '[]', now())
+                """
+            )
+        )
+    monkeypatch.setattr(replay, "get_engine", lambda: engine)
+    monkeypatch.setattr(db, "get_engine", lambda: engine)
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM events WHERE event_id LIKE 'evt_replay_%'"))
+        conn.execute(text("DELETE FROM current_beliefs WHERE subject LIKE 'service/replay-%'"))
+    engine.dispose()
+
+
+def test_replay_resumes_from_checkpoint_and_diffs(replay_db, monkeypatch):
+    from sqlalchemy import text
+
+    window = {"since": T0, "until": T0 + timedelta(days=1)}
+    fresh = replay.fold(
+        (f"evt_replay_{i:02d}", None, {"subject": f"service/replay-{i % 3}", "prior": 0.6, "signal": 0.1 * (i % 10)})
+        for i in range(30)
+    )
+
+    # crash after the first chunk: its beliefs and checkpoint are committed together
+    original = replay.fold
+    calls = []
+
+    def failing_fold(rows):
+        calls.append(len(rows))
+        if len(calls) == 2:
+            raise RuntimeError("crash")
+        return original(rows)
+
+    monkeypatch.setattr(replay, "fold", failing_fold)
+    with pytest.raises(RuntimeError):
+        replay.replay(run_id="rpl_test_1", chunk_size=10, **window)
+    monkeypatch.setattr(replay, "fold", original)
+    with replay_db.connect() as conn:
+        done = conn.execute(text("SELECT events_done FROM replay_checkpoints WHERE run_id = 'rpl_test_1'")).scalar_one()
+    assert done == 10
+
+    report = replay.replay(run_id="rpl_test_1", chunk_size=10)
+    assert report["resumed"] and report["events_replayed"] == 20
+
+    with replay_db.connect() as conn:
+        rows = conn.execute(
+            text("SELECT subject, hypothesis, confidence, events FROM replay_beliefs WHERE run_id = 'rpl_test_1'")
+        ).fetchall()
+    assert {(s, h): (c, n) for s, h, c, n in rows} == {
+        k: (v["confidence"], v["events"]) for k, v in fresh.items()
+    }
+
+    assert report["compared"] == 1 and report["decision_transitions"] == {"HOLD->PROMOTE": 1}
+    assert report["only_in_replay"] == 2 and report["only_in_production"] == 0  # windowed run
+
+
+def test_resume_with_other_shard_count_is_refused(replay_db):
+    replay.replay(run_id="rpl_test_2", shards=1, since=T0, until=T0 + timedelta(days=1))
+    with pytest.raises(ValueError):
+        replay.replay(run_id="rpl_test_2", shards=2)
+
+
+def test_shed_live_explanations_are_retried_on_resume(replay_db, monkeypatch):
+    from sqlalchemy import text
+
+    from services.cortexreasoner.llm_dispatcher import DispatchFuture
+
+    class Dispatcher:
+        shed = True
+
+        def submit(self, fn, **kwargs):
+            future = DispatchFuture()
+            future.shed = self.shed
+            future.set_result(None if self.shed else {"summary": "live"})
+            return future
+
+    dispatcher = Dispatcher()
+    monkeypatch.setattr(replay, "get_dispatcher", lambda: dispatcher)
+    monkeypatch.setattr(replay, "estimate_explain_tokens", lambda *a, **kw: 1)
+    window = {"since": T0, "until": T0 + timedelta(days=1)}
+
+    report = replay.replay(run_id="rpl_test_3", llm="live", **window)
+    assert report["explanations"] == {"cache": 0, "live": 0, "shed": 3}
+
+    dispatcher.shed = False
+    report = replay.replay(run_id="rpl_test_3", llm="live")
+    assert report["explanations"] == {"cache": 0, "live": 3, "shed": 0}
+    with replay_db.connect() as conn:
+        sources = conn.execute(
+            text("SELECT explanation_source FROM replay_beliefs WHERE run_id = 'rpl_test_3'")
+        ).scalars().all()
+    assert sources == ["live"] * 3
@@ -0,0 +1,151 @@
+# tests/test_trace_timeline.py
+import json
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("httpx")
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import apps.adminconsole.api as api
+from services.audit import ai_call_audit
+from services.shared import db
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+TRACE = "trc_timeline_test"
+
+
+def test_projection_narrows_kinds_and_fields():
+    full = api._timeline_projection(None, None)
+    assert list(full) == list(api._TIMELINE) and "raw_payload" in full["event"]
+
+    projection = api._timeline_projection("belief,hypothesis", "confidence,hypothesis.hypothesis")
+    assert projection == {"belief": ["confidence"], "hypothesis": ["confidence", "hypothesis"]}
+
+    sql = api._timeline_sql(projection)
+    assert "t_belief" in sql and "t_hypothesis" in sql and "t_event" not in sql
+    assert "evidence_ids" not in sql
+
+    for kinds, fields in (("nope", None), ("belief", "event.source"), (None, "nope")):
+        with pytest.raises(HTTPException) as e:
+            api._timeline_projection(kinds, fields)
+        assert e.value.status_code == 400
+
+
+@pytest.fixture
+def timeline_db(monkeypatch):
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from sqlalchemy import create_engine, text
+
+    from services.shared.migrations import migrate
+
+    engine = create_engine(TEST_DATABASE_URL, future=True)
+    migrate(engine)
+    statements = [
+        "INSERT INTO events (event_id, trace_id, source, event_type, occurred_at, raw_payload, canonical_payload) "
+        "VALUES ('evt_timeline', :t, 'siem', 'alert', now() - interval '3 minutes', '{}', '{}')",
+        "INSERT INTO evidence_snapshots (evidence_id, trace_id, sha256, created_at, payload) "
+        "VALUES ('evd_timeline', :t, md5(:t), now() - interval '2 minutes', '{}')",
+        "INSERT INTO beliefs (belief_id, trace_id, subject, hypothesis, confidence, updated_at, evidence_ids, created_at) "
+        "VALUES ('blf_timeline', :t, 'service/x', 'h', 0.8, now(), '[]', now() - interval '1 minute')",
+        "INSERT INTO belief_deltas (belief_id, trace_id, from_conf, to_conf, reason, created_at) "
+        "VALUES ('blf_timeline', :t, 0.35, 0.8, 'signal', now() - interval '1 minute')",
+        "INSERT INTO explanations (trace_id, belief_id, explanation_json, created_at) "
+        "VALUES (:t, 'blf_timeline', '{\"summary\": \"s\"}', now())",
+    ]
+    cleanup = [
+        f"DELETE FROM {table} WHERE trace_id = :t"
+        for table in ("events", "evidence_snapshots", "beliefs", "belief_deltas", "explanations", "ai_call_audit")
+    ]
+    with engine.begin() as conn:
+        for sql in cleanup + statements:
+            conn.execute(text(sql), {"t": TRACE})
+    monkeypatch.setattr(db, "DATABASE_READ_URL", "")
+    monkeypatch.setattr(db, "_READ_ENGINE", None)
+    monkeypatch.setattr(db, "get_engine", lambda: engine)
+    monkeypatch.setattr(ai_call_audit, "get_engine", lambda: engine)
+    yield engine
+    with engine.begin() as conn:
+        for sql in cleanup:
+            conn.execute(text(sql), {"t": TRACE})
+    engine.dispose()
+
+
+def test_timeline_is_ordered_and_projected(timeline_db):
+    client = TestClient(api.app)
+    body = client.get(f"/v1/trace/{TRACE}/timeline").json()
+    # the delta shares the belief's timestamp and follows it in pipeline order
+    assert [e["kind"] for e in body["entries"]] == ["event", "evidence", "belief", "belief_delta", "explanation"]
+    assert body["entries"][3]["data"]["to_conf"] == 0.8 and not body["truncated"]
+
+    body = client.get(f"/v1/trace/{TRACE}/timeline", params={"fields": "belief_delta.reason", "limit": 4}).json()
+    assert body["truncated"] and len(body["entries"]) == 4
+    assert body["entries"][0]["data"] == {} and body["entries"][3]["data"] == {"reason": "signal"}
+
+
+def test_ai_calls_are_rehydrated_from_blobs(timeline_db):
+    ai_call_audit.record_ai_call(
+        trace_id=TRACE,
+        phase="explain",
+        model_name="m",
+        prompt="why did confidence rise?",
+        raw_output='{"summary": "s"}',
+        parsed_json={"summary": "s"},
+        policy_status="ok",
+        policy_error=None,
+    )
+    client = TestClient(api.app)
+    body = client.get(f"/v1/trace/{TRACE}/timeline", params={"kinds": "ai_call"}).json()
+    (entry,) = body["entries"]
+    assert entry["data"]["prompt"] == "why did confidence rise?"
+    assert entry["data"]["raw_output"] == '{"summary": "s"}'
+    assert len(entry["data"]["prompt_sha256"]) == 64
+
+    body = client.get(f"/v1/trace/{TRACE}/timeline", params={"fields": "ai_call.output_sha256"}).json()
+    assert [e["data"] for e in body["entries"] if e["kind"] == "ai_call"] == [
+        {"output_sha256": entry["data"]["output_sha256"]}
+    ]
+
+
+def test_timeline_query_uses_indexes(timeline_db):
+    from sqlalchemy import text
+
+    sql = api._timeline_sql(api._timeline_projection(None, None))
+    with timeline_db.begin() as conn:
+        conn.execute(text("SET LOCAL enable_seqscan = off"))
+        raw = conn.execute(text("EXPLAIN (FORMAT JSON) " + sql), {"trace_id": TRACE, "limit": 10}).scalar_one()
+    plan = json.dumps(raw if isinstance(raw, list) else json.loads(raw))
+    assert '"Seq Scan"' not in plan
+
+
+def test_archived_rows_are_merged_into_the_timeline(timeline_db, tmp_path, monkeypatch):
+    import gzip
+
+    from services.shared import partitions
+
+    os.makedirs(tmp_path / "events")
+    with gzip.open(tmp_path / "events" / "events_p200101.jsonl.gz", "wt") as f:
+        f.write(json.dumps({
+            "event_id": "evt_timeline_archived", "trace_id": TRACE, "source": "siem", "event_type": "alert",
+            "occurred_at": "2001-01-15T00:00:00+00:00", "created_at": "2001-01-15T00:00:00+00:00",
+        }) + "\n")
+    partitions._write_manifest({"version": 1, "partitions": [{
+        "table": "events", "partition": "events_p200101", "path": "events/events_p200101.jsonl.gz",
+        "trace_ids": [TRACE], "range_start": "2001-01-01T00:00:00+00:00", "order_by": ["created_at", "event_id"],
+    }]}, str(tmp_path))
+    monkeypatch.setattr(partitions, "ARCHIVE_DIR", str(tmp_path))
+
+    client = TestClient(api.app)
+    body = client.get(f"/v1/trace/{TRACE}/timeline", params={"fields": "event.source"}).json()
+    assert [(e["kind"], e["ref"]) for e in body["entries"][:2]] == [
+        ("event", "evt_timeline_archived"),
+        ("event", "evt_timeline"),
+    ]
+    assert body["entries"][0]["data"] == {"source": "siem"}
+
+    body = client.get(f"/v1/trace/{TRACE}/timeline", params={"limit": 1}).json()
+    assert [e["ref"] for e in body["entries"]] == ["evt_timeline_archived"] and body["truncated"]
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+
+from services.audit.audit_chain import traces_needing_checkpoint, verify_chain, write_checkpoint
+
+log = logging.getLogger("audit_checkpointer")
+
+
+def main() -> None:
+    """
+    Audit chain checkpointer (run periodically):
+    - verifies rows written since each trace's last checkpoint
+    - writes a new signed checkpoint at the chain tail
+    --verify TRACE_ID only verifies one trace (--full: from genesis).
+    """
+    parser = argparse.ArgumentParser(description="VoxCortex audit chain checkpointer")
+    parser.add_argument("--since-hours", type=float, default=24.0)
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--verify", metavar="TRACE_ID")
+    parser.add_argument("--full", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.verify:
+        print(json.dumps(verify_chain(args.verify, full=args.full), default=str))
+        return
+
+    since = datetime.now(timezone.utc) - timedelta(hours=args.since_hours)
+    written = 0
+    broken = 0
+    for trace_id in traces_needing_checkpoint(since, limit=args.limit):
+        try:
+            if write_checkpoint(trace_id) is not None:
+                written += 1
+        except RuntimeError as e:
+            broken += 1
+            log.error("%s", e)
+    log.info("checkpoints written: %d, broken chains: %d", written, broken)
+    if broken:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
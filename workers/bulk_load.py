@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+
+from services.signalmesh.bulk_loader import CHUNK_SIZE, load_file
+
+log = logging.getLogger("bulk_load")
+
+
+def main() -> None:
+    """
+    Bulk event backfill from NDJSON / CSV exports.
+    Each record: source, event_type, occurred_at, severity, payload
+    (+ optional trace_id). CSV without a payload column: every other
+    column becomes payload. Re-running the same command resumes after the
+    last committed chunk. One worker process per core is about right; the
+    database needs cores of its own for index maintenance.
+    """
+    parser = argparse.ArgumentParser(description="VoxCortex bulk event loader")
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--format", choices=("ndjson", "csv"), help="default: from file extension")
+    parser.add_argument("--source", help="default source for records without one")
+    parser.add_argument("--event-type", help="default event_type for records without one")
+    parser.add_argument("--severity", help="default severity for records without one")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--key", help="resume key (default: absolute path; single file only)")
+    parser.add_argument("--restart", action="store_true", help="ignore the stored offset")
+    parser.add_argument("--enqueue", action="store_true", help="queue canonical events for the worker (via the outbox)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="parallel loader processes (NDJSON); resume with the same count",
+    )
+    args = parser.parse_args()
+
+    if args.key and len(args.paths) > 1:
+        parser.error("--key needs exactly one path")
+
+    logging.basicConfig(level=logging.INFO)
+
+    defaults = {"source": args.source, "event_type": args.event_type, "severity": args.severity}
+    for path in args.paths:
+        stats = load_file(
+            path,
+            fmt=args.format,
+            load_key=args.key,
+            chunk_size=args.chunk_size,
+            defaults=defaults,
+            enqueue=args.enqueue,
+            restart=args.restart,
+            workers=args.workers,
+        )
+        print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
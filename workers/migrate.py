@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import argparse
+import logging
+
+from services.shared.migrations import MIGRATIONS_DIR, migrate, status
+
+log = logging.getLogger("migrate")
+
+
+def main() -> None:
+    """
+    Schema migration runner (run on deploy, before the services start):
+    applies pending infra/sql/NNN_*.sql files in order.
+    """
+    parser = argparse.ArgumentParser(description="VoxCortex schema migrations")
+    parser.add_argument("--dir", default=MIGRATIONS_DIR)
+    parser.add_argument("--target", metavar="VERSION", help="stop after this version")
+    parser.add_argument(
+        "--baseline",
+        metavar="VERSION",
+        help="record migrations up to VERSION as applied without running them",
+    )
+    parser.add_argument("--status", action="store_true")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.status:
+        for entry in status(migrations_dir=args.dir):
+            flag = "applied" if entry["applied"] else "pending"
+            if entry["checksum_changed"]:
+                flag += " (changed since applied)"
+            print(f"{entry['version']}_{entry['name']}: {flag}")
+        return
+
+    applied = migrate(
+        migrations_dir=args.dir,
+        target=args.target,
+        baseline=args.baseline,
+        dry_run=args.dry_run,
+    )
+    log.info("%s %d migrations", "pending" if args.dry_run else "applied", len(applied))
+
+
+if __name__ == "__main__":
+    main()
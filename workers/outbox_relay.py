@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import time
+from datetime import timedelta
+
+from services.signalmesh.outbox import BATCH_SIZE, InMemoryBus, PubSubBus, backlog, purge_sent, relay_once
+
+log = logging.getLogger("outbox_relay")
+
+
+def main() -> None:
+    """
+    Outbox relay (long-running; run one or more replicas):
+    - publishes pending ingest_outbox rows in batches, marks them sent
+    - purges sent rows older than --retain-hours
+    A full batch is followed immediately by the next one; otherwise the
+    relay sleeps --poll-interval seconds.
+    """
+    parser = argparse.ArgumentParser(description="VoxCortex outbox relay")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--poll-interval", type=float, default=0.2)
+    parser.add_argument("--retain-hours", type=float, default=24.0)
+    parser.add_argument("--bus", choices=("pubsub", "memory"), default="pubsub")
+    parser.add_argument("--once", action="store_true", help="drain the backlog once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    bus = PubSubBus() if args.bus == "pubsub" else InMemoryBus()
+    retain = timedelta(hours=args.retain_hours)
+    last_purge = 0.0
+    totals = {"sent": 0, "failed": 0}
+
+    while True:
+        result = relay_once(bus, batch_size=args.batch_size)
+        totals["sent"] += result["sent"]
+        totals["failed"] += result["failed"]
+
+        if time.monotonic() - last_purge > 60:
+            purged = purge_sent(retain)
+            last_purge = time.monotonic()
+            log.info("outbox sent=%d failed=%d purged=%d backlog=%s", totals["sent"], totals["failed"], purged, backlog())
+
+        if result["claimed"] < args.batch_size:
+            if args.once:
+                break
+            time.sleep(args.poll_interval)
+
+    log.info("outbox drained: sent=%d failed=%d", totals["sent"], totals["failed"])
+
+
+if __name__ == "__main__":
+    main()
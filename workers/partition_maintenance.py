@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import argparse
+import logging
+from datetime import datetime, timezone
+
+from services.shared.partitions import ARCHIVE_DIR, archive_partitions, ensure_partitions
+from services.signalmesh.idempotency import prune_keys
+
+log = logging.getLogger("partition_maintenance")
+
+
+def _months_ago(n: int) -> datetime:
+    now = datetime.now(timezone.utc)
+    year, month = now.year, now.month - n
+    while month <= 0:
+        month += 12
+        year -= 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def main() -> None:
+    """
+    Partition maintenance (run daily, e.g. Cloud Scheduler / cron):
+    1. create upcoming monthly partitions
+    2. archive + detach partitions older than the hot window
+    3. prune ingest idempotency keys first seen before that window; their
+       events are archived, so a redelivery that old is ingested again
+    """
+    parser = argparse.ArgumentParser(description="VoxCortex partition maintenance")
+    parser.add_argument("--months-ahead", type=int, default=3)
+    parser.add_argument(
+        "--hot-months",
+        type=int,
+        default=3,
+        help="partitions ending before the start of (current month - N) are archived",
+    )
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    created = ensure_partitions(months_ahead=args.months_ahead)
+    log.info("partitions created: %s", created)
+
+    cutoff = _months_ago(args.hot_months)
+    archived = archive_partitions(cutoff, archive_dir=args.archive_dir, dry_run=args.dry_run)
+    log.info(
+        "%s %d partitions older than %s",
+        "would archive" if args.dry_run else "archived",
+        len(archived),
+        cutoff.date(),
+    )
+
+    pruned = prune_keys(cutoff, dry_run=args.dry_run)
+    log.info(
+        "%s %d idempotency keys first seen before %s",
+        "would prune" if args.dry_run else "pruned",
+        pruned,
+        cutoff.date(),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,35 +2,126 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+from concurrent.futures import TimeoutError as FutureTimeout
 from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
 
-from sqlalchemy import text
-
-from services.shared.db import get_engine
+from services.shared.db import get_engine, sql_text
 from services.shared.logging import trace_logger
 from services.shared.evidence_store import snapshot_evidence
+from services.audit.audit_chain import append_audit
 from services.beliefcore.update_engine import deterministic_update
-from services.cortexreasoner.gemini_reasoner import explain
+from services.cortexreasoner.gemini_reasoner import (
+    estimate_explain_tokens,
+    explain,
+    fallback_explanation,
+    reuse_similar_explanation,
+)
+from services.cortexreasoner.explain_scheduler import scheduler
+from services.cortexreasoner.hypothesis_promoter import promote_latest_hypothesis_for_trace
+from services.cortexreasoner.llm_dispatcher import get_dispatcher
 
 log = logging.getLogger("phase0_worker")
 
+# Bump when the pipeline's outputs change meaning: events processed by an
+# older version are processed again instead of answered from the ledger.
+PIPELINE_VERSION = os.getenv("PIPELINE_VERSION", "phase0-1c")
+
+# upper bound on waiting for a dispatched explanation (queue deadline plus
+# the call itself); past it the event proceeds with the shed fallback
+EXPLAIN_TIMEOUT_S = float(os.getenv("EXPLAIN_TIMEOUT_S", "90"))
+
+
+def _shed_explanation() -> Dict[str, Any]:
+    return fallback_explanation(
+        "Explanation shed: LLM quota unavailable before deadline",
+        "shed",
+        "Replay once LLM quota is available",
+    )
+
+
+# ---------- Processed-event ledger (infra/sql/009_processed_events.sql) ----------
+
+_SELECT_OUTCOME = """
+    SELECT outcome
+    FROM processed_events
+    WHERE event_id = :event_id AND pipeline_version = :pipeline_version
+"""
 
-def handle_canonical_event(event: dict) -> None:
+
+def processed_outcome(event_id: str, conn=None) -> Optional[Dict[str, Any]]:
+    """Stored outcome of `event_id` under PIPELINE_VERSION, or None."""
+    params = {"event_id": event_id, "pipeline_version": PIPELINE_VERSION}
+    if conn is not None:
+        return conn.execute(sql_text(_SELECT_OUTCOME), params).scalar_one_or_none()
+    with get_engine().connect() as c:
+        return c.execute(sql_text(_SELECT_OUTCOME), params).scalar_one_or_none()
+
+
+def _record_outcome(conn, event_id: str, trace_id: str, outcome: Dict[str, Any], now: datetime) -> None:
+    conn.execute(
+        sql_text("""
+            INSERT INTO processed_events (event_id, pipeline_version, trace_id, outcome, processed_at)
+            VALUES (:event_id, :pipeline_version, :trace_id, CAST(:outcome AS jsonb), :processed_at)
+            ON CONFLICT (event_id, pipeline_version) DO UPDATE
+            SET
+                outcome = EXCLUDED.outcome,
+                processed_at = EXCLUDED.processed_at,
+                runs = processed_events.runs + 1
+        """),
+        {
+            "event_id": event_id,
+            "pipeline_version": PIPELINE_VERSION,
+            "trace_id": trace_id,
+            "outcome": json.dumps(outcome),
+            "processed_at": now,
+        },
+    )
+
+
+def belief_inputs(event: dict) -> Tuple[str, str, float, float]:
+    """(subject, hypothesis, prior, signal) the pipeline derives from an event."""
+    # canonical events from signalmesh carry the subject in `normalized`
+    subject = event.get("subject") or (event.get("normalized") or {}).get("subject") or "service/api-gateway"
+    hypothesis = event.get(
+        "hypothesis",
+        f"Issue affecting {subject}",
+    )
+    prior = float(event.get("prior", 0.35))
+    signal_strength = float(event.get("signal", 0.7))
+    return subject, hypothesis, prior, signal_strength
+
+
+def handle_canonical_event(event: dict, force: bool = False) -> Dict[str, Any]:
     """
     Phase-0 Canonical Pipeline (STABLE)
 
     Phase-1C additions:
     - Pass real belief_id into Gemini reasoner
     - Persist AI explanation alongside canonical belief
+    - Explanations are significance-gated; skips are audited
+    - LLM calls go through the quota-aware dispatcher
+    - Near-duplicate hypotheses of the subject reuse their stored output;
+      new model outputs are stored as hypotheses and promoted
+    - current_beliefs keeps the latest belief per (subject, hypothesis)
+
+    Events with an event_id are recorded in the processed-event ledger:
+    a replay returns the stored outcome without running the pipeline,
+    unless `force` is set. Returns the outcome.
     """
 
     trace_id = event.get("trace_id", "trc_demo")
     event_id = event.get("event_id", "evt_demo")
-    subject = event.get("subject", "service/api-gateway")
-    hypothesis = event.get(
-        "hypothesis",
-        f"Issue affecting {subject}",
-    )
+    ledger_id = event.get("event_id")
+
+    if ledger_id and not force:
+        outcome = processed_outcome(ledger_id)
+        if outcome is not None:
+            trace_logger(trace_id, "phase0_worker", "SKIP already processed")
+            return outcome
+
+    subject, hypothesis, prior, signal_strength = belief_inputs(event)
 
     trace_logger(trace_id, "phase0_worker", "START")
 
@@ -41,26 +132,78 @@ def handle_canonical_event(event: dict) -> None:
     )
 
     # ---------- Deterministic Belief Update ----------
-    prior = float(event.get("prior", 0.35))
-    signal_strength = float(event.get("signal", 0.7))
-
     belief, delta = deterministic_update(
-        trace_id,
         subject,
+        trace_id,
         hypothesis,
         prior,
         signal_strength,
         evidence_id,
     )
 
+    # ---------- Phase-1 Explanation (AI, READ-ONLY) ----------
+    # Dispatched before the transaction: waiting on LLM quota must not
+    # hold a connection and row locks. Only the write is transactional.
+    # Keyed by the semantic belief: every ingest mints a new trace_id.
+    schedule_key = (subject, hypothesis)
+    schedule = scheduler.decide(schedule_key, float(belief.confidence))
+    explanation = None
+    explained = False
+    generated = False
+
+    if schedule.explain:
+        # checked before queueing: a reuse costs no LLM quota
+        explanation = reuse_similar_explanation(trace_id, belief)
+        explained = explanation is not None
+
+    if schedule.explain and explanation is None:
+        explain_kwargs = {
+            "belief_id": belief.belief_id,   # ✅ FIXED
+            "belief": belief,
+            "evidence": {
+                "evidence_id": evidence_id,
+                "sha256": evidence_sha,
+                "signature": signature,
+            },
+        }
+        future = get_dispatcher().submit(
+            explain,
+            args=(trace_id,),
+            kwargs={**explain_kwargs, "store_hypothesis": True},
+            severity=event.get("severity"),
+            confidence=float(belief.confidence),
+            est_tokens=estimate_explain_tokens(trace_id, **explain_kwargs),
+            fallback=_shed_explanation,
+        )
+        try:
+            explanation = future.result(timeout=EXPLAIN_TIMEOUT_S)
+            explained = not future.shed
+        except FutureTimeout:
+            log.warning("Explanation timed out after %ss (trace=%s)", EXPLAIN_TIMEOUT_S, trace_id)
+            explanation = _shed_explanation()
+            explained = False
+        generated = explained
+
     now = datetime.now(timezone.utc)
     engine = get_engine()
 
     with engine.begin() as conn:
 
+        # ---------- Ledger re-check under a per-event lock ----------
+        # (a concurrent delivery of the same event may have finished meanwhile)
+        if ledger_id:
+            conn.execute(
+                sql_text("SELECT pg_advisory_xact_lock(hashtextextended(:event_id, 0))"),
+                {"event_id": ledger_id},
+            )
+            if not force:
+                outcome = processed_outcome(ledger_id, conn)
+                if outcome is not None:
+                    return outcome
+
         # ---------- Belief UPSERT ----------
         conn.execute(
-            text("""
+            sql_text("""
                 INSERT INTO beliefs (
                     belief_id,
                     trace_id,
@@ -96,110 +239,164 @@ def handle_canonical_event(event: dict) -> None:
             },
         )
 
-        # ---------- Belief Delta ----------
+        # ---------- Current-belief projection (infra/sql/011) ----------
+        # latest belief per (subject, hypothesis); an older write that
+        # commits late does not overwrite a newer one
         conn.execute(
-            text("""
-                INSERT INTO belief_deltas (
+            sql_text("""
+                INSERT INTO current_beliefs (
+                    subject,
+                    hypothesis,
                     belief_id,
                     trace_id,
-                    from_conf,
-                    to_conf,
-                    reason,
-                    created_at
+                    confidence,
+                    evidence_ids,
+                    updated_at
                 )
                 VALUES (
+                    :subject,
+                    :hypothesis,
                     :belief_id,
                     :trace_id,
-                    :from_conf,
-                    :to_conf,
-                    :reason,
-                    :created_at
+                    :confidence,
+                    CAST(:evidence_ids AS jsonb),
+                    :updated_at
                 )
-                ON CONFLICT DO NOTHING
+                ON CONFLICT (subject, hypothesis) DO UPDATE
+                SET
+                    belief_id = EXCLUDED.belief_id,
+                    trace_id = EXCLUDED.trace_id,
+                    confidence = EXCLUDED.confidence,
+                    evidence_ids = EXCLUDED.evidence_ids,
+                    updated_at = EXCLUDED.updated_at
+                WHERE current_beliefs.updated_at <= EXCLUDED.updated_at
             """),
             {
-                "belief_id": delta.belief_id,
+                "subject": subject,
+                "hypothesis": hypothesis,
+                "belief_id": belief.belief_id,
                 "trace_id": trace_id,
-                "from_conf": float(delta.from_conf),
-                "to_conf": float(delta.to_conf),
-                "reason": delta.reason,
-                "created_at": now,
-            },
-        )
-
-        # ---------- Phase-1 Explanation (AI, READ-ONLY) ----------
-        explanation = explain(
-            trace_id,
-            belief_id=belief.belief_id,   # ✅ FIXED
-            belief=belief,
-            evidence={
-                "evidence_id": evidence_id,
-                "sha256": evidence_sha,
-                "signature": signature,
+                "confidence": float(belief.confidence),
+                "evidence_ids": json.dumps([evidence_id]),
+                "updated_at": now,
             },
         )
 
+        # ---------- Belief Delta ----------
         conn.execute(
-            text("""
-                INSERT INTO explanations (
+            sql_text("""
+                INSERT INTO belief_deltas (
                     belief_id,
                     trace_id,
-                    explanation_json,
+                    from_conf,
+                    to_conf,
+                    reason,
                     created_at
                 )
                 VALUES (
                     :belief_id,
                     :trace_id,
-                    CAST(:explanation_json AS jsonb),
+                    :from_conf,
+                    :to_conf,
+                    :reason,
                     :created_at
                 )
                 ON CONFLICT DO NOTHING
             """),
             {
-                "belief_id": belief.belief_id,
+                "belief_id": delta.belief_id,
                 "trace_id": trace_id,
-                "explanation_json": json.dumps(explanation, ensure_ascii=False),
+                "from_conf": float(delta.from_conf),
+                "to_conf": float(delta.to_conf),
+                "reason": delta.reason,
                 "created_at": now,
             },
         )
 
-        # ---------- Audit Log ----------
-        conn.execute(
-            text("""
-                INSERT INTO audit_log (
-                    trace_id,
-                    actor,
-                    action,
-                    details,
-                    created_at
-                )
-                VALUES (
-                    :trace_id,
-                    :actor,
-                    :action,
-                    CAST(:details AS jsonb),
-                    :created_at
-                )
-            """),
-            {
-                "trace_id": trace_id,
-                "actor": "phase0_worker",
-                "action": "phase0_complete",
-                "details": json.dumps(
-                    {
-                        "event_id": event_id,
-                        "belief_id": belief.belief_id,
-                        "evidence_id": evidence_id,
-                        "evidence_sha256": evidence_sha,
-                        "signature": signature,
-                    },
-                    ensure_ascii=False,
-                ),
-                "created_at": now,
-            },
+        # ---------- Phase-1 Explanation write ----------
+        if explanation is not None:
+            conn.execute(
+                sql_text("""
+                    INSERT INTO explanations (
+                        belief_id,
+                        trace_id,
+                        explanation_json,
+                        created_at
+                    )
+                    VALUES (
+                        :belief_id,
+                        :trace_id,
+                        CAST(:explanation_json AS jsonb),
+                        :created_at
+                    )
+                    ON CONFLICT DO NOTHING
+                """),
+                {
+                    "belief_id": belief.belief_id,
+                    "trace_id": trace_id,
+                    "explanation_json": json.dumps(explanation, ensure_ascii=False),
+                    "created_at": now,
+                },
+            )
+        else:
+            append_audit(
+                conn,
+                trace_id=trace_id,
+                actor="phase0_worker",
+                action="explanation_skipped",
+                details={
+                    "event_id": event_id,
+                    "belief_id": belief.belief_id,
+                    "confidence": float(belief.confidence),
+                    **schedule.to_dict(),
+                },
+                created_at=now,
+            )
+
+        outcome = {
+            "event_id": event_id,
+            "belief_id": belief.belief_id,
+            "evidence_id": evidence_id,
+            "evidence_sha256": evidence_sha,
+            "signature": signature,
+            "explanation": schedule.to_dict(),
+        }
+
+        # ---------- Audit Log (hash-chained) ----------
+        append_audit(
+            conn,
+            trace_id=trace_id,
+            actor="phase0_worker",
+            action="phase0_complete",
+            details=outcome,
+            created_at=now,
         )
 
+        # ---------- Processed-event ledger (same transaction) ----------
+        if ledger_id:
+            _record_outcome(
+                conn,
+                ledger_id,
+                trace_id,
+                {**outcome, "confidence": float(belief.confidence), "pipeline_version": PIPELINE_VERSION},
+                now,
+            )
+
+    # only a committed, non-shed explanation resets the debounce window
+    if explained:
+        scheduler.record(schedule_key, float(belief.confidence))
+
+    # ---------- Hypothesis promotion (deterministic) ----------
+    # the model output was stored as a hypothesis of this belief; a
+    # near-duplicate that was already decided is not promoted again
+    if generated:
+        try:
+            promote_latest_hypothesis_for_trace(trace_id=trace_id, belief_id=belief.belief_id)
+        except Exception:
+            log.exception("Hypothesis promotion failed (trace=%s)", trace_id)
+
     log.info("Phase-0 + Phase-1C pipeline completed")
+    return {**outcome, "confidence": float(belief.confidence), "pipeline_version": PIPELINE_VERSION}
 
 
 def main() -> None:
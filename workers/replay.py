@@ -0,0 +1,492 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.shared.db import executemany, get_engine, sql_text
+from services.beliefcore.update_engine import Belief, EvidenceRef, deterministic_update
+from services.cortexreasoner.gemini_reasoner import estimate_explain_tokens, explain
+from services.cortexreasoner.hypothesis_promoter import _decision_from_confidence
+from services.cortexreasoner.llm_dispatcher import get_dispatcher
+from workers.phase0_worker import PIPELINE_VERSION, belief_inputs
+
+log = logging.getLogger("replay")
+
+# ---------- Bulk replay of stored events (infra/sql/010_replay.sql) ----------
+#
+# - events are streamed per subject shard with a server-side cursor in
+#   (occurred_at, event_id) order and run through the same belief inputs
+#   and deterministic update as phase0_worker
+# - results go to replay_beliefs under a run_id, never to production
+#   beliefs; each chunk commits with its shard checkpoint (exact resume)
+# - shards run in parallel processes; a subject always maps to one shard,
+#   so per-subject event order is preserved
+# - LLM: skip, cache (reuse the production explanation when the decision
+#   band is unchanged) or live (cache first, model for the rest; shed
+#   calls stay unexplained and are retried when the run is resumed)
+# - diff_report(): replay outcome vs latest production belief per
+#   (subject, hypothesis)
+
+CHUNK_SIZE = int(os.getenv("REPLAY_CHUNK_SIZE", "2000"))
+LLM_MODES = ("skip", "cache", "live")
+REPORT_EXAMPLES = 20
+
+# same rule as belief_inputs(), in SQL, to route a subject to its shard
+_SUBJECT_SQL = (
+    "COALESCE(NULLIF(canonical_payload->>'subject', ''), "
+    "NULLIF(canonical_payload->'normalized'->>'subject', ''), 'service/api-gateway')"
+)
+
+
+# ---------- Runs and checkpoints ----------
+
+def _start_run(run_id: str, *, shards: int, llm: str, since, until, restart: bool) -> Dict[str, Any]:
+    with get_engine().begin() as conn:
+        if restart:
+            conn.execute(sql_text("DELETE FROM replay_runs WHERE run_id = :run_id"), {"run_id": run_id})
+        row = conn.execute(
+            sql_text("SELECT shards, since, until FROM replay_runs WHERE run_id = :run_id"),
+            {"run_id": run_id},
+        ).one_or_none()
+        if row is not None:
+            if row[0] != shards:
+                raise ValueError(f"{run_id} was started with {row[0]} shards; resume with the same --shards or use --restart")
+            return {"since": row[1], "until": row[2], "resumed": True}
+        conn.execute(
+            sql_text(
+                """
+                INSERT INTO replay_runs (run_id, pipeline_version, llm_mode, shards, since, until)
+                VALUES (:run_id, :pipeline_version, :llm, :shards, :since, :until)
+                """
+            ),
+            {
+                "run_id": run_id,
+                "pipeline_version": PIPELINE_VERSION,
+                "llm": llm,
+                "shards": shards,
+                "since": since,
+                "until": until,
+            },
+        )
+    return {"since": since, "until": until, "resumed": False}
+
+
+def _checkpoint(run_id: str, shard: int) -> Tuple[Optional[datetime], Optional[str], int, bool]:
+    with get_engine().connect() as conn:
+        row = conn.execute(
+            sql_text(
+                """
+                SELECT last_occurred_at, last_event_id, events_done, done
+                FROM replay_checkpoints
+                WHERE run_id = :run_id AND shard = :shard
+                """
+            ),
+            {"run_id": run_id, "shard": shard},
+        ).one_or_none()
+    if row is None:
+        return None, None, 0, False
+    return row[0], row[1], int(row[2]), bool(row[3])
+
+
+_SAVE_CHECKPOINT = """
+    INSERT INTO replay_checkpoints (run_id, shard, last_occurred_at, last_event_id, events_done, done, updated_at)
+    VALUES (:run_id, :shard, :last_occurred_at, :last_event_id, :events, :done, now())
+    ON CONFLICT (run_id, shard) DO UPDATE
+    SET
+        last_occurred_at = COALESCE(EXCLUDED.last_occurred_at, replay_checkpoints.last_occurred_at),
+        last_event_id = COALESCE(EXCLUDED.last_event_id, replay_checkpoints.last_event_id),
+        events_done = replay_checkpoints.events_done + EXCLUDED.events_done,
+        done = EXCLUDED.done,
+        updated_at = now()
+"""
+
+_UPSERT_BELIEF = """
+    INSERT INTO replay_beliefs (
+        run_id, subject, hypothesis, confidence, decision, events, last_event_id, last_occurred_at
+    )
+    VALUES (
+        :run_id, :subject, :hypothesis, :confidence, :decision, :events, :last_event_id, :last_occurred_at
+    )
+    ON CONFLICT (run_id, subject, hypothesis) DO UPDATE
+    SET
+        confidence = EXCLUDED.confidence,
+        decision = EXCLUDED.decision,
+        events = replay_beliefs.events + EXCLUDED.events,
+        last_event_id = EXCLUDED.last_event_id,
+        last_occurred_at = EXCLUDED.last_occurred_at
+"""
+
+
+# ---------- Belief engine ----------
+
+def fold(rows) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Run (event_id, occurred_at, canonical_payload) rows, in order, through
+    the belief engine. Returns the last outcome per (subject, hypothesis)
+    with the number of events folded into it.
+    """
+    state: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for event_id, occurred_at, payload in rows:
+        subject, hypothesis, prior, signal_strength = belief_inputs(payload)
+        belief, _ = deterministic_update(
+            subject,
+            payload.get("trace_id", "trc_replay"),
+            hypothesis,
+            prior,
+            signal_strength,
+            event_id,
+        )
+        confidence = float(belief.confidence)
+        key = (subject, hypothesis)
+        previous = state.get(key)
+        state[key] = {
+            "subject": subject,
+            "hypothesis": hypothesis,
+            "confidence": confidence,
+            "decision": _decision_from_confidence(confidence)[0],
+            "events": (previous["events"] if previous else 0) + 1,
+            "last_event_id": event_id,
+            "last_occurred_at": occurred_at,
+        }
+    return state
+
+
+def _stream_sql(shards: int, since, until, resume: bool) -> str:
+    where = []
+    if shards > 1:
+        where.append(f"(hashtextextended({_SUBJECT_SQL}, 0) % :shards + :shards) % :shards = :shard")
+    if since is not None:
+        where.append("occurred_at >= :since")
+    if until is not None:
+        where.append("occurred_at < :until")
+    if resume:
+        where.append("(occurred_at, event_id) > (:last_occurred_at, :last_event_id)")
+    return (
+        "SELECT event_id, occurred_at, canonical_payload FROM events"
+        + (" WHERE " + " AND ".join(where) if where else "")
+        + " ORDER BY occurred_at, event_id"
+    )
+
+
+def _replay_shard(run_id: str, shard: int, shards: int, since, until, chunk_size: int) -> int:
+    last_occurred_at, last_event_id, _, done = _checkpoint(run_id, shard)
+    if done:
+        return 0
+
+    params = {
+        "shards": shards,
+        "shard": shard,
+        "since": since,
+        "until": until,
+        "last_occurred_at": last_occurred_at,
+        "last_event_id": last_event_id,
+    }
+    sql = _stream_sql(shards, since, until, resume=last_occurred_at is not None)
+    replayed = 0
+
+    with get_engine().connect() as read_conn:
+        result = read_conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(
+            sql_text(sql), params
+        )
+        for rows in result.partitions(chunk_size):
+            state = fold(rows)
+            last = rows[-1]
+            with get_engine().begin() as conn:
+                executemany(_UPSERT_BELIEF, [{"run_id": run_id, **s} for s in state.values()], conn=conn)
+                conn.execute(
+                    sql_text(_SAVE_CHECKPOINT),
+                    {
+                        "run_id": run_id,
+                        "shard": shard,
+                        "last_occurred_at": last[1],
+                        "last_event_id": last[0],
+                        "events": len(rows),
+                        "done": False,
+                    },
+                )
+            replayed += len(rows)
+
+    with get_engine().begin() as conn:
+        conn.execute(
+            sql_text(_SAVE_CHECKPOINT),
+            {"run_id": run_id, "shard": shard, "last_occurred_at": None, "last_event_id": None, "events": 0, "done": True},
+        )
+    log.info("replay %s shard %d/%d: %d events", run_id, shard + 1, shards, replayed)
+    return replayed
+
+
+def _replay_shard_star(args) -> int:
+    return _replay_shard(*args)
+
+
+# ---------- Explanations ----------
+
+def _explain_from_cache(run_id: str) -> int:
+    """Reuse the latest production explanation where the decision band is unchanged."""
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            sql_text(
+                """
+                SELECT r.subject, r.hypothesis, r.decision, p.confidence, x.explanation_json
+                FROM replay_beliefs r
+                JOIN current_beliefs p ON p.subject = r.subject AND p.hypothesis = r.hypothesis
+                JOIN LATERAL (
+                    SELECT e.explanation_json
+                    FROM explanations e
+                    WHERE e.trace_id = p.trace_id AND e.belief_id = p.belief_id
+                    ORDER BY e.created_at DESC
+                    LIMIT 1
+                ) x ON true
+                WHERE r.run_id = :run_id AND r.explanation IS NULL
+                """
+            ),
+            {"run_id": run_id},
+        ).fetchall()
+    updates = [
+        {"run_id": run_id, "subject": s, "hypothesis": h, "explanation": json.dumps(e), "source": "cache"}
+        for s, h, decision, prod_conf, e in rows
+        if _decision_from_confidence(float(prod_conf))[0] == decision
+    ]
+    return _store_explanations(updates)
+
+
+def _explain_live(run_id: str) -> Dict[str, int]:
+    with get_engine().connect() as conn:
+        rows = conn.execute(
+            sql_text(
+                """
+                SELECT subject, hypothesis, confidence, last_event_id, last_occurred_at
+                FROM replay_beliefs
+                WHERE run_id = :run_id AND explanation IS NULL
+                """
+            ),
+            {"run_id": run_id},
+        ).fetchall()
+
+    trace_id = f"trc_replay_{run_id}"
+    pending = []
+    for subject, hypothesis, confidence, event_id, occurred_at in rows:
+        belief = Belief(
+            belief_id=f"blf_replay_{uuid.uuid4().hex}",
+            trace_id=trace_id,
+            subject=subject,
+            hypothesis=hypothesis,
+            confidence=float(confidence),
+            updated_at=occurred_at,
+            evidence=[EvidenceRef(evidence_id=event_id)],
+        )
+        kwargs = {"belief_id": belief.belief_id, "belief": belief, "evidence": {"event_id": event_id}}
+        future = get_dispatcher().submit(
+            explain,
+            args=(trace_id,),
+            kwargs=kwargs,
+            confidence=float(confidence),
+            est_tokens=estimate_explain_tokens(trace_id, **kwargs),
+        )
+        pending.append((subject, hypothesis, future))
+
+    # shed calls (no quota before their deadline) stay NULL, so the next
+    # run with the same --run-id asks the model for them again
+    updates = []
+    shed = 0
+    for s, h, f in pending:
+        explanation = f.result()
+        if f.shed:
+            shed += 1
+            continue
+        updates.append(
+            {"run_id": run_id, "subject": s, "hypothesis": h, "explanation": json.dumps(explanation), "source": "live"}
+        )
+    if shed:
+        log.warning("replay %s: %d of %d live explanations shed; re-run to fill them", run_id, shed, len(pending))
+    return {"live": _store_explanations(updates), "shed": shed}
+
+
+def _store_explanations(updates: List[Dict[str, Any]]) -> int:
+    return executemany(
+        """
+        UPDATE replay_beliefs
+        SET explanation = CAST(:explanation AS jsonb), explanation_source = :source
+        WHERE run_id = :run_id AND subject = :subject AND hypothesis = :hypothesis
+        """,
+        updates,
+    )
+
+
+# ---------- Diff vs production ----------
+
+def diff_report(run_id: str, *, full_history: bool = True) -> Dict[str, Any]:
+    """
+    Compare replay_beliefs of `run_id` with the latest production belief
+    per (subject, hypothesis). Production-only keys are counted only for
+    full-history runs (a windowed replay cannot see them).
+    """
+    counts: Counter = Counter()
+    transitions: Counter = Counter()
+    examples: List[Dict[str, Any]] = []
+
+    with get_engine().connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(
+            sql_text(
+                """
+                WITH prod AS (
+                    SELECT subject, hypothesis, confidence FROM current_beliefs
+                ),
+                rep AS (
+                    SELECT subject, hypothesis, confidence, decision
+                    FROM replay_beliefs
+                    WHERE run_id = :run_id
+                )
+                SELECT subject, hypothesis, p.confidence, r.confidence, r.decision
+                FROM rep r
+                FULL OUTER JOIN prod p USING (subject, hypothesis)
+                """
+            ),
+            {"run_id": run_id},
+        )
+        for subject, hypothesis, prod_conf, replay_conf, replay_decision in result:
+            if replay_conf is None:
+                if full_history:
+                    counts["only_in_production"] += 1
+                continue
+            if prod_conf is None:
+                counts["only_in_replay"] += 1
+                continue
+
+            counts["compared"] += 1
+            prod_decision = _decision_from_confidence(float(prod_conf))[0]
+            if round(float(prod_conf), 6) == round(float(replay_conf), 6):
+                counts["unchanged"] += 1
+                continue
+            counts["confidence_changed"] += 1
+            if prod_decision != replay_decision:
+                counts["decision_changed"] += 1
+                transitions[f"{prod_decision}->{replay_decision}"] += 1
+                if len(examples) < REPORT_EXAMPLES:
+                    examples.append(
+                        {
+                            "subject": subject,
+                            "hypothesis": hypothesis,
+                            "production": {"confidence": float(prod_conf), "decision": prod_decision},
+                            "replay": {"confidence": float(replay_conf), "decision": replay_decision},
+                        }
+                    )
+
+    return {
+        "run_id": run_id,
+        "pipeline_version": PIPELINE_VERSION,
+        **{k: counts[k] for k in (
+            "compared", "unchanged", "confidence_changed", "decision_changed", "only_in_replay", "only_in_production"
+        )},
+        "decision_transitions": dict(transitions),
+        "examples": examples,
+    }
+
+
+# ---------- Entry point ----------
+
+def replay(
+    *,
+    run_id: Optional[str] = None,
+    shards: int = 1,
+    llm: str = "skip",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = CHUNK_SIZE,
+    restart: bool = False,
+) -> Dict[str, Any]:
+    """
+    Replay events (optionally within [since, until)) into replay_beliefs
+    under `run_id`, resuming it if it exists. Returns the diff report.
+    """
+    if llm not in LLM_MODES:
+        raise ValueError(f"llm must be one of {LLM_MODES}")
+    run_id = run_id or f"rpl_{datetime.now(timezone.utc):%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:6]}"
+    run = _start_run(run_id, shards=shards, llm=llm, since=since, until=until, restart=restart)
+    since, until = run["since"], run["until"]
+
+    started = time.perf_counter()
+    jobs = [(run_id, i, shards, since, until, chunk_size) for i in range(shards)]
+    if shards == 1:
+        replayed = _replay_shard(*jobs[0])
+    else:
+        # spawn: children build their own engine instead of sharing the parent's pool
+        with multiprocessing.get_context("spawn").Pool(shards) as pool:
+            replayed = sum(pool.map(_replay_shard_star, jobs))
+    elapsed = time.perf_counter() - started
+
+    explained = {"cache": 0, "live": 0, "shed": 0}
+    if llm in ("cache", "live"):
+        explained["cache"] = _explain_from_cache(run_id)
+    if llm == "live":
+        explained.update(_explain_live(run_id))
+
+    report = diff_report(run_id, full_history=since is None and until is None)
+    report.update(
+        {
+            "events_replayed": replayed,
+            "resumed": run["resumed"],
+            "elapsed_s": round(elapsed, 3),
+            "events_per_s": round(replayed / elapsed, 1) if elapsed > 0 else None,
+            "explanations": explained,
+        }
+    )
+    with get_engine().begin() as conn:
+        conn.execute(
+            sql_text("UPDATE replay_runs SET finished_at = now(), report = CAST(:report AS jsonb) WHERE run_id = :run_id"),
+            {"run_id": run_id, "report": json.dumps(report)},
+        )
+    return report
+
+
+def _timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def main() -> None:
+    """
+    Replay stored events through the belief engine into replay_beliefs and
+    print a diff against production beliefs. Re-running with the same
+    --run-id resumes from the shard checkpoints.
+    """
+    parser = argparse.ArgumentParser(description="VoxCortex belief replay")
+    parser.add_argument("--run-id", help="resume or name a run (default: new run)")
+    parser.add_argument("--shards", type=int, default=1, help="parallel subject shards (processes)")
+    parser.add_argument("--llm", choices=LLM_MODES, default="skip")
+    parser.add_argument("--since", type=_timestamp, help="occurred_at lower bound (ISO, inclusive)")
+    parser.add_argument("--until", type=_timestamp, help="occurred_at upper bound (ISO, exclusive)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--restart", action="store_true", help="drop the run's results and start over")
+    parser.add_argument("--report-only", action="store_true", help="print the diff of an existing run")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    if args.report_only:
+        if not args.run_id:
+            parser.error("--report-only needs --run-id")
+        report = diff_report(args.run_id)
+    else:
+        report = replay(
+            run_id=args.run_id,
+            shards=args.shards,
+            llm=args.llm,
+            since=args.since,
+            until=args.until,
+            chunk_size=args.chunk_size,
+            restart=args.restart,
+        )
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()